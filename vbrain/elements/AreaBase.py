@@ -1,10 +1,10 @@
 import numpy as np
 import warnings
 import os
+import threading
 
 import numpy as np
 from vispy import app, visuals, scene
-from vispy.geometry.isosurface import isosurface
 import vispy.visuals.transforms as vist
 
 from visbrain.vbrain.utils import *
@@ -15,6 +15,39 @@ import visbrain
 __all__ = ['AreaBase']
 
 
+# Structures of atlases already loaded in this process. Their arrays are
+# read-only and shared by every AreaBase :
+_ATLAS = {}
+_ATLAS_LOCK = threading.Lock()
+
+
+def _atlas_structure(filename, structure, cachedir=None):
+    """Get the label volume, the index and the label of areas of a structure
+    ('aal' or 'brod') of an atlas. The atlas file is only read the first time
+    (memory-mapped through load_arrays if cachedir is not None).
+    """
+    key = (filename, structure)
+    with _ATLAS_LOCK:
+        if key not in _ATLAS:
+            atlas = load_arrays(filename, cachedir)
+            if structure == 'aal':
+                vol = atlas['vol']
+                uidx = np.unique(atlas['aal_idx'])
+                label_L = np.array(["%.2d" % (num+1)+': '+k+' (L)' for num, k in zip(np.arange(0, len(atlas['aal_label'])*2, 2),
+                                                                             atlas['aal_label'])])
+                label_R = np.array(["%.2d" % (num+1)+': '+k + ' (R)' for num, k in zip(np.arange(1, len(atlas['aal_label'])*2 + 1, 2),
+                                                                               atlas['aal_label'])])
+                label = np.column_stack((label_L, label_R)).flatten()
+            else:
+                vol = atlas['brod_idx']
+                uidx = np.unique(vol)[1::]
+                label = np.array(["%.2d" % k +': BA'+str(k) for num, k in enumerate(uidx)])
+            uidx.flags.writeable, label.flags.writeable = False, False
+            _ATLAS[key] = {'vol': vol, 'uidx': uidx, 'label': label,
+                           'checksum': array_checksum(vol)}
+        return _ATLAS[key]
+
+
 
 class AreaBase(object):
 
@@ -22,9 +55,15 @@ class AreaBase(object):
     """
 
     def __init__(self, structure='brod', select=None, color='white', cmap=None, scale_factor=1,
-                 name='', transform=None):
+                 name='', transform=None, processes=None, extraction='marching'):
         self.atlaspath = os.path.dirname(visbrain.__file__)+'/vbrain/elements/templates/'
+        self.cachepath = os.path.join(os.path.expanduser('~'), '.visbrain', 'cache')
         self.file = 'AAL_label.npz'
+        self._isocache = IsosurfaceCache(self.cachepath)
+        self._processes = processes
+        if extraction not in ['marching', 'labels']:
+            raise ValueError("extraction must be either 'marching' or 'labels'")
+        self._extraction = extraction
         self._structure = structure
         self._select = select
         self._selectAll = True
@@ -33,7 +72,7 @@ class AreaBase(object):
         self.cmap = cmap
         self._scale_factor = scale_factor
         self._name = name
-        self.mesh = None
+        self.mesh, self._vertex_colors = None, None
 
         if transform is not None:
             self._transform = transform
@@ -41,29 +80,19 @@ class AreaBase(object):
 
 
     def _load(self):
+        """Get the current structure of the atlas. Structures are loaded once
+        per process (see _atlas_structure) so that changing the structure,
+        the selection or the color never reads the atlas file again.
         """
-        """
-        # Load the atlas :
-        atlas = np.load(self.atlaspath+self.file)
-
         # Manage atlas :
         if self._structure not in ['aal', 'brod']:
             raise ValueError("structure must be either 'aal' or 'brod'")
-        else:
-            if self._structure == 'aal':
-                self._vol = atlas['vol']
-                self._idx = atlas['vol']
-                self._uidx = np.unique(atlas['aal_idx'])
-                label_L = np.array(["%.2d" % (num+1)+': '+k+' (L)' for num, k in zip(np.arange(0, len(atlas['aal_label'])*2, 2),
-                                                                             atlas['aal_label'])])
-                label_R = np.array(["%.2d" % (num+1)+': '+k + ' (R)' for num, k in zip(np.arange(1, len(atlas['aal_label'])*2 + 1, 2),
-                                                                               atlas['aal_label'])])
-                self._label = np.column_stack((label_L, label_R)).flatten()
-            elif self._structure == 'brod':
-                self._vol = atlas['brod_idx']
-                self._idx = atlas['brod_idx']
-                self._uidx = np.unique(self._vol)[1::]
-                self._label = np.array(["%.2d" % k +': BA'+str(k) for num, k in enumerate(self._uidx)])
+        atlas = _atlas_structure(self.atlaspath+self.file, self._structure, self.cachepath)
+        # Those arrays are shared and read-only :
+        self._vol, self._idx = atlas['vol'], atlas['vol']
+        self._uidx, self._label = atlas['uidx'], atlas['label']
+        # Surfaces are cached for this volume :
+        self._checksum = atlas['checksum']
 
 
 
@@ -72,7 +101,7 @@ class AreaBase(object):
         """
         # Manage select :
         if self._select is None:
-            self._select = self._uidx
+            self._select = self._uidx.copy()
             self._selectAll = True
         elif not isinstance(self._select, list):
             self._select = list(self._select)
@@ -103,56 +132,45 @@ class AreaBase(object):
         self._selectedIndex = [np.argwhere(self._uidx == k)[0][0] for k in self._select]
         self._selectedLabels = self._label[self._selectedIndex]
         self._color = [color2vb(k) for k in self._color]
-        self._color_idx ,self.vertex_colors = np.array([]), np.array([])
+        self._color_idx ,self._vertex_colors = np.array([]), np.array([])
 
 
     def _get_vertices(self):
+        """Get vertices and faces of selected areas.
+
+        With the 'marching' extraction, surfaces are extracted once per
+        (structure, area, level, volume) and then read from the cache (see
+        IsosurfaceCache), so that a selection only concatenates cached
+        surfaces. With the 'labels' extraction, boundaries of every selected
+        area are extracted in a single pass over the label volume (see
+        extract_labels).
         """
-        """
-        # Pre-load atlas :
-        vertemp = isosurface(self._vol, level=0.5)[0]
-        xm, ym, zm = vertemp[:, 0].mean(), vertemp[:, 1].mean(), vertemp[:, 2].mean()
+        # Whole atlas (also used to center areas) :
+        vertall, facesall = self._isocache.surface((self._structure, 'all', .5, self._checksum),
+                                                   self._vol, .5)
+        xm, ym, zm = vertall[:, 0].mean(), vertall[:, 1].mean(), vertall[:, 2].mean()
 
         # Select all and unicolor :
         if self._selectAll and self._unicolor:
-            self.vert, self.faces = isosurface(self._vol, level=0.5)
-            self.vertex_colors = color2faces(self._color[0], self.faces.shape[0])
-            self._color_idx = np.zeros((self.faces.shape[0],))
-
-        # Don't select all but unicolor :
-        elif not self._selectAll and self._unicolor:
-            # Select areas :
-            vol = np.ma.masked_array(self._vol.copy(), mask=False)
-            for k in self._select:
-                vol.mask[self._idx == k] = True
-            # Get vertices/faces for all areas :
-            self._vol[~vol.mask] = 0
-            self.vert, self.faces = isosurface(self._vol, level=np.array(self._select).min())
-            self.vertex_colors = color2faces(self._color[0], self.faces.shape[0])
-            self._color_idx = np.zeros((self.faces.shape[0],))
-
-        # Select specific andspecific colors :
-        elif not self._selectAll and not self._unicolor:
-            self.vert, self.faces = np.array([]), np.array([])
-            q = 0
-            for num, k in enumerate(self._select):
-                # Remove unecessary index :
-                vol = self._vol.copy()
-                vol[self._idx != k] = 0
-                # Get vertices/faces for this structure :
-                vertT, facesT = isosurface(vol, level=k)
-                # Update faces index :
-                facesT += (q+1)
-                # Concatenate vertices/faces :
-                self.vert = np.concatenate((self.vert, vertT)) if self.vert.size else vertT
-                self.faces = np.concatenate((self.faces, facesT)) if self.faces.size else facesT
-                # Update colors and index :
-                idxT = np.full((facesT.shape[0],), k, dtype=np.int64)
-                self._color_idx = np.concatenate((self._color_idx, idxT)) if self._color_idx.size else idxT
-                color = color2faces(self._color[num], facesT.shape[0])
-                self.vertex_colors = np.concatenate((self.vertex_colors, color)) if self.vertex_colors.size else color
-                # Update maximum :
-                q = self.faces.max()
+            self.vert, self.faces = vertall.copy(), facesall.copy()
+            self._color_idx = np.zeros((self.faces.shape[0],), dtype=np.int64)
+            self._label_index([0], self._color[0])
+
+        # Select specific areas (with one or several colors) :
+        elif not self._selectAll:
+            if self._extraction == 'labels':
+                self.vert, self.faces, self._color_idx = extract_labels(self._idx, self._select)
+            else:
+                surfaces = self._area_surfaces(self._select)
+                nvert = np.array([k[0].shape[0] for k in surfaces], dtype=int)
+                nfaces = np.array([k[1].shape[0] for k in surfaces], dtype=int)
+                # Concatenate vertices/faces (faces index are shifted) :
+                self.vert = np.concatenate([k[0] for k in surfaces])
+                offset = np.repeat(np.cumsum(nvert) - nvert, nfaces)
+                self.faces = np.concatenate([k[1] for k in surfaces]) + offset[:, np.newaxis]
+                self._color_idx = np.repeat(np.array(self._select, dtype=np.int64), nfaces)
+            # Color of each face (from the color of each area) :
+            self._label_index(self._select, np.concatenate(self._color))
 
         # Other case :
         else:
@@ -164,61 +182,132 @@ class AreaBase(object):
         self.vert[:, 2] -= zm
         # self.vert = self._transform.map(self.vert)[:, 0:-1]
 
+
+    def _label_index(self, labels, table):
+        """Sort faces by label and build the label -> faces index (CSR). Faces
+        of the area labels[k] are faces[ptr[k]:ptr[k+1]], so that the color
+        of an area is a contiguous range of vertex_colors.
+
+        Args:
+            labels: list
+                Labels of areas, in the order of faces
+
+            table: ndarray
+                Color of each area, of shape (N_labels, 4)
+        """
+        self._labels = np.asarray(labels, dtype=np.int64)
+        self._label_lut = np.full((self._labels.max() + 1,), -1, dtype=np.int64)
+        self._label_lut[self._labels] = np.arange(len(self._labels))
+        self._color_idx = np.asarray(self._color_idx, dtype=np.int64)
+        pos = self._label_lut[self._color_idx]
+        # Faces are already grouped by area, except for unsorted inputs :
+        if np.any(pos[1::] < pos[0:-1]):
+            order = np.argsort(pos, kind='mergesort')
+            self.faces, self._color_idx, pos = self.faces[order, :], self._color_idx[order], pos[order]
+        self._label_ptr = np.concatenate(([0], np.cumsum(np.bincount(pos, minlength=len(labels)))))
+        # Color table and color of each face :
+        self._label_colors = np.array(table, dtype=np.float32).reshape(-1, 4)
+        self._vertex_colors = np.repeat(self._label_colors[pos][:, np.newaxis, :], 3, axis=1)
+
+
+    def _area_surfaces(self, select):
+        """Get the (cached) surface of each area. Missing areas are extracted
+        in parallel (see extract_areas)
+        """
+        keys = [(self._structure, k, k, self._checksum) for k in select]
+        surfaces = [self._isocache.get(key) for key in keys]
+        missing = [num for num, k in enumerate(surfaces) if k is None]
+        if missing:
+            extracted = extract_areas(self._vol, self._idx, [select[k] for k in missing],
+                                      processes=self._processes)
+            for num, (vertices, faces) in zip(missing, extracted):
+                self._isocache.put(keys[num], vertices, faces)
+                surfaces[num] = (vertices, faces)
+        return surfaces
+
     def _plot(self):
         """
         """
-        self.mesh = BrainMesh(vertices=self.vert, faces=self.faces, vertex_colors=self.vertex_colors,
+        self.mesh = BrainMesh(vertices=self.vert, faces=self.faces, vertex_colors=self._vertex_colors,
                               scale_factor=self._scale_factor, name=self._name, recenter=False)
+        # Colors are then only held by the mesh (see vertex_colors) :
+        self._vertex_colors = None
 
 
     def _get_index(self, index):
+        """Get the position of areas in the color table and their range of
+        faces
         """
-        """
-        # Get list of unique index :
-        uindex = np.unique(self._color_idx)
-        # Create an empty mask :
-        mask = np.zeros((len(self._color_idx),), dtype=bool)
         # Convert index :
         if index is None:
-            index = list(uindex)
+            index = list(self._labels)
         if not isinstance(index, list):
             index = [index]
         # Check if index exist :
+        ranges = []
         for k in index:
-            if k not in uindex:
+            num = self._label_lut[k] if 0 <= k < len(self._label_lut) else -1
+            if num < 0:
                 warnings.warn(str(k)+' not found in the list of existing areas')
             else:
-                mask[self._color_idx == k] = True
-        return mask
+                ranges.append((num, slice(self._label_ptr[num], self._label_ptr[num+1])))
+        return ranges
 
 
     def set_alpha(self, alpha, index=None):
+        """Set the transparency of areas. Only faces of those areas are
+        updated and uploaded.
+
+        Args:
+            alpha: float
+                Transparency
+
+        Kargs:
+            index: int/list, optional, (def: None)
+                Label of areas to update. If None, every area is updated.
         """
-        """
-        # Get corresponding index of areas :
-        mask = self._get_index(index)
-        # Set alpha :
-        self.mesh.set_alpha(alpha, index=np.tile(mask[:, np.newaxis], (1, 3)))
+        if index is None:
+            self._label_colors[:, 3] = alpha
+            self.mesh.set_alpha(alpha)
+            return
+        for num, faces in self._get_index(index):
+            self._label_colors[num, 3] = alpha
+            self.mesh.set_alpha(alpha, index=faces)
 
 
     def set_color(self, color, index=None):
+        """Set the color of areas. Only faces of those areas are updated and
+        uploaded.
+
+        Args:
+            color: tuple/string/hex
+                The color to use
+
+        Kargs:
+            index: int/list, optional, (def: None)
+                Label of areas to update. If None, every area is updated.
         """
-        """
-        # Get corresponding index of areas :
-        mask = self._get_index(index)
-        # Get RGBA color :
-        color = color2vb(color)
-        # Convert
-        # Set color to vertex color :
-        self.vertex_colors[mask, ...] = color
-        self.mesh.set_color(self.vertex_colors)
-        self.mesh.update()
+        color = color2vb(color).ravel()
+        if index is None:
+            self._label_colors[:] = color
+            self.mesh.set_rgba(tuple(color))
+            return
+        for num, faces in self._get_index(index):
+            self._label_colors[num, :] = color
+            self.mesh.set_rgba(tuple(color), index=faces)
 
     def set_camera(self, camera):
         """
         """
         self.mesh.set_camera(camera)
 
+    @property
+    def vertex_colors(self):
+        """Color of each face (read from the mesh once it is created)"""
+        if (self._vertex_colors is None) and (self.mesh is not None):
+            return self.mesh.get_color
+        return self._vertex_colors
+
     @property
     def structure(self):
         return self._structure
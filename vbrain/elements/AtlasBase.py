@@ -5,7 +5,7 @@ import vispy.scene.visuals as visu
 import vispy.geometry as visg
 import vispy.visuals.transforms as vist
 
-from ..utils import color2vb
+from ..utils import color2vb, vertices2indexed, mesh_memory, load_template, Playback
 from ..visuals import BrainMesh
 
 import visbrain
@@ -17,7 +17,7 @@ class AtlasBase(object):
     """
 
     def __init__(self, a_color=(1.0,1.0,1.0), a_opacity=1., a_projection='internal', a_template='B1', a_hemisphere='both',
-                 a_vertices=None, a_faces=None, a_shading='smooth', a_transform=[], l_position=(100., 100., 100.),
+                 a_vertices=None, a_faces=None, a_shading='smooth', a_transform=[], a_indexed=False, a_compact=False, a_gpu_cache=256., l_position=(100., 100., 100.),
                  l_intensity=(1., 1., 1.), l_color=(1., 1., 1., 1.), l_coefAmbient=0.05, l_coefSpecular=0.5, **kwargs):
         # Get inputs :
         self.color = a_color
@@ -29,18 +29,23 @@ class AtlasBase(object):
         self.user_vert = a_vertices
         self.user_faces = a_faces
         self.hemisphere = a_hemisphere
+        self.indexed = a_indexed
+        self.compact = a_compact
+        self.gpu_cache = a_gpu_cache
         self.sagittal, self.coronal, self.axial = (0, 0, 0)
         self.l_pos, self.l_int, self.l_col = l_position, l_intensity, l_color
         self.l_amb, self.l_spec = l_coefAmbient, l_coefSpecular
 
         # Needed variables :
         self.atlaspath = os.path.dirname(visbrain.__file__)+'/vbrain/elements/templates/'
+        self.cachepath = os.path.join(os.path.expanduser('~'), '.visbrain', 'cache')
         self._defcolor = (1,1,1)
         self._scaleMax = 100
+        self.player = None
 
         # Initialize visualization :
-        vertices, faces, normals, color = self.load(self.template, self.user_vert,self.user_faces)
-        self.plot(vertices, faces, normals, color, a_projection, a_hemisphere)
+        vertices, faces, normals, color, norm = self.load(self.template, self.user_vert,self.user_faces)
+        self.plot(vertices, faces, normals, color, a_projection, a_hemisphere, norm)
 
 
     def __len__(self):
@@ -53,34 +58,43 @@ class AtlasBase(object):
 
 
     def load(self, template='B1', vertices=None, faces=None):
-        """Load the atlas to use for the interface.
+        """Load the atlas to use for the interface. Default templates are
+        loaded through a binary cache of already normalized arrays (see
+        load_template). For user templates, normalization is None.
         """
         # Load a default template :
         if (vertices is None) and (faces is None):
             if (template in ['B1', 'B2', 'B3']):
-                atlas = np.load(self.atlaspath+'{template}.npz'.format(template=template))
-                faces, normals = atlas['faces'], atlas['a_normal']
-                vertices, color = atlas['a_position'], atlas['a_color']
+                vertices, faces, normals, color, norm = load_template(
+                    self.atlaspath+'{template}.npz'.format(template=template),
+                    cachedir=self.cachepath, scale_factor=self._scaleMax, indexed=self.indexed)
             else:
                 raise ValueError("a_template should be 'B1', 'B2' or 'B3.'")
         # Load a user template
         else:
-            vertices, faces, normals, color = vertices, faces, None, None
+            vertices, faces, normals, color, norm = vertices, faces, None, None, None
 
-        return vertices, faces, normals, color
+        return vertices, faces, normals, color, norm
 
 
-    def plot(self, vertices=None, faces=None, normals=None, color=None, projection='internal', hemisphere='both'):
+    def plot(self, vertices=None, faces=None, normals=None, color=None, projection='internal', hemisphere='both',
+             normalization=None):
         """Plot data
         """
         # Initialize mesh object :
-        self.mesh = BrainMesh(vertices=vertices, faces=faces, normals=normals, name='Brain',
+        self.mesh = BrainMesh(vertices=vertices, faces=faces, normals=normals, normalization=normalization,
+                              name='Brain',
                               l_position=self.l_pos, l_intensity=self.l_int, l_color=self.l_col,
                               l_coefAmbient=self.l_amb,  l_coefSpecular=self.l_spec,
-                              scale_factor=self._scaleMax, hemisphere=hemisphere)
+                              scale_factor=self._scaleMax, hemisphere=hemisphere, indexed=self.indexed,
+                              compact=self.compact)
+        # Keep default templates resident on the GPU :
+        self.mesh.set_cache_cap(int(self.gpu_cache * 1024**2))
+        if (self.user_vert is None) and (self.user_faces is None):
+            self.mesh.cache_store(self.template)
         self.vert = self.mesh.get_vertices
         self.transform = self.mesh._btransform
-        self.mask = np.zeros((len(self.mesh), 3), dtype=bool)
+        self.mask = np.zeros(self.mesh.get_color.shape[:-1], dtype=bool)
         self._nv = len(self.mesh)
 
         self.mesh.set_alpha(self.opacity)
@@ -89,8 +103,15 @@ class AtlasBase(object):
 
 
     def reload(self, template=None, hemisphere=None, projection=None, vertices=None, faces=None):
+        """Reload the atlas. Default templates already used are kept resident
+        on the GPU so that switching back to them only swaps buffers. If the
+        template is unchanged, only the hemisphere is updated.
         """
-        """
+        user = (vertices is not None) or (faces is not None)
+        if not user and (template in [None, self.template]):
+            if hemisphere not in [None, self.hemisphere]:
+                self.set_hemisphere(hemisphere)
+            return
         if template is not None:
             self.template = template
         if hemisphere is not None:
@@ -98,8 +119,117 @@ class AtlasBase(object):
         if projection is not None:
             self.projection = projection
 
-        # Initialize visualization :
-        vertices, faces, normals, color = self.load(self.template, vertices, faces)
-        self.mesh.set_data(vertices=vertices, faces=faces, normals=normals,
-                           hemisphere=hemisphere)
+        # The movie is defined on the previous template :
+        self._player_close()
+
+        # Swap to a resident template or load it :
+        if user or not self.mesh.cache_restore(self.template):
+            vertices, faces, normals, color, norm = self.load(self.template, vertices, faces)
+            self.mesh.set_data(vertices=vertices, faces=faces, normals=normals,
+                               hemisphere=self.hemisphere, normalization=norm)
+            if not user:
+                self.mesh.cache_store(self.template)
+        self.mesh.set_hemisphere(self.hemisphere)
         self.mesh.set_color(color=self.color)
+        self.vert = self.mesh.get_vertices
+        self.mask = np.zeros(self.mesh.get_color.shape[:-1], dtype=bool)
+        self._nv = len(self.mesh)
+
+
+    def set_hemisphere(self, hemisphere='both'):
+        """Display left, right or both hemispheres without reloading the
+        template. Colors and projections are kept.
+
+        Kargs:
+            hemisphere: string, optional, (def: 'both')
+                Hemisphere to display ('both', 'left', 'right')
+        """
+        self.hemisphere = hemisphere
+        self.mesh.set_hemisphere(hemisphere)
+
+
+    def set_movie(self, data, index=None, fps=25., **kwargs):
+        """Display time-resolved data defined on vertices (cortical movie).
+        Data are sent once to the GPU, so that playing or seeking only changes
+        the displayed time point (see self.player).
+
+        Args:
+            data: ndarray
+                Data of shape (N_vertices, N_times) in indexed mode or
+                (N_faces, 3, N_times) otherwise
+
+        Kargs:
+            index: ndarray, optional, (def: None)
+                Boolean array for selecting vertices that are colorized
+
+            fps: float, optional, (def: 25.)
+                Number of frames per second
+
+            kwargs: dict, optional
+                Colormap arguments (cmap, vmin, vmax, under, over)
+
+        Return:
+            player: Playback
+                Controller of the movie (play, pause, seek, set_fps)
+        """
+        self._player_close()
+        self.mesh.set_movie(data, index=index, **kwargs)
+        # Frames are already on the GPU, so there is nothing to precompute :
+        self.player = Playback(data.shape[-1], None, self._player_apply, fps=fps)
+        return self.player
+
+
+    def _player_apply(self, t, payload, i):
+        """Display the time point t of the movie. The player is closed if the
+        mesh dropped its movie (e.g new data or colors were set)
+        """
+        if self.mesh.get_ntimes == 0:
+            self._player_close()
+        else:
+            self.mesh.set_time(t)
+
+
+    def _player_close(self):
+        """Stop the movie player
+        """
+        if self.player is not None:
+            self.player.close()
+            self.player = None
+
+
+    def memory_report(self, templates=('B1', 'B2', 'B3'), verbose=True):
+        """Compare the GPU memory needed by each template, for de-indexed and
+        indexed meshes and for standard and compact buffers.
+
+        Kargs:
+            templates: tuple, optional, (def: ('B1', 'B2', 'B3'))
+                Templates to compare
+
+            verbose: bool, optional, (def: True)
+                Print the report
+
+        Return:
+            report: dict
+                Dictionary of memory (in bytes) for each template and layout
+                (e.g report['B1']['indexed', 'compact']['total'])
+        """
+        report = {}
+        for template in templates:
+            vertices, faces, _, _, _ = self.load(template)
+            nf = faces.shape[0]
+            # Number of unique vertices :
+            if vertices.ndim == 3:
+                nv = vertices2indexed(vertices)[0].shape[0]
+            else:
+                nv = vertices.shape[0]
+            report[template] = {}
+            for layout, nitems in [('de-indexed', 3 * nf), ('indexed', nv)]:
+                for compact in [False, True]:
+                    fmt = 'compact' if compact else 'standard'
+                    report[template][layout, fmt] = mesh_memory(nitems, nf, compact=compact)
+            if verbose:
+                print('Template '+template+' ('+str(nv)+' vertices, '+str(nf)+' faces) :')
+                for (layout, fmt), mem in report[template].items():
+                    print('    {0:<10} / {1:<8} : {2:7.2f} Mo'.format(layout, fmt,
+                                                                   mem['total'] / 1024.**2))
+        return report
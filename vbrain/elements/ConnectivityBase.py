@@ -7,7 +7,8 @@ from vispy.scene import Node
 
 import visbrain
 from ..utils import array2colormap, normalize, _colormap
-from ..visuals import Connect
+from ..visuals import Connect, ConnectGlyph
+from ..visuals.ConnectGlyphVisual import check_instancing, has_divisor
 
 
 __all__ = ['ConnectivityBase']
@@ -21,7 +22,9 @@ class ConnectivityBase(_colormap):
 
     def __init__(self, c_xyz=[], c_connect=None, c_select=None, c_colorby='count',
                  c_transform=[], c_dynamic=None, c_cmap='viridis', c_cmap_vmin=None,
-                 c_cmap_vmax=None, c_cmap_under=None, c_cmap_over=None, **kwargs):
+                 c_cmap_vmax=None, c_cmap_under=None, c_cmap_over=None, c_compact=False,
+                 c_bundling=False, c_glyph=False, c_widthby=None, c_curvature=0., c_arrows=False,
+                 **kwargs):
 
         # Initialize elements :
         self.xyz = c_xyz
@@ -30,14 +33,28 @@ class ConnectivityBase(_colormap):
         self.colorby = c_colorby
         self.transform = c_transform
         self.dynamic = c_dynamic
+        self.compact = c_compact
+        self.bundling = c_bundling
+        self.glyph = c_glyph
 
         # Initialize colormap :
         _colormap.__init__(self, c_cmap, c_cmap_vmin, c_cmap_vmax, c_cmap_under, c_cmap_over)
 
-        if (self.xyz is not None) and (self.connect is not None):
+        # Glyphs need per-instance buffers (vispy >= 0.6), otherwise draw lines :
+        if self.glyph and not has_divisor():
+            warn("c_glyph requires vispy >= 0.6. Connections are drawn as lines.")
+            self.glyph = False
+
+        if (self.xyz is not None) and (self.connect is not None) and self.glyph:
+            check_instancing()
+            self.mesh = ConnectGlyph(self.xyz, self.connect, select=self.select, colorby=self.colorby,
+                                     dynamic=self.dynamic, compact=self.compact, name='Connectivity',
+                                     width=kwargs.get('c_linewidth', 4.), widthby=c_widthby,
+                                     curvature=c_curvature, arrows=c_arrows, **self._cb)
+        elif (self.xyz is not None) and (self.connect is not None):
             self.mesh = Connect(self.xyz, self.connect, select=self.select, colorby=self.colorby,
-                                dynamic=self.dynamic, name='Connectivity', **self._cb)
-            self._maskbck = self.mesh.connect.mask.copy()
+                                dynamic=self.dynamic, compact=self.compact, name='Connectivity',
+                                **self._cb)
         else:
             self.mesh = visu.Line(name='NoneConnect')
 
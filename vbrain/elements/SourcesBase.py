@@ -6,6 +6,7 @@ import vispy.scene.visuals as visu
 import vispy.visuals.transforms as vist
 
 from ..utils import color2vb, normalize, _colormap
+from ..visuals import ClipTransform
 
 __all__ = ['SourcesBase']
 
@@ -19,7 +20,7 @@ class SourcesBase(_colormap):
                  s_radiusmax=10.0, s_edgecolor=None, s_edgewidth=0.6, s_scaling=False, s_transform=[],
                  s_text=None, s_textcolor='black', s_textsize=3, s_textshift=(0,2,0), s_mask=None, s_maskcolor='gray',
                  s_cmap='inferno', s_cmap_vmin=None, s_cmap_vmax=None, s_cmap_under=None, s_cmap_over=None,
-                 s_projecton='surface', **kwargs):
+                 s_projecton='surface', s_fps=25., **kwargs):
         # Initialize elements :
         self.xyz = s_xyz
         self.data = s_data
@@ -41,6 +42,10 @@ class SourcesBase(_colormap):
         self.smask = s_mask
         self.smaskcolor = color2vb(s_maskcolor)
         self.projecton = s_projecton
+        self.clip = ClipTransform()
+        # Time-resolved data :
+        self.tdata, self.ntimes, self.time = None, 1, 0
+        self.fps = s_fps
 
         # Initialize colorbar elements :
         _colormap.__init__(self, s_cmap, s_cmap_vmin, s_cmap_vmax, s_cmap_under, s_cmap_over)
@@ -128,12 +133,24 @@ class SourcesBase(_colormap):
         # Check data :
         if self.data is None:
             self.data = np.ones((self.nSources,), dtype=float)
+        # Time-resolved data (N_sources, N_times). The current time point is
+        # in self.data :
+        if np.ndim(self.data) == 2:
+            if self.data.shape[0] != self.nSources:
+                raise ValueError("Time-resolved data must be an array of shape (N_sources, N_times)")
+            self.tdata = np.ma.getdata(self.data).astype(float)
+            self.ntimes = self.tdata.shape[1]
+            self._trange = (self.tdata.min(), self.tdata.max())
+            self.data = np.ma.masked_array(self.tdata[:, self.time].copy(),
+                                           mask=np.ma.getmaskarray(self.data).any(1))
         try:
             self.data.mask
         except:
             self.data = np.ma.masked_array(np.ravel(self.data), mask=False)
         if len(self.data) != self.nSources:
             raise ValueError("The length of data must be the same as the number of electrodes")
+        elif self.tdata is not None:
+            self.sData = self.time_radius(self.time, self.time+1)[:, 0]
         else:
             self.sData = self.array2radius(self.data.data, vmin=self.radiusmin, vmax=self.radiusmax, rescale=self.scaling)
 
@@ -158,6 +175,50 @@ class SourcesBase(_colormap):
         return radius
 
 
+    def time_radius(self, start=0, stop=None):
+        """Radius of sources for time points [start, stop) of time-resolved
+        data. Radius are defined using the range of all time points.
+
+        Kargs:
+            start/stop: int, optional, (def: 0/None)
+                First and last (excluded) time points
+
+        Return:
+            radius: ndarray
+                Radius of shape (N_sources, N_points)
+        """
+        data = self.tdata[:, start:stop]
+        dmin, dmax = self._trange
+        # Constant data :
+        if dmin == dmax:
+            radius = np.full(data.shape, self.radiusmin)
+        # Non-constant values :
+        else:
+            radius = self.radiusmin + (data - dmin) * ((self.radiusmax - self.radiusmin) / (dmax - dmin))
+        # Rescale data :
+        if self.scaling:
+            radius /= self._rescale
+        return radius
+
+
+    def set_time(self, t, radius=None):
+        """Display the time point t of time-resolved data. Only the data and
+        the size of sources are updated.
+
+        Args:
+            t: int
+                Time index
+
+        Kargs:
+            radius: ndarray, optional, (def: None)
+                Precomputed radius of sources (see time_radius)
+        """
+        self.time = t
+        self.data.data[:] = self.tdata[:, t]
+        self.sData = self.time_radius(t, t+1)[:, 0] if radius is None else radius
+        self.update()
+
+
     def plot(self):
         """Plot sources on the brain
         """
@@ -167,6 +228,7 @@ class SourcesBase(_colormap):
         self.mesh = visu.Markers(name='Sources')
         self.mesh.set_data(xyz, edge_color=self.edgecolor, face_color=sColor, size=sData,
                            scaling=self.scaling, edge_width=self.edgewidth)
+        self.mesh.transform = self.clip
         # self.mesh.set_gl_state('translucent', depth_test=False, cull_face=True)
 
 
@@ -206,10 +268,15 @@ class SourcesBase(_colormap):
             self.stextmesh = visu.Text(text=self.stext, color=self.stextcolor, font_size=self.stextsize,
                                        pos=self.xyz, bold=True, name='SourcesText')
             self.stextmesh.set_gl_state('translucent', depth_test=True)
-            self.stextmesh.transform = vist.STTransform(translate=self.stextshift)
+            self.text_transform(self.stextshift)
         else:
             self.stextmesh = visu.Text(name='NoneText')
 
+    def text_transform(self, shift):
+        """Translate text elements (after clipping)
+        """
+        self.stextmesh.transform = vist.ChainTransform([vist.STTransform(translate=shift), self.clip])
+
     def text_update(self):
         """Update text elements
         """
@@ -1,16 +1,33 @@
 from warnings import warn
+from collections import OrderedDict
 import numpy as np
 
-from ...utils import slider2opacity, array2colormap, normalize
+from ...utils import (slider2opacity, normalize, VerticesTree, ProjectionOperator,
+                      Playback, load_sdf)
 
 class SourcesTransform(object):
 
     """docstring for SourcesTransform
     """
 
-    def __init__(self, t_radius=10.0, **kwargs):
+    def __init__(self, t_radius=10.0, t_weights=None, t_sigma=None, **kwargs):
         self.radius = t_radius
+        self.weights, self.sigma = t_weights, t_sigma
         self.current_mask = None
+        # KD-trees of last used vertices (atlas, areas...) and last projection
+        # operator :
+        self._trees = OrderedDict()
+        self._operator = None
+        # Signed distance field of the displayed brain (inside/outside) :
+        self._sdf = (None, None)
+        # Playback of time-resolved sources data (projected frames are only
+        # computed after a cortical projection) :
+        self._tprojection = False
+        self._toperator = None
+        self.splayer = None
+        if self.sources.ntimes > 1:
+            self.splayer = Playback(self.sources.ntimes, self._frames_compute, self._frames_apply,
+                                    fps=self.sources.fps)
 
 
     # ***************************************************************
@@ -37,23 +54,151 @@ class SourcesTransform(object):
             self.sources.data.mask[np.invert(idx)] = False
 
         elif select in ['inside', 'outside']:
-            N = len(self.sources)
-            self.progressbar.show()
-            if select == 'inside':
-                for k, i in enumerate(self.sources):
-                    self.progressbar.setValue(100*k/N)
-                    self.sources.data.mask[k] = ~self._isInside(self.atlas.vert, i, contribute=False)
-            elif select == 'outside':
-                for k, i in enumerate(self.sources):
-                    self.progressbar.setValue(100*k/N)
-                    self.sources.data.mask[k] = self._isInside(self.atlas.vert, i, contribute=False)
-            self.progressbar.hide()
+            inside = self._signed_distance().inside(self.sources.xyz)
+            self.sources.data.mask = ~inside if select == 'inside' else inside
 
         # Finally update data :
         self.sources.update()
         self.sources.text_update()
 
 
+    def s_distance(self):
+        """Get the signed distance between each source and the cortex of the
+        displayed template/hemisphere (negative inside the brain)
+
+        Return:
+            distance: ndarray
+                Distance of each source of shape (N_sources,)
+        """
+        return self._signed_distance().distance(self.sources.xyz)
+
+
+    def _signed_distance(self):
+        """Get the signed distance field of the displayed template and
+        hemisphere. Fields are computed once and cached on disk
+        """
+        mesh, hemisphere = self.atlas.mesh, self.atlas.hemisphere
+        key = (self.atlas.template, id(mesh.get_vertices), hemisphere)
+        if self._sdf[0] != key:
+            self.progressbar.show()
+            name = self.atlas.template if self.atlas.user_vert is None else 'user'
+            faces = None if mesh.get_vertices.ndim == 3 else mesh.get_faces['both']
+            surface = None if hemisphere == 'both' else mesh.get_faces[hemisphere]
+            sdf = load_sdf(mesh.get_vertices, faces=faces, surface=surface,
+                           cachedir=self.atlas.cachepath, name=name+'_'+hemisphere)
+            self._sdf = (key, sdf)
+            self.progressbar.hide()
+        return self._sdf[1]
+
+
+    # ***************************************************************
+    # ***************************************************************
+    # PLAYBACK
+    # ***************************************************************
+    # ***************************************************************
+    def s_play(self, fps=None):
+        """Play time-resolved sources data
+
+        Kargs:
+            fps: float, optional, (def: None)
+                Number of frames per second (unchanged if None)
+        """
+        if self.splayer is None:
+            warn("Sources data are not time-resolved. Use s_data of shape (N_sources, N_times)")
+        else:
+            # Build the projection operator before the playback thread uses it :
+            if self._tprojection:
+                self._capture_operator()
+            self.splayer.play(fps)
+
+
+    def s_pause(self):
+        """Pause time-resolved sources data
+        """
+        if self.splayer is not None:
+            self.splayer.pause()
+
+
+    def s_seek(self, t):
+        """Display the time point t of time-resolved sources data
+
+        Args:
+            t: int
+                Time index
+        """
+        if self.splayer is not None:
+            self.splayer.seek(t)
+
+
+    def s_fps(self, fps):
+        """Set the number of frames per second of the playback
+
+        Args:
+            fps: float
+                Number of frames per second
+        """
+        if self.splayer is not None:
+            self.splayer.set_fps(fps)
+
+
+    def _capture_operator(self):
+        """Get (in the main thread) the projection operator used by the
+        playback thread. Computed frames are dropped if it changed
+        """
+        op = self._projection_operator(self._projection_vertices()[1], self.sources.xyz)
+        if (op is not self._toperator) and (self.splayer is not None):
+            self.splayer.reset()
+        self._toperator = op
+
+
+    def _frames_compute(self, start, stop):
+        """Compute radius and cortical projection of time points [start, stop).
+        This is called from the playback thread, which only uses the operator
+        captured in the main thread (see _capture_operator)
+        """
+        payload = {'radius': self.sources.time_radius(start, stop)}
+        op = self._toperator
+        if self._tprojection and (op is not None):
+            payload['support'], payload['projection'] = self._project_frames(start, stop, op)
+        return payload
+
+
+    def _frames_apply(self, t, payload, i):
+        """Display a precomputed time point
+        """
+        self.sources.set_time(t, radius=payload['radius'][:, i])
+        # Projected data (colormap only) :
+        if ('projection' in payload) and self._tprojection:
+            mesh = self._projection_mesh()
+            cort_mask = np.zeros(mesh.get_color.shape[:-1], dtype=float)
+            cort_mask.ravel()[payload['support']] = payload['projection'][:, i]
+            self.current_mask, self.current_non_zero = cort_mask, cort_mask != 0
+            mesh.set_cmap(data=cort_mask, index=self.current_non_zero, **self.sources._cb)
+
+
+    def _project_frames(self, start, stop, op):
+        """Cortical projection of several time points at once (one sparse
+        product with the operator op), rescaled like cortical_projection. Only
+        vertices reached by sources are returned.
+        """
+        data = self.sources.tdata[:, start:stop]
+        cort, reached, _ = self._get_projection(None, self.sources.xyz, data, op=op)
+        support = np.flatnonzero(reached.ravel())
+        cort = cort.reshape(-1, data.shape[1])[support, :]
+        # Rescale non-zero values of each time point between data bounds :
+        select = ~np.ma.getmaskarray(self.sources.data) & ~np.asarray(self.sources.smask, dtype=bool)
+        if select.any():
+            tomin, tomax = data[select, :].min(0), data[select, :].max(0)
+            non_zero = cort != 0
+            xm = np.where(non_zero, cort, np.inf).min(0)
+            xM = np.where(non_zero, cort, -np.inf).max(0)
+            scale = non_zero & (xm != xM)[np.newaxis, :]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rescaled = (cort - xM) * ((tomax - tomin) / (xM - xm)) + tomax
+            cort = np.where(scale, rescaled, cort)
+        return support, cort.astype(np.float32)
+
+
     # ***************************************************************
     # ***************************************************************
     # PROJECTIONS
@@ -68,16 +213,10 @@ class SourcesTransform(object):
         if self.sources.xyz is not None:
             self.progressbar.show()
             # Switch between surface and deep projection :
-            if self.sources.projecton == 'surface':
-                nv, vertices = self.atlas._nv, self.atlas.vert
-            elif self.sources.projecton == 'deep':
-                vertices = self.area.mesh.get_vertices
-                nv = vertices.shape[0]
-            # Get data and proportional mask :
-            prop, mask, smask = self._get_mask(nv, vertices, self.sources.xyz,
-                                               self.sources.data, set_to=1, contribute=False)
-            # Divide the mask by the number of contributed sources :
-            cort_mask = np.divide(mask, prop)
+            _, vertices = self._projection_vertices()
+            # Project data (mean of contributing sources) :
+            cort_mask, _, smask = self._get_projection(vertices, self.sources.xyz,
+                                                       self.sources.data, contribute=False)
             # Rescale cortical mask data :
             nnmasked = np.invert(self.sources.smask)
             cort_mask, non_zero = self._rescale_cmap(cort_mask, tomin=self.sources.data[nnmasked].min(),
@@ -87,6 +226,11 @@ class SourcesTransform(object):
             self.current_non_zero = non_zero
             # Finally, set the mask to the surface :
             self._array2cmap(cort_mask, non_zero=non_zero, smask=smask, smaskcolor=self.sources.smaskcolor)
+            # Next played time points are projected :
+            self._tprojection = True
+            if self.splayer is not None:
+                self._capture_operator()
+                self.splayer.reset()
             # Update colorbar :
             self.cb.cbupdate(cort_mask[non_zero], **self.sources._cb, label=self.cb['label'],
                              fontsize=self.cb['fontsize'])
@@ -108,6 +252,10 @@ class SourcesTransform(object):
             non_zero = prop != 0
             self.sources['vmin'], self.sources['vmax'] = 0, prop.max()
             self._array2cmap(prop, non_zero=non_zero)
+            # The repartition doesn't depend on played data :
+            self._tprojection = False
+            if self.splayer is not None:
+                self.splayer.reset()
             # Save this current cmap (for colormap interaction) :
             self.current_mask = prop
             self.current_non_zero = non_zero
@@ -120,93 +268,115 @@ class SourcesTransform(object):
 
 
 
-    # ________________ SUB VERTICES FUNCTIONS ________________
-
-    def _get_mask(self, nv, vert, xyz, data, set_to=0, contribute=False):
-        """Create the colormap mask of data to apply to the MNI brain
-        """
-        # Define empty proportional and data mask :
-        prop = np.full((nv, 3), set_to, dtype=int)
-        smasked = np.zeros(prop.shape, dtype=bool)
-        mask = np.zeros((nv, 3), dtype=float)
-
-        # Find unmasked proximal vertices for each source :
-        idxunmasked = np.where(data.mask == False)[0]
-        N = len(idxunmasked)
-        for i, k in enumerate(idxunmasked):
-            self.progressbar.setValue(100*k/N)
-            # Find index :
-            idx = self._proximal_vertices(vert, xyz[k, :], self.radius, contribute=contribute)
-            # Add either to prop or to masked array :
-            if not self.sources.smask[k]:
-                mask[idx] += data[k]
-                prop[idx] += 1
-            else:
-                smasked[idx] = True
-        return prop, mask, smasked
+    def project_sources(self, data=None, contribute=False):
+        """Project sources data on the brain without displaying it, using the
+        same rule as cortical_projection (before rescaling).
 
+        Kargs:
+            data: ndarray, optional, (def: None)
+                Data of shape (N_sources,) or (N_sources, N_datasets) to project
+                several datasets at once (subjects, conditions...). If None,
+                sources data are used. Masked sources are ignored.
 
+            contribute: bool, optional, (def: False)
+                If True, sources can contribute to the other hemisphere
 
-    def _proximal_vertices(self, vert, xyz, radius, contribute=False):
-        """Find vertices where the distance with xyz is under
-        radius. Use contribute to tell if a source can contribute to the
-        cortical activity from the other part of the brain.
-        Return the index of under radius vertices.
+        Return:
+            x: ndarray
+                Projected data of shape (N_vertices,) (+ (N_datasets,))
         """
-        # Compute manually the euclidian distance (much faster because don't need
-        # the reduce function of numpy) :
-        x = vert[:, :, 0] - xyz[0]
-        y = vert[:, :, 1] - xyz[1]
-        z = vert[:, :, 2] - xyz[2]
-        eucl = np.sqrt(x**2 + y**2 + z**2)
-
-        # Select under radius sources and those which contribute or not, to the
-        # other brain hemisphere :
-        if not contribute:
-            idx = np.logical_and(eucl <= radius, np.sign(vert[:, :, 0]) == np.sign(xyz[0]))
-        else:
-            idx = eucl <= radius
+        data = self.sources.data if data is None else np.asarray(data)
+        # Switch between surface and deep projection :
+        _, vertices = self._projection_vertices()
+        return self._get_projection(vertices, self.sources.xyz, data, contribute=contribute)[0]
+
 
-        return idx #, eucl[idx]
+    # ________________ SUB VERTICES FUNCTIONS ________________
 
+    def _get_mask(self, nv, vert, xyz, data, set_to=0, contribute=False, op=None):
+        """Create the colormap mask of data to apply to the MNI brain. data can
+        be of shape (N_sources,) or (N_sources, N_datasets). If op is None, the
+        projection operator of vert and xyz is used.
 
-    def _closest_vertex(self, vert, xyz, contribute=False):
-        """Find the unique closest vertex from a source
+        prop is the number of contributing sources plus set_to or, if t_weights
+        is used, the sum of their weights. mask is the (weighted) sum of data.
         """
-        # Compute manually the euclidian distance (much faster) :
-        x = vert[:, :, 0] - xyz[0]
-        y = vert[:, :, 1] - xyz[1]
-        z = vert[:, :, 2] - xyz[2]
-        eucl = np.sqrt(x**2 + y**2 + z**2)
-
-        # Set if a source can contribute to the other part of the brain :
-        if not contribute:
-            idx = np.logical_and(eucl == eucl.min(), np.sign(vert[:, :, 0]) == np.sign(xyz[0]))
+        op, select, unmasked, values = self._select_sources(vert, xyz, data, contribute, op)
+        # Number of contributed sources (or sum of weights), sum of data and
+        # vertices reached by masked sources (either per face corner or per
+        # vertex for indexed meshes) :
+        if self.weights is None:
+            prop = set_to + np.round(op.count(select, weighted=False)).astype(int)
         else:
-            idx = eucl == eucl.min()
+            prop = op.count(select, weighted=True)
+        mask = op.sum(values)
+        smasked = op.count(unmasked & np.asarray(self.sources.smask, dtype=bool), weighted=False) > 0
+        return prop, mask, smasked
 
-        return idx
 
+    def _get_projection(self, vert, xyz, data, contribute=False, op=None):
+        """Project data on vertices. Without weights, the sum of data of each
+        vertex is divided by one plus the number of contributing sources. With
+        weights, the weighted mean of data is used (see
+        ProjectionOperator.project).
 
-    def _isInside(self, vert, xyz, contribute=False):
-        """Return if a source is inside the MNI brain :
-        """
-        # Get the index of the closest vertex :
-        idx = self._closest_vertex(vert, xyz, contribute=contribute)
+        Return:
+            cort: ndarray
+                Projected data of shape vert.shape[:-1] (+ (N_datasets,))
+
+            reached: ndarray
+                Boolean array of vertices reached by at least one source
 
-        # Compute euclidian distance between 0 and corresponding vertex and source :
-        # Euclidian distance for the closest vertex :
-        x_vert, y_vert, z_vert = vert[idx, 0][0], vert[idx, 1][0], vert[idx, 2][0]
-        eucl_vert = np.sqrt(x_vert**2 + y_vert**2 + z_vert**2)
+            smask: ndarray
+                Boolean array of vertices reached by masked sources
+        """
+        op, select, unmasked, values = self._select_sources(vert, xyz, data, contribute, op)
+        count = np.round(op.count(select, weighted=False)).astype(int)
+        if self.weights is None:
+            prop = 1 + count
+            cort = op.sum(values) / prop.reshape(prop.shape + (1,) * (values.ndim - 1))
+        else:
+            cort = op.project(values, select)
+        smasked = op.count(unmasked & np.asarray(self.sources.smask, dtype=bool), weighted=False) > 0
+        return cort, count > 0, smasked
 
-        # Euclidian distance for each source :
-        eucl_xyz = np.sqrt(xyz[0]**2 + xyz[1]**2 + xyz[2]**2)
 
-        # Find where eucl_xyz < eucl_vert :
-        isInside = eucl_xyz < eucl_vert
+    def _select_sources(self, vert, xyz, data, contribute=False, op=None):
+        """Get the projection operator, selected and unmasked sources and data
+        of selected sources (zero elsewhere)
+        """
+        if op is None:
+            op = self._projection_operator(vert, xyz, contribute)
+        # Selected sources (data mask is shared across datasets) :
+        unmasked = ~np.ma.getmaskarray(self.sources.data if np.ndim(data) > 1 else data)
+        select = unmasked & ~np.asarray(self.sources.smask, dtype=bool)
+        data = np.ma.getdata(data)
+        values = np.where(select.reshape((-1,) + (1,) * (data.ndim - 1)), data, 0.)
+        return op, select, unmasked, values
+
+
+    def _vertices_tree(self, vert):
+        """Get the KD-tree of vertices. Trees are built once per vertices array
+        and the last ones are kept
+        """
+        key = id(vert)
+        if (key not in self._trees) or (self._trees[key].vert is not vert):
+            self._trees[key] = VerticesTree(vert)
+            while len(self._trees) > 4:
+                self._trees.popitem(last=False)
+        self._trees.move_to_end(key)
+        return self._trees[key]
+
+
+    def _projection_operator(self, vert, xyz, contribute=False):
+        """Get the sparse projection operator of sources on vertices. It is
+        only rebuilt if sources, vertices, radius or weights changed
+        """
+        args = (vert, xyz, self.radius, contribute, self.weights, self.sigma)
+        if (self._operator is None) or not self._operator.matches(*args):
+            self._operator = ProjectionOperator(*args, tree=self._vertices_tree(vert))
+        return self._operator
 
-        # Return if it's inside :
-        return isInside
 
 
     # ________________ PROJECTION COLOR ________________
@@ -225,38 +395,51 @@ class SourcesTransform(object):
 
 
     def _array2cmap(self, x, non_zero=False, smask=None, smaskcolor=(.7, .7, .7)):
-        """Convert the array x to cmap and mesh it
+        """Convert the array x to cmap and mesh it. Only the default color of
+        the mesh is computed here, the colormap lookup is done on the GPU
         """
         # Get alpha :
         alpha = slider2opacity(self.OpacitySlider.value(), thmin=0.0, thmax=100.0, vmin=self._slmin,
                                vmax=self._slmax, tomin=self.view.minOpacity, tomax=self.view.maxOpacity)
 
-        # Get the colormap :
-        cmap = array2colormap(x[non_zero], alpha=alpha, **self.sources._cb)
+        # Get the mesh to colorize :
+        mesh = self._projection_mesh()
 
-        # Define cortical mask :
-        cortmask = np.ones((x.shape[0], 3, 4))
+        # Define cortical mask (general color of the brain) :
+        cortmask = np.ones(x.shape + (4,))
+        cortmask[..., 0:3] = mesh.get_color[..., 0:3]
         cortmask[..., 3] = alpha
 
         # Manage masked sources :
         if np.any(smask):
             cortmask[smask, 0:3] = smaskcolor[0, 0:-1]
-        cortmask[non_zero, :] = cmap
-        # cortmask = cmap
 
-        # Set ~non_zero to default brain color :
-        if np.any(smask):
-            nnz = np.logical_and(np.invert(non_zero), np.invert(smask))
-        else:
-            nnz = np.invert(non_zero)
+        # Update mesh color then send data to colorize :
+        mesh.set_color(data=cortmask)
+        mesh.set_cmap(data=x, index=non_zero, **self.sources._cb)
 
+
+    def _update_cmap(self):
+        """Update only the colormap of projected data (no data are sent)
+        """
+        self._projection_mesh().set_cmap(**self.sources._cb)
+
+
+    def _projection_vertices(self):
+        """Get the number of vertices and vertices on which sources are
+        projected
+        """
+        if self.sources.projecton == 'surface':
+            return self.atlas._nv, self.atlas.vert
+        elif self.sources.projecton == 'deep':
+            vertices = self.area.mesh.get_vertices
+            return vertices.shape[0], vertices
+
+
+    def _projection_mesh(self):
+        """Get the mesh on which sources are projected
+        """
         if self.sources.projecton == 'surface':
-            # Apply generale color to the brain :
-            cortmask[nnz, 0:3] = self.atlas.mesh.get_color[nnz, 0:3]
-            # Update mesh with cmap :
-            self.atlas.mesh.set_color(data=cortmask)
+            return self.atlas.mesh
         elif self.sources.projecton == 'deep':
-            # Apply generale color to the brain :
-            cortmask[nnz, 0:3] = self.area.mesh.get_color[nnz, 0:3]
-            # Update mesh with cmap :
-            self.area.mesh.set_color(data=cortmask)
+            return self.area.mesh
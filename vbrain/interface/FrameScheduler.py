@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+__all__ = ['FrameScheduler']
+
+
+class FrameScheduler(object):
+
+    """Coalesce ui-driven updates of visual properties. Pending updates are
+    stored per (visual, property) key and only the latest one is applied, once,
+    just before the next frame is drawn.
+
+    Args:
+        canvas: vispy.scene.SceneCanvas
+            The canvas on which updates are synchronized
+
+    Counters:
+        scheduled: number of updates requested
+        applied: number of updates applied
+        dropped: number of updates replaced by a newer one before being applied
+        merged: number of applied updates that replaced at least one older update
+        frames: number of frames that applied at least one update
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._pending = OrderedDict()
+        self.reset()
+        # Flush pending updates before the scene is drawn :
+        canvas.events.draw.connect(self.flush, position='first')
+
+
+    def __len__(self):
+        return len(self._pending)
+
+
+    def schedule(self, key, fcn, *args, **kwargs):
+        """Schedule an update for the next frame
+
+        Args:
+            key: hashable
+                Identify the updated property (e.g ('atlas', 'opacity')). An update
+                already pending for this key is replaced
+
+            fcn: callable
+                Function to call with args and kwargs
+        """
+        merged = 0
+        if key in self._pending:
+            merged = self._pending[key][3] + 1
+            self.counters['dropped'] += 1
+        self._pending[key] = (fcn, args, kwargs, merged)
+        self.counters['scheduled'] += 1
+        self.canvas.update()
+
+
+    def cancel(self, key):
+        """Cancel a pending update
+
+        Args:
+            key: hashable
+                Key of the update to cancel
+        """
+        if self._pending.pop(key, None) is not None:
+            self.counters['dropped'] += 1
+
+
+    def flush(self, event=None):
+        """Apply pending updates in the order they have been scheduled
+        """
+        if self._pending:
+            self.counters['frames'] += 1
+        while self._pending:
+            _, (fcn, args, kwargs, merged) = self._pending.popitem(last=False)
+            fcn(*args, **kwargs)
+            self.counters['applied'] += 1
+            self.counters['merged'] += bool(merged)
+
+
+    def reset(self):
+        """Reset counters
+        """
+        self.counters = {'scheduled': 0, 'applied': 0, 'dropped': 0, 'merged': 0,
+                         'frames': 0}
@@ -3,6 +3,8 @@ import vispy.visuals.transforms as vist
 
 from PyQt4.QtGui import * 
 
+from .FrameScheduler import FrameScheduler
+
 __all__ = ['ViewBase']
 
 
@@ -87,6 +89,9 @@ class ViewBase(object):
                                         resizable=True, position=(0, 250))
         self.wc = self.canvas.central_widget.add_view()
 
+        # Apply ui changes once per frame :
+        self.scheduler = FrameScheduler(self.canvas)
+
         # Initialize colorbar canvas :
         self.cbcanvas = scene.SceneCanvas(bgcolor=bgcolor)
         self.cbwc = self.cbcanvas.central_widget.add_view()
@@ -984,6 +984,9 @@ class Ui_MainWindow(object):
         spacerItem45 = QtGui.QSpacerItem(40, 20, QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Minimum)
         self.horizontalLayout_33.addItem(spacerItem45)
         self.verticalLayout_39.addLayout(self.horizontalLayout_33)
+        self.uiConnect_bundle = QtGui.QCheckBox(self.groupBox_11)
+        self.uiConnect_bundle.setObjectName(_fromUtf8("uiConnect_bundle"))
+        self.verticalLayout_39.addWidget(self.uiConnect_bundle)
         self.verticalLayout_37.addWidget(self.groupBox_11)
         self.groupBox_7 = QtGui.QGroupBox(self.page_3)
         self.groupBox_7.setObjectName(_fromUtf8("groupBox_7"))
@@ -1036,6 +1039,43 @@ class Ui_MainWindow(object):
         self.horizontalLayout_36.addLayout(self.horizontalLayout_35)
         self.verticalLayout_40.addWidget(self.uiConnect_dynControl)
         self.verticalLayout_37.addWidget(self.groupBox_7)
+        self.groupBox_20 = QtGui.QGroupBox(self.page_3)
+        self.groupBox_20.setObjectName(_fromUtf8("groupBox_20"))
+        self.verticalLayout_48 = QtGui.QVBoxLayout(self.groupBox_20)
+        self.verticalLayout_48.setObjectName(_fromUtf8("verticalLayout_48"))
+        self.horizontalLayout_52 = QtGui.QHBoxLayout()
+        self.horizontalLayout_52.setObjectName(_fromUtf8("horizontalLayout_52"))
+        self.label_25 = QtGui.QLabel(self.groupBox_20)
+        self.label_25.setObjectName(_fromUtf8("label_25"))
+        self.horizontalLayout_52.addWidget(self.label_25)
+        self.uiConnect_thMin = QtGui.QSlider(self.groupBox_20)
+        self.uiConnect_thMin.setMaximum(1000)
+        self.uiConnect_thMin.setSingleStep(1)
+        self.uiConnect_thMin.setPageStep(10)
+        self.uiConnect_thMin.setProperty("value", 0)
+        self.uiConnect_thMin.setOrientation(QtCore.Qt.Horizontal)
+        self.uiConnect_thMin.setObjectName(_fromUtf8("uiConnect_thMin"))
+        self.horizontalLayout_52.addWidget(self.uiConnect_thMin)
+        self.verticalLayout_48.addLayout(self.horizontalLayout_52)
+        self.horizontalLayout_53 = QtGui.QHBoxLayout()
+        self.horizontalLayout_53.setObjectName(_fromUtf8("horizontalLayout_53"))
+        self.label_26 = QtGui.QLabel(self.groupBox_20)
+        self.label_26.setObjectName(_fromUtf8("label_26"))
+        self.horizontalLayout_53.addWidget(self.label_26)
+        self.uiConnect_thMax = QtGui.QSlider(self.groupBox_20)
+        self.uiConnect_thMax.setMaximum(1000)
+        self.uiConnect_thMax.setSingleStep(1)
+        self.uiConnect_thMax.setPageStep(10)
+        self.uiConnect_thMax.setProperty("value", 1000)
+        self.uiConnect_thMax.setOrientation(QtCore.Qt.Horizontal)
+        self.uiConnect_thMax.setObjectName(_fromUtf8("uiConnect_thMax"))
+        self.horizontalLayout_53.addWidget(self.uiConnect_thMax)
+        self.verticalLayout_48.addLayout(self.horizontalLayout_53)
+        self.uiConnect_thInfo = QtGui.QLabel(self.groupBox_20)
+        self.uiConnect_thInfo.setAlignment(QtCore.Qt.AlignCenter)
+        self.uiConnect_thInfo.setObjectName(_fromUtf8("uiConnect_thInfo"))
+        self.verticalLayout_48.addWidget(self.uiConnect_thInfo)
+        self.verticalLayout_37.addWidget(self.groupBox_20)
         self.verticalLayout_38.addLayout(self.verticalLayout_37)
         spacerItem51 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.verticalLayout_38.addItem(spacerItem51)
@@ -1513,11 +1553,15 @@ class Ui_MainWindow(object):
         self.uiConnect_colorby.setItemText(0, _translate("MainWindow", "strength", None))
         self.uiConnect_colorby.setItemText(1, _translate("MainWindow", "count", None))
         self.label_22.setText(_translate("MainWindow", "Line width", None))
+        self.uiConnect_bundle.setText(_translate("MainWindow", "Bundle edges", None))
         self.groupBox_7.setTitle(_translate("MainWindow", "Dynamic", None))
         self.uiConnect_static.setText(_translate("MainWindow", "Static", None))
         self.uiConnect_dynamic.setText(_translate("MainWindow", "Dynamic", None))
         self.label_23.setText(_translate("MainWindow", "Min", None))
         self.label_24.setText(_translate("MainWindow", "Max", None))
+        self.groupBox_20.setTitle(_translate("MainWindow", "Threshold", None))
+        self.label_25.setText(_translate("MainWindow", "Min", None))
+        self.label_26.setText(_translate("MainWindow", "Max", None))
         self.toolBox_5.setItemText(self.toolBox_5.indexOf(self.page_3), _translate("MainWindow", "Display", None))
         self.toolBox_5.setItemText(self.toolBox_5.indexOf(self.page_4), _translate("MainWindow", "Page 2", None))
         self.QuickSettings.setTabText(self.QuickSettings.indexOf(self.q_CONNECT), _translate("MainWindow", "Connectivity", None))
@@ -42,17 +42,24 @@ class uiAtlas(object):
         """Display/hide MNI
         """
         # Get template :
-        self.atlas.template = self.uiSwitchTemplate.currentText()
+        template = self.uiSwitchTemplate.currentText()
         # Show/hide MNI :
         self.atlas.mesh.visible = self.show_MNI.isChecked()
 
         # Hemisphere Both/Left/Right :
+        hemisphere = self.atlas.hemisphere
         if self.Both_only.isChecked():
-            self.atlas.reload(hemisphere='both')
+            hemisphere = 'both'
         elif self.Lhemi_only.isChecked():
-            self.atlas.reload(hemisphere='left')
+            hemisphere = 'left'
         elif self.Rhemi_only.isChecked():
-            self.atlas.reload(hemisphere='right')
+            hemisphere = 'right'
+
+        # Reload only if the template changed, otherwise swap faces :
+        if template != self.atlas.template:
+            self.atlas.reload(template=template, hemisphere=hemisphere)
+        elif hemisphere != self.atlas.hemisphere:
+            self.atlas.set_hemisphere(hemisphere)
 
 
     def fcn_internal_external(self):
@@ -130,31 +130,40 @@ class uiCmap(object):
                 self.cb['over'] = None
             self.cb['label'] = self.q_cblabel.text()
 
-            # Interact directly with cmap :
+            # Interact directly with cmap (once per frame) :
             if self.q_cmap_interact.isChecked():
-
-                # Update sources :
                 if self.cmapSources.isChecked():
-                    # If cortical projection never run :
-                    if self.current_mask is None:
-                        self.cortical_projection()
-                    # Otherwise update colormap :
-                    else:
-                        self.sources.cbUpdateFrom(self.cb)
-                        self._array2cmap(self.current_mask, non_zero=self.current_non_zero)
-                    # Update colorbar :
-                    self.cb.cbupdate(self.current_mask, **self.cb._cb)
+                    self.view.scheduler.schedule(('sources', 'cmap'), self._cmap_sources)
                 elif self.cmapConnect.isChecked():
-                    print('PAS OK')
-                    self.connect.cbUpdateFrom(self.cb)
-                    self.connect.mesh.set_color(colorby=self.connect.colorby, dynamic=self.connect.dynamic, **self.connect._cb)
-                    self.connect.mesh.update()
-                    self.cb.cbupdate(self.connect.mesh._all_nnz, **self.cb._cb)
+                    self.view.scheduler.schedule(('connect', 'cmap'), self._cmap_connect)
 
             # except:
             #     pass
 
 
+    def _cmap_sources(self):
+        """Apply the colormap to the projection of sources
+        """
+        # If cortical projection never run :
+        if self.current_mask is None:
+            self.cortical_projection()
+        # Otherwise update colormap :
+        else:
+            self.sources.cbUpdateFrom(self.cb)
+            self._update_cmap()
+        # Update colorbar :
+        self.cb.cbupdate(self.current_mask, **self.cb._cb)
+
+
+    def _cmap_connect(self):
+        """Apply the colormap to connectivity
+        """
+        self.connect.cbUpdateFrom(self.cb)
+        self.connect.mesh.set_cmap(**self.connect._cb)
+        self.connect.mesh.update()
+        self.cb.cbupdate(self.connect.mesh._all_nnz, **self.cb._cb)
+
+
     def select_object_cmap(self):
         """
         """
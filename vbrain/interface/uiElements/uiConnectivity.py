@@ -1,3 +1,4 @@
+import numpy as np
 
 
 class uiConnectivity(object):
@@ -10,6 +11,7 @@ class uiConnectivity(object):
         self.uiConnectShow.clicked.connect(self._ShowHide)
 
         # Line width :
+        self._lw_glyph = self.connect.glyph and (self.connect.mesh.name == 'Connectivity')
         self.view.canvas.context.set_line_width(self._lw)
         self.uiConnect_lw.setValue(self._lw)
         self.uiConnect_lw.valueChanged.connect(self._update_lw)
@@ -33,12 +35,34 @@ class uiConnectivity(object):
         self.uiConnect_dynMin.valueChanged.connect(self._set_color)
         self.uiConnect_dynMax.valueChanged.connect(self._set_color)
 
+        # Edge bundling :
+        if (self.connect.mesh.name == 'Connectivity') and not self.connect.glyph:
+            self.uiConnect_bundle.setChecked(self.connect.bundling)
+            self.uiConnect_bundle.clicked.connect(self._bundle)
+            if self.connect.bundling:
+                self._bundle()
+        else:
+            self.uiConnect_bundle.setEnabled(False)
+
+        # Threshold (sliders are mapped between the minimum and maximum weight) :
+        if self.connect.mesh.name == 'Connectivity':
+            self.uiConnect_thMin.valueChanged.connect(self._threshold)
+            self.uiConnect_thMax.valueChanged.connect(self._threshold)
+            self._threshold()
+        else:
+            self.groupBox_20.setEnabled(False)
+
     def _update_lw(self):
         """Update line width
         """
         self._lw = self.uiConnect_lw.value()
-        self.view.canvas.context.set_line_width(self._lw)
-        self.view.canvas.update()
+        # Glyphs have their own width (in pixels) :
+        if self._lw_glyph:
+            self.view.scheduler.schedule(('connect', 'width'), self.connect.mesh.set_glyph,
+                                         width=self._lw)
+        else:
+            self.view.canvas.context.set_line_width(self._lw)
+            self.view.canvas.update()
 
 
     def _set_color(self):
@@ -56,6 +80,52 @@ class uiConnectivity(object):
         self.connect.mesh.update()
 
 
+    def _bundle(self):
+        """Bundle (or unbundle) connections in a background thread
+        """
+        bundle = self.uiConnect_bundle.isChecked()
+        if bundle:
+            self.progressBar.setValue(0)
+            self.progressBar.show()
+        else:
+            self.progressBar.hide()
+        self.connect.mesh.set_bundling(bundle, progress=self._bundle_progress)
+
+
+    def _bundle_progress(self, fraction):
+        """Report the progress of edge bundling
+        """
+        self.progressBar.setValue(int(100 * fraction))
+        if fraction >= 1.:
+            self.progressBar.hide()
+
+
+    def _threshold(self):
+        """Only display connections with a weight between sliders. Edges are
+        sorted by weight on the GPU, so it only updates a uniform (once per
+        frame)
+        """
+        weights = self.connect.mesh._weights
+        if not len(weights):
+            return
+        wmin, wmax = float(weights[0]), float(weights[-1])
+        lo, hi = self.uiConnect_thMin.value(), self.uiConnect_thMax.value()
+        lo, hi = min(lo, hi), max(lo, hi)
+        vmin = wmin + (wmax - wmin) * lo / 1000.
+        vmax = wmin + (wmax - wmin) * hi / 1000.
+        # Sliders at their bounds don't cut anything :
+        vmin = None if lo == 0 else vmin
+        vmax = None if hi == 1000 else vmax
+        self.view.scheduler.schedule(('connect', 'threshold'), self.connect.mesh.set_threshold,
+                                     vmin, vmax)
+        # Number of displayed connections (weights are sorted) :
+        vmin = wmin if vmin is None else vmin
+        vmax = wmax if vmax is None else vmax
+        nedges = np.searchsorted(weights, vmax, side='right') - np.searchsorted(weights, vmin)
+        self.uiConnect_thInfo.setText('[{0:.3g}, {1:.3g}] : {2} / {3} connections'.format(
+            vmin, vmax, max(nedges, 0), len(weights)))
+
+
     def _getMinMax_dyn(self):
         """
         """
@@ -38,6 +38,9 @@ class uiOpacity(object):
         self.xSlices.sliderMoved.connect(self.fcn_xyzSlice)
         self.ySlices.sliderMoved.connect(self.fcn_xyzSlice)
         self.zSlices.sliderMoved.connect(self.fcn_xyzSlice)
+        self.xInvert.clicked.connect(self.fcn_xyzSlice)
+        self.yInvert.clicked.connect(self.fcn_xyzSlice)
+        self.zInvert.clicked.connect(self.fcn_xyzSlice)
 
 
 
@@ -50,7 +53,8 @@ class uiOpacity(object):
         return slval, sl
 
     def fcn_opacity(self):
-        """Change opacity using the slider
+        """Change opacity using the slider. Opacity of each object is updated
+        once per frame
         """
         # Get slider value :
         sl = self.OpacitySlider.value()
@@ -67,39 +71,62 @@ class uiOpacity(object):
             visible = True
             deep_test = True
 
+        schedule = self.view.scheduler.schedule
+
         # Brain opacity :
-        # Get vertices and color :
         if self.o_Brain.isChecked():
-            self.atlas.mesh.set_alpha(sl_01, index=~self.atlas.mask)
-            self.atlas.mesh.visible = visible
+            schedule(('atlas', 'opacity'), self._opacity_atlas, sl_01, visible)
 
         # Sources opacity :
         if self.o_Sources.isChecked():
-            self.sources.sColor[:, 3] = sl_01
-            self.sources.edgecolor[:, 3] = sl_01
-            self.sources.mesh.visible = visible
-            self.sources.mesh.set_gl_state('translucent', depth_test=deep_test)
-            self.sources.update()
+            schedule(('sources', 'opacity'), self._opacity_sources, sl_01, visible, deep_test)
 
         # Text opacity :
         if self.o_Text.isChecked():
-            self.sources.stextcolor[:, 3] = sl_01
-            self.sources.stextmesh.opacity = sl_01
-            self.sources.stextmesh.visible = visible
-            self.sources.stextmesh.set_gl_state('translucent', depth_test=deep_test)
-            self.sources.text_update()
+            schedule(('text', 'opacity'), self._opacity_text, sl_01, visible, deep_test)
 
         # Connectivity opacity :
         if self.o_Connect.isChecked():
-            self.connect.mesh.set_opacity(sl_01)
-            self.connect.mesh.visible = visible
-            self.connect.mesh.set_gl_state('translucent', depth_test=deep_test)
+            schedule(('connect', 'opacity'), self._opacity_connect, sl_01, visible, deep_test)
 
         # Areas opacity:
         if self.o_Areas.isChecked():
-            self.area.set_alpha(sl_01)
+            schedule(('area', 'opacity'), self.area.set_alpha, sl_01)
+
+
+    def _opacity_atlas(self, alpha, visible):
+        """Set brain opacity
+        """
+        self.atlas.mesh.set_alpha(alpha, index=~self.atlas.mask)
+        self.atlas.mesh.visible = visible
 
-        self.view.canvas.update()
+
+    def _opacity_sources(self, alpha, visible, deep_test):
+        """Set sources opacity
+        """
+        self.sources.sColor[:, 3] = alpha
+        self.sources.edgecolor[:, 3] = alpha
+        self.sources.mesh.visible = visible
+        self.sources.mesh.set_gl_state('translucent', depth_test=deep_test)
+        self.sources.update()
+
+
+    def _opacity_text(self, alpha, visible, deep_test):
+        """Set text opacity
+        """
+        self.sources.stextcolor[:, 3] = alpha
+        self.sources.stextmesh.opacity = alpha
+        self.sources.stextmesh.visible = visible
+        self.sources.stextmesh.set_gl_state('translucent', depth_test=deep_test)
+        self.sources.text_update()
+
+
+    def _opacity_connect(self, alpha, visible, deep_test):
+        """Set connectivity opacity
+        """
+        self.connect.mesh.set_opacity(alpha)
+        self.connect.mesh.visible = visible
+        self.connect.mesh.set_gl_state('translucent', depth_test=deep_test)
 
 
     def fcn_coronal(self):
@@ -137,59 +164,23 @@ class uiOpacity(object):
 
 
     def fcn_xyzSlice(self):
-        """Define x, y and z slices of the brain
+        """Define x, y and z slices of the brain. Slices are clip planes
+        applied on the GPU, once per frame
         """
-        # Get checkbox position :
-        xsym = '<' if self.xInvert.isChecked() else '>'
-        ysym = '<' if self.yInvert.isChecked() else '>'
-        zsym = '<' if self.zInvert.isChecked() else '>'
+        # Get slide positions and inversions :
+        clip = (self.xSlices.value(), self.ySlices.value(), self.zSlices.value())
+        invert = (self.xInvert.isChecked(), self.yInvert.isChecked(), self.zInvert.isChecked())
 
-        # Get slide positions :
-        xsl, ysl, zsl = self.xSlices.value(), self.ySlices.value(), self.zSlices.value()
-
-        # Define a default string for all objects :
-        formatstr = 'np.array(({obj}[..., 0] {xsym} xsl) | ({obj}[..., 1] {ysym} ysl) | ({obj}[..., 2] {zsym} zsl))'
+        schedule = self.view.scheduler.schedule
 
         # Slice brain :
         if self.o_Brain.isChecked():
-            # Reset mask :
-            self.atlas.mask = np.zeros_like(self.atlas.mask)
-            # Find vertices to remove :
-            tohide = eval(formatstr.format(obj='self.atlas.vert', xsym=xsym, ysym=ysym, zsym=zsym))
-            # Update mask :
-            self.atlas.mask[tohide] = True
-            # Get vertices and color :
-            vcolor = self.atlas.mesh.get_color
-            # Update opacity for non-hide vertices :
-            vcolor[self.atlas.mask, 3] = self.view.minOpacity
-            vcolor[~self.atlas.mask, 3] = self._getOpacitySlider(tomin=self.view.minOpacity, tomax=self.view.maxOpacity)[0]
-            self.atlas.mesh.set_color(vcolor) 
-
-        # Sources/Text opacity :
+            schedule(('atlas', 'clip'), self.atlas.mesh.set_clip, clip, invert)
+
+        # Sources/Text :
         if self.o_Sources.isChecked() or self.o_Text.isChecked():
-            # Reset mask :
-            self.sources.data.mask = np.zeros_like(self.sources.data.mask)
-            # Find sources to remove :
-            tohide = eval(formatstr.format(obj='self.sources.xyz', xsym=xsym, ysym=ysym, zsym=zsym))
-            # Update mask then sources :
-            self.sources.data.mask[tohide] = True
-            if self.o_Sources.isChecked(): self.sources.update()
-            if self.o_Text.isChecked(): self.sources.text_update()
+            schedule(('sources', 'clip'), self.sources.clip.set_clip, clip, invert)
 
-        # Connectivity opacity :
+        # Connectivity :
         if self.o_Connect.isChecked():
-            # Reset mask :
-            self.connect.connect.mask = self.connect._maskbck
-            # Find sources to remove :
-            tohide = eval(formatstr.format(obj='self.sources.xyz', xsym=xsym, ysym=ysym, zsym=zsym))
-            # Update mask :
-            self.connect.connect.mask[tohide, :] = True
-            self.connect.connect.mask[:, tohide] = True
-            if len(self.connect.connect.compressed()) <= 1:
-                self.connect.mesh.visible = False
-            else:
-                self.connect.mesh.visible = True
-                self.connect.mesh.set_data(self.connect.connect)
-            
-
-        self.view.canvas.update()
+            schedule(('connect', 'clip'), self.connect.mesh.set_clip, clip, invert)
@@ -102,7 +102,8 @@ class uiSettings(object):
         new_size = (int(backp_size[0]*ratio), int(backp_size[1]*ratio))
         self.view.canvas._backend._physical_size = new_size
 
-        # Render and save :
+        # Render and save (apply pending ui changes first) :
+        self.view.scheduler.flush()
         img = self.view.canvas.render(region=self._crop)
         io.imsave(self._savename, img, format=self._extension)
 
@@ -157,7 +158,7 @@ class uiSettings(object):
 
 
     def uiSet_light(self):
-        """
+        """Update light properties (once per frame)
         """
         # Position :
         l_pos = (self.uil_posX.value(), self.uil_posY.value(), self.uil_posZ.value())
@@ -168,8 +169,9 @@ class uiSettings(object):
         # Coef :
         l_amb, l_spec = self.uil_AmbCoef.value(), self.uil_SpecCoef.value()
 
-        self.atlas.mesh.set_light(l_position=l_pos, l_color=l_col, l_intensity=l_int,
-                                  l_coefAmbient=l_amb, l_coefSpecular=l_spec)
+        self.view.scheduler.schedule(('atlas', 'light'), self.atlas.mesh.set_light,
+                                     l_position=l_pos, l_color=l_col, l_intensity=l_int,
+                                     l_coefAmbient=l_amb, l_coefSpecular=l_spec)
 
     def uiUpdate_light(self):
         """
@@ -1,5 +1,3 @@
-import vispy.visuals.transforms as vist
-
 from ...utils import textline2color, color2vb
 
 class uiSources(object):
@@ -63,8 +61,7 @@ class uiSources(object):
         """
         # Text :
         self.sources.stextmesh.visible = self.q_stextshow.isChecked()
-        t = vist.STTransform(translate=list([self.x_text.value(), self.y_text.value(), self.z_text.value()]))
-        self.sources.stextmesh.transform = t
+        self.sources.text_transform([self.x_text.value(), self.y_text.value(), self.z_text.value()])
         # Color and fontsize :
         _, self.sources.stextcolor = textline2color(self.q_stextcolor.text())
         self.sources.stextsize = self.q_stextsize.value()
@@ -1,3 +1,10 @@
 from .color import *
 from .guitools import *
-from .math import *
\ No newline at end of file
+from .math import *
+from .mesh import *
+from .cache import *
+from .projection import *
+from .playback import *
+from .distance import *
+from .graph import *
+from .volume import *
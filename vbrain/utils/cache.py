@@ -0,0 +1,271 @@
+import os
+import json
+import hashlib
+from warnings import warn
+
+import numpy as np
+
+from .mesh import vertices2indexed, mesh_normalization
+
+
+__all__ = ['file_checksum', 'array_checksum', 'load_template', 'load_arrays']
+
+
+# Increase it when the cache format changes :
+_CACHE_VERSION = 1
+
+
+def file_checksum(filename, blocksize=2**20):
+    """Get the sha1 checksum of a file
+
+    Args:
+        filename: string
+            Path to the file
+
+    Kargs:
+        blocksize: int, optional, (def: 2**20)
+            Number of bytes read at once
+
+    Return:
+        checksum: string
+            Hexadecimal checksum
+    """
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def array_checksum(*arrays):
+    """Get the sha1 checksum of arrays (content, shape and type)
+
+    Args:
+        arrays: ndarray
+            Arrays to hash
+
+    Return:
+        checksum: string
+            Hexadecimal checksum
+    """
+    sha = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        sha.update((str(array.dtype)+str(array.shape)).encode())
+        sha.update(array.data)
+    return sha.hexdigest()
+
+
+def _template_arrays(filename, scale_factor, indexed):
+    """Load a npz template and convert it into normalized float32/uint32
+    arrays, ready to be sent to buffers
+    """
+    atlas = np.load(filename)
+    faces, normals = atlas['faces'], atlas['a_normal']
+    vertices, color = atlas['a_position'], atlas['a_color']
+    # Faces index must start at zero :
+    faces = np.asarray(faces) - faces.min()
+    # Unique vertices :
+    if indexed and (vertices.ndim == 3):
+        vertices, faces, index = vertices2indexed(vertices)
+        normals = normals.reshape(-1, 3)[index, :]
+        color = color.reshape(-1, color.shape[-1])[index, :]
+    vertices, normalization = mesh_normalization(vertices, scale_factor)
+    arrays = {'vertices': vertices, 'faces': faces.astype(np.uint32),
+              'normals': np.asarray(normals, dtype=np.float32),
+              'color': np.asarray(color, dtype=np.float32)}
+    return arrays, normalization
+
+
+def _write_cache(cachefile, arrays, meta):
+    """Write arrays (.npy) and meta data (.json) of a cached template
+    """
+    for name, array in arrays.items():
+        # Temporary files are per process (concurrent builds of a cache) :
+        tmp = cachefile+'.'+name+'.'+str(os.getpid())+'.tmp'
+        mm = np.lib.format.open_memmap(tmp, mode='w+', dtype=array.dtype, shape=array.shape)
+        mm[:] = array
+        mm.flush()
+        del mm
+        os.replace(tmp, cachefile+'.'+name+'.npy')
+    # Meta data are written last so that an interrupted write is rebuilt :
+    _write_meta(cachefile, meta)
+
+
+def _write_meta(cachefile, meta):
+    """Atomically write meta data (.json) of a cached file, so that readers
+    never see a truncated file
+    """
+    tmp = cachefile+'.json.'+str(os.getpid())+'.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, cachefile+'.json')
+
+
+def _read_meta(cachefile, filename, stamp, **params):
+    """Read meta data of a cached file. None is returned if the cache is not
+    up to date (cache version, parameters or content of the source file)
+    """
+    try:
+        with open(cachefile+'.json', 'r') as f:
+            meta = json.load(f)
+        if (meta['version'] != _CACHE_VERSION) or \
+           any(meta[k] != v for k, v in params.items()):
+            return None
+        if meta['stamp'] != stamp:
+            # The file may have been touched only, so check its content :
+            if meta['checksum'] != file_checksum(filename):
+                return None
+            meta['stamp'] = stamp
+            _write_meta(cachefile, meta)
+        return meta
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+
+def load_template(filename, cachedir=None, scale_factor=1., indexed=False):
+    """Load a npz template (B1, B2, B3) through a binary cache.
+
+    The first call converts the template into uncompressed, already normalized
+    float32/uint32 arrays saved in cachedir. Next calls open those arrays with
+    np.memmap so that they can be sent straight to buffers. The cache is rebuilt
+    if the checksum of the npz file or the scale factor changed.
+
+    Args:
+        filename: string
+            Path to the npz template
+
+    Kargs:
+        cachedir: string, optional, (def: None)
+            Cache folder. If None, or if the cache can't be written, the
+            template is loaded without cache.
+
+        scale_factor: float, optional, (def: 1.)
+            Vertices are normalized between -scale_factor and scale_factor
+
+        indexed: bool, optional, (def: False)
+            Cache unique vertices (indexed mesh) instead of one vertex per
+            face corner.
+
+    Return:
+        vertices, faces, normals, color: ndarray
+            Template arrays. Vertices, faces and normals are read-only while
+            color is copy-on-write.
+
+        normalization: tuple
+            Normalization (vmin, vmax, center) of vertices (see
+            mesh_normalization).
+    """
+    names = ['vertices', 'faces', 'normals', 'color']
+    if cachedir is None:
+        arrays, normalization = _template_arrays(filename, scale_factor, indexed)
+        return tuple(arrays[k] for k in names) + (normalization,)
+
+    name = os.path.splitext(os.path.basename(filename))[0]
+    cachefile = os.path.join(cachedir, name + ('_indexed' if indexed else ''))
+    stat = os.stat(filename)
+    stamp = [stat.st_size, stat.st_mtime]
+
+    # Read meta data and check if the cache is up to date (and complete) :
+    meta = _read_meta(cachefile, filename, stamp, scale_factor=scale_factor)
+    modes = {k: 'c' if k == 'color' else 'r' for k in names}
+    if meta is not None:
+        out = _open_cache(cachefile, modes)
+        meta = None if out is None else meta
+
+    # (Re)build the cache :
+    if meta is None:
+        arrays, normalization = _template_arrays(filename, scale_factor, indexed)
+        meta = {'version': _CACHE_VERSION, 'checksum': file_checksum(filename),
+                'stamp': stamp, 'scale_factor': scale_factor,
+                'normalization': [normalization[0], normalization[1], list(normalization[2])]}
+        try:
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+            _write_cache(cachefile, arrays, meta)
+        except (IOError, OSError) as e:
+            warn("Template cache can't be written in "+cachedir+" ("+str(e)+")")
+            return tuple(arrays[k] for k in names) + (normalization,)
+        out = _open_cache(cachefile, modes)
+        if out is None:
+            return tuple(arrays[k] for k in names) + (normalization,)
+
+    vm, vM, center = meta['normalization']
+    return tuple(out[k] for k in names) + ((vm, vM, tuple(center)),)
+
+
+def _open_cache(cachefile, modes):
+    """Memory-mapped loading of cached arrays (name: mmap mode). None is
+    returned if an array is missing or can't be read
+    """
+    try:
+        return {k: np.load(cachefile+'.'+k+'.npy', mmap_mode=mode) for k, mode in modes.items()}
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _npz_arrays(filename):
+    """Load every array of a npz file as read-only arrays
+    """
+    arrays = {}
+    with np.load(filename) as f:
+        for name in f.files:
+            arrays[name] = f[name]
+            arrays[name].flags.writeable = False
+    return arrays
+
+
+def load_arrays(filename, cachedir=None):
+    """Load arrays of a npz file (e.g a label volume) through a binary cache.
+
+    The first call saves every array of the npz file as an uncompressed .npy
+    file in cachedir. Next calls open those arrays with np.memmap, so that
+    only the parts of the arrays which are read are loaded. The cache is
+    rebuilt if the checksum of the npz file changed.
+
+    Args:
+        filename: string
+            Path to the npz file
+
+    Kargs:
+        cachedir: string, optional, (def: None)
+            Cache folder. If None, or if the cache can't be written, arrays
+            are loaded in memory.
+
+    Return:
+        arrays: dict
+            Read-only arrays of the npz file (name: array). Arrays should be
+            copied before being modified.
+    """
+    if cachedir is None:
+        return _npz_arrays(filename)
+
+    name = os.path.splitext(os.path.basename(filename))[0]
+    cachefile = os.path.join(cachedir, name + '_arrays')
+    stat = os.stat(filename)
+    stamp = [stat.st_size, stat.st_mtime]
+
+    # Read meta data and check if the cache is up to date (and complete) :
+    meta = _read_meta(cachefile, filename, stamp)
+    if meta is not None:
+        out = _open_cache(cachefile, {k: 'r' for k in meta['names']})
+        meta = None if out is None else meta
+
+    # (Re)build the cache (object arrays can't be memory-mapped) :
+    if meta is None:
+        arrays = _npz_arrays(filename)
+        if any(k.dtype.hasobject for k in arrays.values()):
+            return arrays
+        meta = {'version': _CACHE_VERSION, 'checksum': file_checksum(filename),
+                'stamp': stamp, 'names': sorted(arrays.keys())}
+        try:
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir)
+            _write_cache(cachefile, arrays, meta)
+        except (IOError, OSError) as e:
+            warn("Array cache can't be written in "+cachedir+" ("+str(e)+")")
+            return arrays
+        out = _open_cache(cachefile, {k: 'r' for k in meta['names']})
+        if out is None:
+            return arrays
+    return out
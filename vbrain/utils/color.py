@@ -6,7 +6,7 @@ from warnings import warn
 
 from .math import normalize
 
-__all__ = ['color2vb', 'array2colormap', 'dynamic_color', 'color2faces', '_colormap']
+__all__ = ['color2vb', 'array2colormap', 'array2lut', 'dynamic_color', 'color2faces', '_colormap']
 
 
 def color2vb(color=None, default=(1,1,1), length=1, alpha=1.0):
@@ -144,6 +144,69 @@ def array2colormap(x, cmap='inferno', alpha=1.0, vmin=None, vmax=None,
     return x_cmap
 
 
+def array2lut(x, cmap='inferno', alpha=1.0, vmin=None, vmax=None, under=None,
+              over=None, length=256):
+    """Get the colormap look-up table (LUT) and the limits to use to colorize
+    the array x directly on the GPU. This is the equivalent of array2colormap
+    without computing the color of each element of x
+
+    Args:
+        x: array
+            Array of data. Only the minimum and maximum of x are used.
+
+    Kargs:
+        cmap: string (def: inferno)
+            Matplotlib colormap
+
+        alpha: float, (def: 1.0)
+            The opacity
+
+        vmin/vmax: float (def: None)
+            Minimum/maximum of the colormap
+
+        under/over: tuple/string (def: None)
+            Matplotlib color under vmin/over vmax
+
+        length: int, optional, (def: 256)
+            Number of colors in the look-up table
+
+    Return:
+        lut: array
+            Array of RGBA colors of shape (length, 4)
+
+        clim: tuple
+            Values mapped to the first and last color of the LUT
+
+        under/over: array
+            RGBA color to use under/over clim
+    """
+    # Get the look-up table :
+    cm = ScalarMappable(cmap=cmap)
+    cm.set_clim(vmin=0., vmax=1.)
+    lut = np.array(cm.to_rgba(np.linspace(0., 1., length), alpha=alpha), dtype=np.float32)
+
+    # Colormap limits :
+    xm, xM = (x.min(), x.max()) if np.size(x) else (0., 1.)
+    cmin = xm if vmin is None else vmin
+    cmax = xM if vmax is None else vmax
+    if cmax < cmin:
+        cmin, cmax = cmax, cmin
+    if cmax == cmin:
+        cmax = cmin + 1.
+
+    # Under/over the colorbar (only if vmin/vmax are defined) :
+    if (under is not None) and (vmin is not None):
+        under = color2vb(under, alpha=alpha)[0, :]
+    else:
+        under = lut[0, :]
+    if (over is not None) and (vmax is not None):
+        over = color2vb(over, alpha=alpha)[0, :]
+    else:
+        over = lut[-1, :]
+
+    return lut, (float(cmin), float(cmax)), under.astype(np.float32), over.astype(np.float32)
+
+
 def dynamic_color(color, x, dynamic=(0.0, 1.0)):
     """dynamic color changing
 
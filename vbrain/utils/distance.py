@@ -0,0 +1,302 @@
+import os
+from warnings import warn
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.ndimage import (binary_dilation, binary_fill_holes, map_coordinates,
+                           distance_transform_edt)
+
+from .cache import array_checksum
+
+
+__all__ = ['SignedDistanceField', 'load_sdf']
+
+
+# Increase it when the cache format or the field computation changes :
+_SDF_VERSION = 1
+
+
+class SignedDistanceField(object):
+
+    """Signed distance to a mesh sampled on a voxel grid (negative inside).
+    Distances of any point are then a trilinear interpolation of the grid.
+
+    Args:
+        vertices: ndarray
+            Vertices of the mesh of shape (N_vertices, 3) or, for de-indexed
+            meshes, (N_faces, 3, 3)
+
+    Kargs:
+        faces: ndarray, optional, (def: None)
+            Faces of shape (N_faces, 3). Required if vertices are indexed.
+
+        surface: ndarray, optional, (def: None)
+            Subset of faces used for distances (e.g faces of an hemisphere).
+            Inside/outside is always defined using every face. If None, every
+            face is used.
+
+        resolution: int, optional, (def: 96)
+            Number of voxels along the largest dimension of the mesh
+
+    The inside of the mesh is found by filling the voxelized surface.
+    Near the surface, the sign is given by the normal of the closest face.
+    """
+
+    def __init__(self, vertices, faces=None, surface=None, resolution=96):
+        vertices, faces = _mesh_arrays(vertices, faces)
+        self.resolution = resolution
+
+        # Voxel grid (with a margin, so that the grid border is outside) :
+        vm, vM = vertices.min(0), vertices.max(0)
+        self.spacing = float((vM - vm).max()) / resolution
+        self.origin = vm - 2. * self.spacing
+        self.shape = tuple((np.ceil((vM - vm) / self.spacing) + 5).astype(int))
+        grid = np.indices(self.shape, dtype=np.float32).reshape(3, -1).T
+        grid = grid * self.spacing + self.origin.astype(np.float32)
+
+        # Points on faces and sign (near the surface) of each voxel :
+        samples, normals = _surface_samples(vertices, faces, .5 * self.spacing)
+        dist, closest = self._surface_distance(samples, grid)
+        near = np.einsum('ij, ij->i', grid - samples[closest, :], normals[closest, :])
+        inside = self._inside(samples, near < 0., vertices.mean(0), grid, samples[closest, :])
+
+        field = np.where(inside, -dist, dist).reshape(self.shape).astype(np.float32)
+
+        # Distance to a subset of faces (the field of the whole mesh is kept
+        # for inside/outside) :
+        self.field, self.inner = field, None
+        if surface is not None:
+            samples, _ = _surface_samples(vertices, surface, .5 * self.spacing)
+            dist, _ = self._surface_distance(samples, grid)
+            self.field = np.where(inside, -dist, dist).reshape(self.shape).astype(np.float32)
+            self.inner = field
+
+
+    def _voxelize(self, samples):
+        """Get voxels containing samples
+        """
+        occupied = np.zeros(self.shape, dtype=bool)
+        ijk = np.round((samples - self.origin) / self.spacing).astype(int)
+        occupied[ijk[:, 0], ijk[:, 1], ijk[:, 2]] = True
+        return occupied, np.ravel_multi_index(ijk.T, self.shape)
+
+
+    def _surface_distance(self, samples, grid):
+        """Distance between each voxel and the closest sample. Far from the
+        surface, the closest sample is taken in the closest voxelized sample
+        (euclidian distance transform) and near the surface, it is found with
+        a KD-tree.
+        """
+        occupied, flat = self._voxelize(samples)
+        sample = np.zeros((occupied.size,), dtype=int)
+        sample[flat] = np.arange(samples.shape[0])
+        index = distance_transform_edt(~occupied, return_distances=False, return_indices=True)
+        closest = sample[np.ravel_multi_index(index.reshape(3, -1), self.shape)]
+        dist = np.linalg.norm(grid - samples[closest, :], axis=1)
+        # Exact closest sample near the surface :
+        band = np.where(dist < 3. * self.spacing)[0]
+        bdist, bclosest = cKDTree(samples).query(grid[band, :], distance_upper_bound=3. * self.spacing)
+        found = np.isfinite(bdist)
+        dist[band[found]], closest[band[found]] = bdist[found], bclosest[found]
+        return dist, closest
+
+
+    def _inside(self, samples, behind, center, grid, closest):
+        """Get voxels inside the mesh. Voxels far from the surface are found by
+        filling the voxelized surface and voxels near it (within one voxel)
+        using the orientation of the closest face.
+        """
+        # Voxelized surface (dilated once to close small gaps) :
+        shell = binary_dilation(self._voxelize(samples)[0])
+        far = binary_fill_holes(shell) & ~shell
+        shell = shell.ravel()
+
+        # Faces orientation, from voxels which are known to be inside. For
+        # open meshes, voxels closer to the center than their closest face :
+        reference = far.ravel()
+        if not reference.any():
+            warn("The mesh is not closed : the inside is defined relatively to its center")
+            reference = np.linalg.norm(grid - center, axis=1) < np.linalg.norm(closest - center, axis=1)
+            shell = np.ones_like(shell)
+        outward = (behind[reference].mean() >= .5) if reference.any() else True
+        near = behind if outward else ~behind
+        return np.where(shell, near, far.ravel())
+
+
+    def __call__(self, xyz):
+        return self.distance(xyz)
+
+
+    def distance(self, xyz):
+        """Signed distance of points (negative inside). Out of the grid, the
+        distance is approximated by the distance to the grid plus the distance
+        of the closest grid point.
+
+        Args:
+            xyz: ndarray
+                Points of shape (N, 3)
+
+        Return:
+            distance: ndarray
+                Signed distance of shape (N,)
+        """
+        return self._interpolate(self.field, xyz)
+
+
+    def inside(self, xyz):
+        """Return if points are inside the mesh
+
+        Args:
+            xyz: ndarray
+                Points of shape (N, 3)
+
+        Return:
+            inside: ndarray
+                Boolean array of shape (N,)
+        """
+        return self._interpolate(self.field if self.inner is None else self.inner, xyz) < 0.
+
+
+    def _interpolate(self, field, xyz):
+        """Trilinear interpolation of a field
+        """
+        xyz = np.asarray(xyz, dtype=float).reshape(-1, 3)
+        coord = (xyz - self.origin) / self.spacing
+        dist = map_coordinates(field, coord.T, order=1, mode='nearest')
+        # Points out of the grid :
+        top = np.array(self.shape) - 1
+        out = np.maximum(np.maximum(-coord, coord - top), 0.)
+        return dist + np.linalg.norm(out, axis=1) * self.spacing
+
+
+    def save(self, filename, checksum=''):
+        """Save the field (npz file)
+
+        Args:
+            filename: string
+                Path to the file
+
+        Kargs:
+            checksum: string, optional, (def: '')
+                Checksum of the mesh, to check if the file is up to date
+        """
+        tmp = filename+'.tmp.npz'
+        inner = np.zeros((0, 0, 0), dtype=np.float32) if self.inner is None else self.inner
+        np.savez(tmp, field=self.field, inner=inner, origin=self.origin, spacing=self.spacing,
+                 resolution=self.resolution, version=_SDF_VERSION, checksum=checksum)
+        os.replace(tmp, filename)
+
+
+    @classmethod
+    def load(cls, filename, checksum=None):
+        """Load a saved field
+
+        Args:
+            filename: string
+                Path to the file
+
+        Kargs:
+            checksum: string, optional, (def: None)
+                Expected checksum of the mesh. If it doesn't match, None is
+                returned
+
+        Return:
+            sdf: SignedDistanceField or None
+        """
+        with np.load(filename) as f:
+            if (int(f['version']) != _SDF_VERSION) or \
+               ((checksum is not None) and (str(f['checksum']) != checksum)):
+                return None
+            sdf = cls.__new__(cls)
+            sdf.field = f['field']
+            sdf.inner = f['inner'] if f['inner'].size else None
+            sdf.origin, sdf.spacing = f['origin'], float(f['spacing'])
+            sdf.resolution, sdf.shape = int(f['resolution']), sdf.field.shape
+        return sdf
+
+
+def load_sdf(vertices, faces=None, surface=None, resolution=96, cachedir=None, name='mesh'):
+    """Get the signed distance field of a mesh through a disk cache. The field
+    is rebuilt if the mesh or the resolution changed.
+
+    Args:
+        vertices: ndarray
+            Vertices of the mesh (see SignedDistanceField)
+
+    Kargs:
+        faces/surface: ndarray, optional, (def: None)
+            Faces of the mesh and faces used for distances
+
+        resolution: int, optional, (def: 96)
+            Number of voxels along the largest dimension of the mesh
+
+        cachedir: string, optional, (def: None)
+            Cache folder. If None, or if the cache can't be written, the field
+            is computed without cache.
+
+        name: string, optional, (def: 'mesh')
+            Name of the cached file (e.g template and hemisphere)
+
+    Return:
+        sdf: SignedDistanceField
+    """
+    if cachedir is None:
+        return SignedDistanceField(vertices, faces, surface, resolution)
+    arrays = [np.asarray(k) for k in (vertices, faces, surface) if k is not None]
+    checksum = array_checksum(*arrays)
+    cachefile = os.path.join(cachedir, name+'_sdf'+str(resolution)+'.npz')
+    try:
+        sdf = SignedDistanceField.load(cachefile, checksum)
+        if sdf is not None:
+            return sdf
+    except (IOError, OSError, ValueError, KeyError):
+        pass
+    sdf = SignedDistanceField(vertices, faces, surface, resolution)
+    try:
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        sdf.save(cachefile, checksum)
+    except (IOError, OSError) as e:
+        warn("Signed distance field can't be written in "+cachedir+" ("+str(e)+")")
+    return sdf
+
+
+def _mesh_arrays(vertices, faces=None):
+    """Get (N_vertices, 3) vertices and (N_faces, 3) faces of a mesh
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    if vertices.ndim == 3:
+        if faces is None:
+            faces = np.arange(vertices.shape[0]*3).reshape(-1, 3)
+        vertices = vertices.reshape(-1, 3)
+    elif faces is None:
+        raise ValueError("faces are required for indexed vertices")
+    return vertices, np.asarray(faces, dtype=int)
+
+
+def _surface_samples(vertices, faces, step):
+    """Sample points on faces, at most step apart, and the normal of their
+    face
+    """
+    a, b, c = [vertices[faces[:, k], :] for k in range(3)]
+    normals = np.cross(b - a, c - a)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+    # Number of subdivisions of each face :
+    edges = np.c_[np.linalg.norm(b - a, axis=1), np.linalg.norm(c - b, axis=1),
+                  np.linalg.norm(a - c, axis=1)]
+    nsub = np.maximum(np.ceil(edges.max(1) / step), 1).astype(int)
+    samples, snormals = [], []
+    for n in np.unique(nsub):
+        sel = np.where(nsub == n)[0]
+        # Barycentric coordinates of a regular grid on the face :
+        i, j = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing='ij')
+        keep = (i + j) <= n
+        u, v = i[keep] / n, j[keep] / n
+        w = 1. - u - v
+        pts = a[sel, np.newaxis, :] * w[:, np.newaxis] + b[sel, np.newaxis, :] * u[:, np.newaxis] + \
+            c[sel, np.newaxis, :] * v[:, np.newaxis]
+        # Centroid :
+        pts = np.concatenate((pts, (a[sel] + b[sel] + c[sel])[:, np.newaxis, :] / 3.), axis=1)
+        samples.append(pts.reshape(-1, 3))
+        snormals.append(np.repeat(normals[sel, :], pts.shape[1], axis=0))
+    return np.concatenate(samples), np.concatenate(snormals)
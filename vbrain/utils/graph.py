@@ -0,0 +1,362 @@
+import threading
+from warnings import warn
+from collections import OrderedDict
+
+import numpy as np
+from scipy.ndimage import gaussian_filter, map_coordinates
+
+from .cache import array_checksum
+
+
+__all__ = ['NodeStats', 'EdgeBundling']
+
+
+class NodeStats(object):
+
+    """Node statistics of a graph defined by an edge list. Every statistic is
+    computed with np.bincount, in O(N + E).
+
+    Args:
+        rows, cols: ndarray
+            Node indices of both ends of each edge, of shape (E,)
+
+    Kargs:
+        weights: ndarray, optional, (def: None)
+            Weight of each edge. If None, every weight is one.
+
+        n_nodes: int, optional, (def: None)
+            Number of nodes. If None, the largest node index plus one.
+
+    Attributes:
+        degree: ndarray
+            Number of edges reaching each node (N,)
+
+        strength: ndarray
+            Sum of weights of edges reaching each node (N,)
+    """
+
+    def __init__(self, rows, cols, weights=None, n_nodes=None):
+        self.rows = np.asarray(rows, dtype=int).ravel()
+        self.cols = np.asarray(cols, dtype=int).ravel()
+        self.weights = np.ones(self.rows.shape) if weights is None else \
+            np.asarray(weights, dtype=float).ravel()
+        if n_nodes is None:
+            n_nodes = int(max(self.rows.max(), self.cols.max())) + 1 if self.rows.size else 0
+        self.n_nodes = n_nodes
+        # Both ends of each edge, in one array :
+        self.ends = np.c_[self.rows, self.cols].ravel()
+        self.degree = np.bincount(self.ends, minlength=n_nodes)
+        self.strength = np.bincount(self.ends, weights=np.repeat(self.weights, 2),
+                                    minlength=n_nodes)
+
+
+    def __len__(self):
+        return self.n_nodes
+
+
+    def node_values(self, by='degree'):
+        """Get a node statistic
+
+        Kargs:
+            by: string/ndarray, optional, (def: 'degree')
+                Use 'degree', 'strength' or an array of node values (N,)
+
+        Return:
+            values: ndarray
+                Values of shape (N,)
+        """
+        if isinstance(by, str):
+            if by not in ['degree', 'strength']:
+                raise ValueError("by must be 'degree', 'strength' or an array of node values")
+            return getattr(self, by)
+        values = np.asarray(by)
+        if values.shape != (self.n_nodes,):
+            raise ValueError("Node values must be an array of shape "+str((self.n_nodes,)))
+        return values
+
+
+    def endpoints(self, by='degree'):
+        """Get a node statistic at both ends of each edge
+
+        Kargs:
+            by: string/ndarray, optional, (def: 'degree')
+                Node statistic (see node_values)
+
+        Return:
+            values: ndarray
+                Values of shape (2 * E,), ordered like (row_0, col_0, row_1...)
+        """
+        return self.node_values(by)[self.ends]
+
+
+    def aggregate(self, by='degree', reduce='mean'):
+        """Aggregate a node statistic over both ends of each edge
+
+        Kargs:
+            by: string/ndarray, optional, (def: 'degree')
+                Node statistic (see node_values)
+
+            reduce: string, optional, (def: 'mean')
+                Use 'sum', 'mean', 'max' or 'min'
+
+        Return:
+            values: ndarray
+                Values of shape (E,)
+        """
+        if reduce not in ['sum', 'mean', 'max', 'min']:
+            raise ValueError("reduce must be 'sum', 'mean', 'max' or 'min'")
+        ends = self.endpoints(by).reshape(-1, 2)
+        return getattr(ends, reduce)(1)
+
+
+    def edge_values(self, by='weight'):
+        """Get a value per edge
+
+        Kargs:
+            by: string, optional, (def: 'weight')
+                Use 'weight' or '<reduce>_<statistic>' (e.g 'max_degree',
+                'mean_strength', see aggregate)
+
+        Return:
+            values: ndarray
+                Values of shape (E,)
+        """
+        if by == 'weight':
+            return self.weights
+        reduce, _, stat = by.partition('_')
+        return self.aggregate(stat, reduce)
+
+
+class EdgeBundling(object):
+
+    """Kernel density edge bundling. Each edge is subdivided into a polyline
+    and, at each iteration, polyline points move toward the maximum of the
+    density of every point (sampled on a voxel grid and smoothed by a
+    gaussian kernel) before being smoothed along their edge. The kernel
+    shrinks after each iteration. Every edge is moved at once, so that an
+    iteration is O(E * n_points + grid size).
+
+    Kargs:
+        n_points: int, optional, (def: 16)
+            Number of points of each polyline (including both nodes)
+
+        iterations: int, optional, (def: 10)
+            Number of iterations
+
+        resolution: int, optional, (def: 64)
+            Number of voxels along the largest dimension of the graph
+
+        sigma: float, optional, (def: 4.)
+            Width of the first gaussian kernel (in voxels)
+
+        decay: float, optional, (def: .75)
+            Shrinking factor of the kernel after each iteration
+
+        step: float, optional, (def: .5)
+            Displacement of points at each iteration (relatively to the
+            kernel width)
+
+        smooth: float, optional, (def: .5)
+            Laplacian smoothing of polylines after each iteration (between 0
+            and 1)
+
+        weighted: bool, optional, (def: False)
+            Weight the density of each edge by its absolute weight
+
+        cache_size: int, optional, (def: 4)
+            Number of bundled graphs kept in memory
+
+    Bundled polylines are cached for a given graph and node layout.
+    """
+
+    def __init__(self, n_points=16, iterations=10, resolution=64, sigma=4., decay=.75,
+                 step=.5, smooth=.5, weighted=False, cache_size=4):
+        if n_points < 2:
+            raise ValueError("n_points must be at least 2")
+        self.n_points, self.iterations = int(n_points), int(iterations)
+        self.resolution, self.sigma, self.decay = resolution, sigma, decay
+        self.step, self.smooth, self.weighted = step, smooth, weighted
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._timer = None
+
+
+    def _key(self, pos, rows, cols, weights):
+        """Cache key of a graph, a node layout and bundling parameters
+        """
+        arrays = [np.asarray(pos, dtype=np.float32), np.asarray(rows), np.asarray(cols)]
+        if self.weighted and (weights is not None):
+            arrays.append(np.asarray(weights, dtype=float))
+        params = (self.n_points, self.iterations, self.resolution, self.sigma, self.decay,
+                  self.step, self.smooth, self.weighted)
+        return array_checksum(*arrays) + str(params)
+
+
+    def bundle(self, pos, rows, cols, weights=None, progress=None, cancelled=None):
+        """Bundle edges
+
+        Args:
+            pos: ndarray
+                Node positions of shape (N, 3)
+
+            rows, cols: ndarray
+                Node indices of both ends of each edge, of shape (E,)
+
+        Kargs:
+            weights: ndarray, optional, (def: None)
+                Weight of each edge (only used if weighted is True)
+
+            progress: callable, optional, (def: None)
+                Function progress(fraction) called after each iteration
+
+            cancelled: callable, optional, (def: None)
+                Function returning True if bundling should be stopped (None
+                is then returned)
+
+        Return:
+            polylines: ndarray
+                Bundled edges of shape (E, n_points, 3)
+        """
+        key = self._key(pos, rows, cols, weights)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        pos = np.asarray(pos, dtype=np.float32).reshape(-1, 3)
+        rows, cols = np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)
+        ne, P = len(rows), self.n_points
+
+        # Straight polylines :
+        t = np.linspace(0., 1., P, dtype=np.float32)
+        a, b = pos[rows, :], pos[cols, :]
+        polylines = a[:, np.newaxis, :] + t[np.newaxis, :, np.newaxis] * (b - a)[:, np.newaxis, :]
+
+        if ne and (P > 2) and self.iterations:
+            # Voxel grid (with a margin) :
+            vm, vM = pos.min(0), pos.max(0)
+            spacing = max(float((vM - vm).max()) / self.resolution, 1e-6)
+            origin = vm - 2. * spacing
+            shape = tuple((np.ceil((vM - vm) / spacing) + 5).astype(int))
+
+            # Contribution of each inner point to the density :
+            if self.weighted and (weights is not None):
+                w = np.abs(np.asarray(weights, dtype=float))
+                w = np.repeat(w / max(w.max(), 1e-12), P - 2)
+            else:
+                w = None
+
+            sigma = float(self.sigma)
+            for k in range(self.iterations):
+                inner = polylines[:, 1:-1, :].reshape(-1, 3)
+                coord = (inner - origin) / spacing
+                # Density and its gradient :
+                ijk = np.clip(np.round(coord).astype(int), 0, np.array(shape) - 1)
+                density = np.bincount(np.ravel_multi_index(ijk.T, shape), weights=w,
+                                      minlength=int(np.prod(shape))).reshape(shape)
+                density = gaussian_filter(density.astype(np.float32), sigma)
+                grad = np.array([map_coordinates(g, coord.T, order=1, mode='nearest')
+                                 for g in np.gradient(density)]).T
+                # Move points toward denser regions :
+                norm = np.linalg.norm(grad, axis=1, keepdims=True)
+                move = self.step * sigma * spacing * grad / np.maximum(norm, 1e-12)
+                polylines[:, 1:-1, :] += move.reshape(ne, P - 2, 3)
+                # Smooth polylines :
+                mid = .5 * (polylines[:, :-2, :] + polylines[:, 2:, :])
+                polylines[:, 1:-1, :] = (1. - self.smooth) * polylines[:, 1:-1, :] + \
+                    self.smooth * mid
+                sigma = max(sigma * self.decay, 1.)
+                if (cancelled is not None) and cancelled():
+                    return None
+                if progress is not None:
+                    progress(float(k + 1) / self.iterations)
+
+        with self._lock:
+            self._cache[key] = polylines
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return polylines
+
+
+    def start(self, pos, rows, cols, weights=None, done=None, progress=None):
+        """Bundle edges in a background thread. A previous bundling is
+        cancelled.
+
+        Args:
+            pos, rows, cols: ndarray
+                Graph to bundle (see bundle)
+
+        Kargs:
+            weights: ndarray, optional, (def: None)
+                Weight of each edge
+
+            done: callable, optional, (def: None)
+                Function done(polylines) called in the main thread once edges
+                are bundled. If bundling failed, a warning is raised and
+                polylines is None.
+
+            progress: callable, optional, (def: None)
+                Function progress(fraction) called in the main thread while
+                bundling
+        """
+        # Not imported with the module (pure numpy helpers of utils) :
+        from vispy import app
+        self.cancel()
+        generation = self._generation
+        state = {'progress': 0., 'polylines': None, 'error': None, 'finished': False}
+
+        def _cancelled():
+            return generation != self._generation
+
+        def _progress(fraction):
+            state['progress'] = fraction
+
+        def _worker():
+            try:
+                state['polylines'] = self.bundle(pos, rows, cols, weights, _progress, _cancelled)
+            except Exception as e:
+                state['error'] = e
+            finally:
+                state['finished'] = True
+
+        # Results are sent from the main thread (vispy timer) :
+        last = [None]
+
+        def _on_timer(event):
+            if _cancelled():
+                event.source.stop()
+                return
+            if state['finished']:
+                state['progress'] = 1.
+            if (progress is not None) and (state['progress'] != last[0]):
+                last[0] = state['progress']
+                progress(last[0])
+            if state['finished']:
+                event.source.stop()
+                self._timer = None
+                if state['error'] is not None:
+                    warn("Edges can't be bundled ("+repr(state['error'])+")")
+                if done is not None:
+                    done(state['polylines'])
+
+        thread = threading.Thread(target=_worker, name='visbrain-bundling')
+        thread.daemon = True
+        self._timer = app.Timer(interval=.05, connect=_on_timer, start=True)
+        thread.start()
+
+
+    def cancel(self):
+        """Cancel the running bundling
+        """
+        self._generation += 1
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+
+
+    @property
+    def running(self):
+        """Return if edges are being bundled"""
+        return self._timer is not None
@@ -2,7 +2,7 @@ import numpy as np
 from warnings import warn
 
 
-__all__ = ['normalize']
+__all__ = ['normalize', 'mask2ranges']
 
 
 def normalize(x, tomin=0.0, tomax=1.0):
@@ -40,3 +40,29 @@ def normalize(x, tomin=0.0, tomax=1.0):
     else:
         return x
 
+
+def mask2ranges(mask, gap=0):
+    """Convert a boolean mask into a list of contiguous [start, stop[ ranges
+
+    Args:
+        mask: ndarray
+            Boolean array. The array is flattened before searching ranges.
+
+    Kargs:
+        gap: int, optional, (def: 0)
+            Merge consecutive ranges separated by less than gap elements
+
+    Return:
+        ranges: ndarray
+            Array of shape (N_ranges, 2) with start and stop index of
+            each range
+    """
+    mask = np.asarray(mask, dtype=np.int8).ravel()
+    edges = np.diff(np.concatenate(([0], mask, [0])))
+    start, stop = np.where(edges == 1)[0], np.where(edges == -1)[0]
+    # Merge close ranges :
+    if (gap > 0) and (len(start) > 1):
+        keep = (start[1::] - stop[0:-1]) > gap
+        start = np.concatenate((start[0:1], start[1::][keep]))
+        stop = np.concatenate((stop[0:-1][keep], stop[-1::]))
+    return np.column_stack((start, stop))
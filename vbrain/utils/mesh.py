@@ -0,0 +1,162 @@
+import numpy as np
+from .math import normalize
+
+
+__all__ = ['vertices2indexed', 'clip2planes', 'color2packed', 'normals2packed',
+           'mesh_memory', 'mesh_normalization']
+
+
+def vertices2indexed(vertices):
+    """Convert de-indexed vertices (one vertex per face corner) into unique
+    vertices and faces
+
+    Args:
+        vertices: ndarray
+            De-indexed vertices of shape (N_faces, 3, 3)
+
+    Return:
+        vert: ndarray
+            Unique vertices of shape (N_vertices, 3)
+
+        faces: ndarray
+            Faces indexing unique vertices of shape (N_faces, 3)
+
+        index: ndarray
+            Index of the first occurence of each unique vertex in the
+            flattened de-indexed array. Use it to convert per face corner
+            normals or colors into per vertex arrays.
+    """
+    corners = vertices.reshape(-1, 3)
+    _, index, inverse = np.unique(corners, axis=0, return_index=True,
+                                  return_inverse=True)
+    faces = inverse.ravel().reshape(-1, 3).astype(np.uint32)
+    return corners[index, :], faces, index
+
+
+def clip2planes(clip=None, invert=None, far=1e10):
+    """Convert x, y and z slices into clip planes that can be sent to shaders.
+    Everything over the plane (or under if inverted) is hidden.
+
+    Kargs:
+        clip: tuple, optional, (def: None)
+            Position (x, y, z) of each plane. Use None to disable the
+            clipping along an axis.
+
+        invert: tuple, optional, (def: None)
+            Tuple of three booleans to invert the clipping along each axis
+
+        far: float, optional, (def: 1e10)
+            Position used for disabled planes
+
+    Return:
+        planes: ndarray
+            Position of each plane of shape (3,)
+
+        invert: ndarray
+            Inversion of each plane (0. or 1.) of shape (3,)
+    """
+    clip = (None, None, None) if clip is None else clip
+    invert = (False, False, False) if invert is None else invert
+    invert = np.array(invert, dtype=np.float32)
+    planes = np.array([far if k is None else k for k in clip], dtype=np.float32)
+    # Disabled and inverted planes must be put on the other side :
+    planes[np.array([k is None for k in clip]) & (invert > 0)] = -far
+    return planes, invert
+
+
+def color2packed(color):
+    """Pack RGBA colors into two floats per color. Each float contains two
+    8 bits channels (R + 256*G, B + 256*A). Integers under 2**24 are exactly
+    represented by float32, so the shader can unpack them without loss
+
+    Args:
+        color: ndarray
+            Array of RGBA colors of shape (..., 4) with values between 0 and 1
+
+    Return:
+        packed: ndarray
+            Packed colors of shape (N, 2)
+    """
+    c = np.round(255. * np.clip(color.reshape(-1, 4), 0., 1.)).astype(np.float32)
+    return np.column_stack((c[:, 0] + 256. * c[:, 1], c[:, 2] + 256. * c[:, 3]))
+
+
+def normals2packed(normals):
+    """Pack normals into a single float using a 2x12 bits octahedral encoding
+
+    Args:
+        normals: ndarray
+            Array of normals of shape (..., 3)
+
+    Return:
+        packed: ndarray
+            Packed normals of shape (N,)
+    """
+    n = normals.reshape(-1, 3).astype(np.float64)
+    n /= np.maximum(np.abs(n).sum(1), 1e-12)[:, np.newaxis]
+    # Fold the lower hemisphere :
+    sign = np.where(n[:, 0:2] >= 0., 1., -1.)
+    low = n[:, 2] < 0.
+    n[low, 0:2] = (1. - np.abs(n[low, 1::-1])) * sign[low, :]
+    # Quantize on 12 bits :
+    q = np.round((np.clip(n[:, 0:2], -1., 1.) + 1.) * 0.5 * 4095.)
+    return (q[:, 0] + 4096. * q[:, 1]).astype(np.float32)
+
+
+def mesh_memory(n_items, n_faces, compact=False):
+    """Get the memory used by buffers of a brain mesh
+
+    Args:
+        n_items: int
+            Number of vertices sent (number of unique vertices for indexed
+            meshes, 3 * number of faces otherwise)
+
+        n_faces: int
+            Number of faces
+
+    Kargs:
+        compact: bool, optional, (def: False)
+            Use packed normals and colors
+
+    Return:
+        memory: dict
+            Number of bytes of each buffer (and the total)
+    """
+    f32 = np.dtype(np.float32).itemsize
+    memory = {'a_position': 3 * f32 * n_items,
+              'a_normal': (1 if compact else 3) * f32 * n_items,
+              'a_color': (2 if compact else 4) * f32 * n_items,
+              'a_data': 2 * f32 * n_items,
+              'faces': 3 * np.dtype(np.uint32).itemsize * n_faces}
+    memory['total'] = sum(memory.values())
+    return memory
+
+
+def mesh_normalization(vertices, scale_factor=1.):
+    """Normalize vertices between -scale_factor and scale_factor and recenter
+    them around (0, 0, 0)
+
+    Args:
+        vertices: ndarray
+            Vertices of shape (..., 3)
+
+    Kargs:
+        scale_factor: float, optional, (def: 1.)
+            Normalization bound
+
+    Return:
+        vertices: ndarray
+            Normalized and recentered float32 vertices
+
+        normalization: tuple
+            Tuple (vmin, vmax, center) where vmin and vmax are the bounds of
+            the original vertices and center, the (x, y, z) translation
+            applied after normalization.
+    """
+    vertices = np.array(vertices, dtype=np.float32)
+    vm, vM = float(vertices.min()), float(vertices.max())
+    vertices = normalize(vertices, tomin=-scale_factor, tomax=scale_factor)
+    center = tuple(float(vertices[..., k].mean()) for k in range(3))
+    for k in range(3):
+        np.subtract(vertices[..., k], center[k], out=vertices[..., k])
+    return vertices, (vm, vM, center)
@@ -0,0 +1,247 @@
+import threading
+
+
+__all__ = ['Playback']
+
+
+class Playback(object):
+
+    """Playback controller (play/pause/seek/fps) of time-resolved data.
+
+    Frames are computed by blocks of consecutive time points. A background
+    thread computes the blocks ahead of the current time, so that playing
+    only applies already computed frames.
+
+    Args:
+        ntimes: int
+            Number of time points
+
+        compute: callable
+            Function compute(start, stop) returning the payload of the block
+            of time points [start, stop). It is called from the background
+            thread, so it should only do numpy computations. The payload must
+            not be None. Use compute=None if there is nothing to precompute
+            (no background thread, payloads are None).
+
+        apply: callable
+            Function apply(t, payload, i) called in the main thread to display
+            the time point t, i being its position in the block payload.
+
+    Kargs:
+        fps: float, optional, (def: 25.)
+            Number of frames per second
+
+        block: int, optional, (def: 16)
+            Number of time points per block
+
+        ahead: int, optional, (def: 3)
+            Number of blocks computed ahead of the current one
+
+        loop: bool, optional, (def: True)
+            Restart from the first time point at the end
+    """
+
+    def __init__(self, ntimes, compute, apply, fps=25., block=16, ahead=3, loop=True):
+        self.ntimes = ntimes
+        self.compute, self.apply = compute, apply
+        self.block, self.ahead, self.loop = block, ahead, loop
+        self.time = 0
+        self._blocks = {}
+        # (generation, block) being computed by either thread :
+        self._inflight = set()
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        # vispy.app is only needed (and its backend detected) here :
+        from vispy import app
+        self.timer = app.Timer(interval=1. / fps, connect=self._on_timer, start=False)
+
+
+    def __len__(self):
+        return self.ntimes
+
+
+    # ----------------------------------------------------------------------
+    # Controls
+    # ----------------------------------------------------------------------
+    def play(self, fps=None):
+        """Start playing (from the current time point)
+
+        Kargs:
+            fps: float, optional, (def: None)
+                Number of frames per second (unchanged if None)
+        """
+        if fps is not None:
+            self.set_fps(fps)
+        self._start_thread()
+        self.seek(self.time)
+        self.timer.start()
+        # Wake up the background thread :
+        with self._cond:
+            self._cond.notify_all()
+
+
+    def pause(self):
+        """Pause playing (the background thread idles)
+        """
+        self.timer.stop()
+
+
+    def seek(self, t):
+        """Display the time point t
+
+        Args:
+            t: int
+                Time index
+        """
+        self.time = int(t) % self.ntimes
+        payload, i = self._payload(self.time)
+        self.apply(self.time, payload, i)
+
+
+    def set_fps(self, fps):
+        """Set the number of frames per second
+
+        Args:
+            fps: float
+                Number of frames per second
+        """
+        self.timer.interval = 1. / fps
+
+
+    def reset(self):
+        """Forget computed blocks (e.g if data changed)
+        """
+        with self._cond:
+            self._blocks = {}
+            self._generation += 1
+            self._cond.notify_all()
+
+
+    def close(self):
+        """Stop playing and the background thread
+        """
+        self.pause()
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    @property
+    def playing(self):
+        """Return if the data are playing"""
+        return self.timer.running
+
+
+    @property
+    def fps(self):
+        """Number of frames per second"""
+        return 1. / self.timer.interval
+
+
+    # ----------------------------------------------------------------------
+    # Frames
+    # ----------------------------------------------------------------------
+    def _on_timer(self, event):
+        """Display the next time point
+        """
+        if (self.time + 1 >= self.ntimes) and not self.loop:
+            self.pause()
+        else:
+            self.seek(self.time + 1)
+
+
+    def _payload(self, t):
+        """Get the payload of the block containing t. If the background
+        thread is computing it, its result is waited for, otherwise the block
+        is computed now
+        """
+        b = t // self.block
+        if self.compute is None:
+            return None, t - b * self.block
+        with self._cond:
+            while (self._generation, b) in self._inflight:
+                self._cond.wait()
+            payload = self._blocks.get(b)
+            if payload is None:
+                task = (self._generation, b)
+                self._inflight.add(task)
+        if payload is None:
+            payload = self._run(task)
+        # Ask for next blocks :
+        with self._cond:
+            self._cond.notify_all()
+        return payload, t - b * self.block
+
+
+    def _run(self, task):
+        """Compute the block of a task (generation, block) marked in flight
+        and keep it if no reset happened meanwhile
+        """
+        generation, b = task
+        payload = None
+        try:
+            payload = self._compute_block(b)
+        finally:
+            with self._cond:
+                self._inflight.discard(task)
+                if (payload is not None) and (generation == self._generation):
+                    self._blocks[b] = payload
+                self._cond.notify_all()
+        return payload
+
+
+    def _compute_block(self, b):
+        """Compute the payload of the block b
+        """
+        start = b * self.block
+        return self.compute(start, min(start + self.block, self.ntimes))
+
+
+    def _wanted(self):
+        """Blocks to keep (current and next ones)
+        """
+        nblocks = (self.ntimes - 1) // self.block + 1
+        current = self.time // self.block
+        return [(current + k) % nblocks for k in range(min(self.ahead + 1, nblocks))]
+
+
+    def _start_thread(self):
+        """Start the background thread computing blocks
+        """
+        if (self._thread is None) and (self.compute is not None):
+            self._stop = False
+            self._thread = threading.Thread(target=self._worker, name='visbrain-playback')
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def _worker(self):
+        """Compute blocks ahead of the current one and release old ones.
+        Nothing is computed while paused
+        """
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                wanted = self._wanted()
+                for b in list(self._blocks.keys()):
+                    if b not in wanted:
+                        del self._blocks[b]
+                missing = [b for b in wanted if (b not in self._blocks) and
+                           ((self._generation, b) not in self._inflight)]
+                if (not missing) or (not self.playing):
+                    self._cond.wait()
+                    continue
+                task = (self._generation, missing[0])
+                self._inflight.add(task)
+            self._run(task)
+            # Drop blocks no longer needed (blocks computed before a reset are
+            # never kept) :
+            with self._cond:
+                if (task[1] in self._blocks) and (task[1] not in self._wanted()):
+                    del self._blocks[task[1]]
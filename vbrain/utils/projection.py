@@ -0,0 +1,223 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.sparse import csr_matrix
+
+
+__all__ = ['VerticesTree', 'ProjectionOperator']
+
+
+class VerticesTree(object):
+
+    """KD-tree over the unique vertices of a mesh, used to find vertices
+    close to sources.
+
+    Args:
+        vert: ndarray
+            Vertices of the mesh, either per face corner (N_faces, 3, 3) or
+            per vertex (N_vertices, 3)
+
+    Results are returned as flat indices of vert[..., 0], so every face
+    corner sharing a position is selected.
+    """
+
+    def __init__(self, vert):
+        self.vert = vert
+        self.shape = vert.shape[:-1]
+        corners = vert.reshape(-1, 3)
+        self.unique, inverse = np.unique(corners, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        self.tree = cKDTree(self.unique)
+        self._scale = float(np.abs(self.unique).max()) if self.unique.size else 1.
+        # Corners of each unique vertex (CSR like) :
+        self._order = np.argsort(inverse, kind='mergesort')
+        self._counts = np.bincount(inverse, minlength=self.unique.shape[0])
+        self._start = np.cumsum(self._counts) - self._counts
+
+
+    def __len__(self):
+        return self.unique.shape[0]
+
+
+    def query_radius(self, xyz, radius, contribute=False):
+        """Find vertices under radius of each source, in one batched query
+
+        Args:
+            xyz: ndarray
+                Sources coordinates of shape (N_sources, 3)
+
+            radius: float
+                Maximum distance between a source and a vertex
+
+        Kargs:
+            contribute: bool, optional, (def: False)
+                If False, a source only selects vertices in its hemisphere
+                (same sign along x)
+
+        Return:
+            source: ndarray
+                Index of the source of each (source, vertex) pair, sorted
+
+            index: ndarray
+                Flat index of the vertex (in vert[..., 0]) of each pair
+
+            dist: ndarray
+                Euclidian distance of each pair
+        """
+        xyz = np.asarray(xyz).reshape(-1, 3)
+        # Candidates (with a small margin, the exact test is done after) :
+        margin = 1e-5 * max(1., abs(radius), self._scale)
+        near = self.tree.query_ball_point(xyz, radius + margin)
+        lengths = np.array([len(k) for k in near], dtype=int)
+        source = np.repeat(np.arange(xyz.shape[0]), lengths)
+        uid = np.concatenate([np.sort(np.asarray(k, dtype=int)) for k in near]) \
+            if lengths.sum() else np.zeros((0,), dtype=int)
+
+        # Same euclidian distance (and precision) as computed on vertices :
+        dtype = (self.unique[0:1, 0] - xyz[0, 0]).dtype if xyz.size else self.unique.dtype
+        pos, xyz = self.unique.astype(dtype, copy=False), xyz.astype(dtype, copy=False)
+        x, y, z = [pos[uid, k] - xyz[source, k] for k in range(3)]
+        dist = np.sqrt(x**2 + y**2 + z**2)
+        keep = dist <= radius
+        if not contribute:
+            keep &= np.sign(pos[uid, 0]) == np.sign(xyz[source, 0])
+        source, uid, dist = source[keep], uid[keep], dist[keep]
+
+        # Expand unique vertices into face corners :
+        counts = self._counts[uid]
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        index = self._order[np.repeat(self._start[uid], counts) + within]
+        return np.repeat(source, counts), index, np.repeat(dist, counts)
+
+
+class ProjectionOperator(object):
+
+    """Sparse source-to-vertex projection operator. Neighbourhoods (vertices
+    under radius of each source) are computed once so that projecting new
+    data is a sparse matrix-vector product and projecting several datasets
+    at once (subjects, conditions, time points...) a sparse matrix-matrix
+    product.
+
+    Args:
+        vert: ndarray
+            Vertices of the mesh (N_faces, 3, 3) or (N_vertices, 3)
+
+        xyz: ndarray
+            Sources coordinates of shape (N_sources, 3)
+
+        radius: float
+            Maximum distance between a source and a vertex
+
+    Kargs:
+        contribute: bool, optional, (def: False)
+            If False, a source only reaches vertices of its hemisphere
+
+        weights: string, optional, (def: None)
+            Weight of each (vertex, source) pair. Use None (every weight is
+            one), 'gaussian' (exp(-d**2 / (2 * sigma**2))) or 'inverse'
+            (1 / d).
+
+        sigma: float, optional, (def: None)
+            Width of gaussian weights. If None, radius / 2 is used.
+
+        tree: VerticesTree, optional, (def: None)
+            KD-tree of vert (built if None)
+    """
+
+    def __init__(self, vert, xyz, radius, contribute=False, weights=None, sigma=None,
+                 tree=None):
+        if weights not in [None, 'gaussian', 'inverse']:
+            raise ValueError("weights must be None, 'gaussian' or 'inverse'")
+        self.vert = vert
+        self.xyz = np.array(xyz)
+        self.radius, self.contribute = radius, contribute
+        self.weights, self.sigma = weights, sigma
+        self.shape = vert.shape[:-1]
+
+        # Neighbourhoods :
+        tree = VerticesTree(vert) if tree is None else tree
+        source, index, dist = tree.query_radius(self.xyz, radius, contribute=contribute)
+        shape = (int(np.prod(self.shape)), self.xyz.shape[0])
+        self.adjacency = csr_matrix((np.ones(len(source)), (index, source)), shape=shape)
+
+        # Weights :
+        if weights is None:
+            self.matrix = self.adjacency
+        else:
+            if weights == 'gaussian':
+                sigma = radius / 2. if sigma is None else sigma
+                w = np.exp(-dist.astype(float)**2 / (2. * sigma**2))
+            elif weights == 'inverse':
+                w = 1. / np.maximum(dist.astype(float), 1e-6)
+            self.matrix = csr_matrix((w, (index, source)), shape=shape)
+
+
+    def matches(self, vert, xyz, radius, contribute=False, weights=None, sigma=None):
+        """Return if the operator has been built for those inputs
+        """
+        xyz = np.asarray(xyz)
+        return (vert is self.vert) and (xyz.shape == self.xyz.shape) and \
+            np.array_equal(xyz, self.xyz) and (radius == self.radius) and \
+            (contribute == self.contribute) and (weights == self.weights) and \
+            (sigma == self.sigma)
+
+
+    def _dot(self, matrix, data):
+        """Sparse product reshaped to vertices
+        """
+        data = np.asarray(data, dtype=float)
+        out = matrix.dot(data)
+        return out.reshape(self.shape + data.shape[1:])
+
+
+    def sum(self, data):
+        """Weighted sum of sources data on each vertex
+
+        Args:
+            data: ndarray
+                Data of shape (N_sources,) or (N_sources, N_datasets)
+
+        Return:
+            x: ndarray
+                Data of shape vert.shape[:-1] (+ (N_datasets,))
+        """
+        return self._dot(self.matrix, data)
+
+
+    def count(self, select=None, weighted=True):
+        """Number of sources (or sum of weights) reaching each vertex
+
+        Kargs:
+            select: ndarray, optional, (def: None)
+                Boolean array of shape (N_sources,) to select sources
+
+            weighted: bool, optional, (def: True)
+                Sum weights instead of counting sources
+        """
+        select = np.ones((self.xyz.shape[0],)) if select is None else select
+        return self._dot(self.matrix if weighted else self.adjacency, select)
+
+
+    def project(self, data, select=None):
+        """Weighted average of sources data on each vertex. Vertices reached
+        by no source are set to zero.
+
+        Args:
+            data: ndarray
+                Data of shape (N_sources,) or (N_sources, N_datasets)
+
+        Kargs:
+            select: ndarray, optional, (def: None)
+                Boolean array of shape (N_sources,) to select sources
+
+        Return:
+            x: ndarray
+                Data of shape vert.shape[:-1] (+ (N_datasets,))
+        """
+        data = np.asarray(data, dtype=float)
+        if select is not None:
+            select = np.asarray(select, dtype=float)
+            data = data * select.reshape((-1,) + (1,) * (data.ndim - 1))
+        norm = self.count(select)
+        norm = norm.reshape(norm.shape + (1,) * (data.ndim - 1))
+        return np.divide(self.sum(data), norm, out=np.zeros(self.shape + data.shape[1:]),
+                         where=norm != 0)
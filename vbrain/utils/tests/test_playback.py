@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+from vispy import app
+
+from vbrain.utils.playback import Playback
+
+
+class _Timer(object):
+
+    """Timer without event loop (frames are displayed with seek)
+    """
+
+    def __init__(self, interval=1., connect=None, start=False):
+        self.interval, self.running = interval, start
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+
+@pytest.fixture(autouse=True)
+def _timer(monkeypatch):
+    monkeypatch.setattr(app, 'Timer', _Timer)
+
+
+def _counter():
+    calls, lock = [], threading.Lock()
+
+    def compute(start, stop):
+        with lock:
+            calls.append(start)
+        time.sleep(.005)
+        return (start, stop)
+    return compute, calls
+
+
+def test_playback_frames():
+    compute, calls = _counter()
+    seen = []
+    player = Playback(100, compute, lambda t, payload, i: seen.append(payload[0] + i == t),
+                      block=8)
+    player.play()
+    for t in range(100):
+        player.seek(t)
+    player.close()
+    assert len(seen) == 101 and all(seen)
+    # Each block is computed once (block 0 again when looping) :
+    assert len(calls) <= 13 + 1
+
+
+def test_playback_idle_when_paused():
+    compute, calls = _counter()
+    player = Playback(1000, compute, lambda t, payload, i: None, block=8, ahead=3)
+    player.play()
+    time.sleep(.2)
+    player.pause()
+    # A block may still be in flight :
+    time.sleep(.05)
+    ncalls = len(calls)
+    assert ncalls <= 4
+    time.sleep(.3)
+    assert len(calls) == ncalls
+    # Seeking while paused only computes the displayed block :
+    player.seek(500)
+    time.sleep(.1)
+    assert len(calls) == ncalls + 1
+    player.close()
+
+
+def test_playback_without_compute():
+    seen = []
+    player = Playback(50, None, lambda t, payload, i: seen.append((t, payload)))
+    player.play()
+    player.seek(20)
+    player.close()
+    assert player._thread is None
+    assert seen == [(0, None), (20, None)]
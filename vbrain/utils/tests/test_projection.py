@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from scipy.spatial.distance import cdist
+
+from vbrain.utils.projection import VerticesTree, ProjectionOperator
+
+
+def _mesh(indexed, seed=0):
+    """Random mesh, per vertex (N_vertices, 3) or per face corner (N_faces,
+    3, 3) with corners shared between faces
+    """
+    rng = np.random.RandomState(seed)
+    vertices = rng.uniform(-50., 50., (300, 3))
+    if indexed:
+        return vertices
+    faces = rng.randint(0, vertices.shape[0], (500, 3))
+    return vertices[faces]
+
+
+def _sources(seed=1):
+    return np.random.RandomState(seed).uniform(-50., 50., (40, 3))
+
+
+def _brute_force(vert, xyz, radius, contribute):
+    """Reference (sources, vertices) mask and distances of the per-source
+    search (eucl <= radius, same hemisphere if not contribute)
+    """
+    corners = vert.reshape(-1, 3)
+    dist = cdist(xyz, corners)
+    mask = dist <= radius
+    if not contribute:
+        mask &= np.sign(corners[np.newaxis, :, 0]) == np.sign(xyz[:, np.newaxis, 0])
+    return mask, dist
+
+
+@pytest.mark.parametrize('indexed', [True, False])
+@pytest.mark.parametrize('contribute', [True, False])
+def test_query_radius(indexed, contribute):
+    vert, xyz, radius = _mesh(indexed), _sources(), 15.
+    source, index, dist = VerticesTree(vert).query_radius(xyz, radius, contribute=contribute)
+    mask, ref = _brute_force(vert, xyz, radius, contribute)
+    found = np.zeros(mask.shape, dtype=bool)
+    found[source, index] = True
+    assert len(source) == mask.sum()
+    np.testing.assert_array_equal(found, mask)
+    np.testing.assert_allclose(dist, ref[source, index])
+    assert np.all(np.diff(source) >= 0)
+
+
+@pytest.mark.parametrize('indexed', [True, False])
+@pytest.mark.parametrize('weights', [None, 'gaussian', 'inverse'])
+def test_projection_operator(indexed, weights):
+    vert, xyz, radius, sigma = _mesh(indexed), _sources(), 15., 4.
+    op = ProjectionOperator(vert, xyz, radius, weights=weights, sigma=sigma)
+    mask, dist = _brute_force(vert, xyz, radius, False)
+    if weights is None:
+        w = mask.astype(float)
+    elif weights == 'gaussian':
+        w = mask * np.exp(-dist**2 / (2. * sigma**2))
+    elif weights == 'inverse':
+        w = mask / np.maximum(dist, 1e-6)
+    np.testing.assert_array_equal(op.adjacency.toarray().T, mask)
+    np.testing.assert_allclose(op.matrix.toarray().T, w)
+
+    # Weighted mean of several datasets :
+    data = np.random.RandomState(2).randn(xyz.shape[0], 3)
+    norm = w.sum(0)[:, np.newaxis]
+    ref = np.divide(w.T.dot(data), norm, out=np.zeros((w.shape[1], 3)), where=norm != 0)
+    x = op.project(data)
+    assert x.shape == vert.shape[:-1] + (3,)
+    np.testing.assert_allclose(x.reshape(-1, 3), ref, atol=1e-12)
+    np.testing.assert_allclose(op.count(weighted=False).ravel(), mask.sum(0))
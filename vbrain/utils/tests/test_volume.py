@@ -0,0 +1,144 @@
+import numpy as np
+import pytest
+from vispy.geometry.isosurface import isosurface
+
+from vbrain.utils import volume
+from vbrain.utils.volume import label_crops, extract_areas, extract_labels
+
+
+def _label_volume():
+    """Tiny label volume with a label touching the border of the volume, a
+    non-convex label and two touching labels
+    """
+    idx = np.zeros((12, 10, 9), dtype=np.int32)
+    idx[0:4, 0:3, 0:4] = 1
+    idx[5:10, 2:8, 2:7] = 2
+    idx[6:9, 3:7, 3:6] = 0
+    idx[5:10, 8:10, 2:7] = 3
+    return idx
+
+
+def _triangles(vertices, faces):
+    """Triangles as a sorted array of corner coordinates, so that surfaces can
+    be compared whatever the order of vertices and faces
+    """
+    tri = np.round(np.asarray(vertices, dtype=float)[np.asarray(faces)], 5)
+    # Start each triangle at its smallest corner (orientation is kept) :
+    first = [min(range(3), key=lambda i: tuple(t[i])) for t in tri]
+    tri = np.array([np.roll(t, -k, axis=0) for t, k in zip(tri, first)]).reshape(-1, 9)
+    return tri[np.lexsort(tri.T[::-1])]
+
+
+def _uncropped(vol, idx, label):
+    """Surface of an area extracted from the whole volume (values outside the
+    area are zeroed)
+    """
+    sub = vol.copy()
+    sub[idx != label] = 0
+    return isosurface(sub, level=label)
+
+
+def test_label_crops():
+    idx = _label_volume()
+    crops = label_crops(idx, [1, 2, 3, 4])
+    assert crops[3] is None
+    assert crops[0] == (slice(0, 5), slice(0, 4), slice(0, 5))
+    for k, crop in zip([1, 2, 3], crops):
+        assert np.sum(idx[crop] == k) == np.sum(idx == k)
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_extract_areas(processes):
+    idx = _label_volume()
+    vol = idx.astype(float)
+    labels = [1, 2, 3]
+    surfaces = extract_areas(vol, idx, labels, processes=processes)
+    assert len(surfaces) == len(labels)
+    for k, (vertices, faces) in zip(labels, surfaces):
+        ref = _triangles(*_uncropped(vol, idx, k))
+        assert len(ref)
+        np.testing.assert_allclose(_triangles(vertices, faces), ref)
+
+
+def test_extract_areas_fallback(monkeypatch):
+    """Areas are extracted in the current process if the pool fails
+    """
+    def broken_pool(*args, **kwargs):
+        raise OSError('no process')
+    monkeypatch.setattr(volume, 'ProcessPoolExecutor', broken_pool)
+    idx = _label_volume()
+    vol = idx.astype(float)
+    with pytest.warns(UserWarning, match='single process'):
+        surfaces = extract_areas(vol, idx, [1, 2, 3], processes=2)
+    for k, (vertices, faces) in zip([1, 2, 3], surfaces):
+        np.testing.assert_allclose(_triangles(vertices, faces),
+                                   _triangles(*_uncropped(vol, idx, k)))
+
+
+def _two_labels():
+    """Cube split in two touching labels (2 and 5), next to a label that isn't
+    requested (7)
+    """
+    idx = np.zeros((8, 7, 6), dtype=np.int32)
+    idx[1:4, 1:5, 1:5] = 2
+    idx[4:7, 1:5, 1:5] = 5
+    idx[1:7, 5:7, 1:5] = 7
+    return idx
+
+
+def _label_ptr(face_label, labels):
+    """Range of faces of each label (faces are sorted by label)
+    """
+    pos = np.searchsorted(labels, face_label, sorter=np.argsort(labels))
+    pos = np.argsort(labels)[pos]
+    return np.concatenate(([0], np.cumsum(np.bincount(pos, minlength=len(labels)))))
+
+
+def _signed_volume(vertices, faces):
+    """Volume enclosed by a surface (positive if faces are oriented outward)
+    """
+    tri = np.asarray(vertices, dtype=float)[faces]
+    return np.sum(tri[:, 0] * np.cross(tri[:, 1], tri[:, 2])) / 6.
+
+
+@pytest.mark.parametrize('smooth', [0, 5])
+def test_extract_labels(smooth):
+    idx = _two_labels()
+    labels = [5, 2]
+    vertices, faces, face_label = extract_labels(idx, labels, smooth=smooth)
+    assert faces.shape[0] == face_label.shape[0]
+
+    # Faces are grouped by label, in the order of labels :
+    ptr = _label_ptr(face_label, labels)
+    assert ptr[-1] == faces.shape[0]
+    for num, k in enumerate(labels):
+        sl = slice(ptr[num], ptr[num + 1])
+        assert np.all(face_label[sl] == k)
+        # Vertices are only shared by faces of the same label :
+        others = np.r_[faces[0:ptr[num]].ravel(), faces[ptr[num + 1]:].ravel()]
+        assert not np.intersect1d(faces[sl].ravel(), others).size
+
+        # Watertight, consistently oriented surface (each edge is shared by two
+        # faces, once in each direction) :
+        f = faces[sl].astype(np.int64)
+        edges = np.c_[f[:, [0, 1, 2]].ravel(), f[:, [1, 2, 0]].ravel()]
+        directed = edges[:, 0] * len(vertices) + edges[:, 1]
+        reverse = edges[:, 1] * len(vertices) + edges[:, 0]
+        assert np.unique(directed).size == directed.size
+        assert np.array_equal(np.sort(directed), np.sort(reverse))
+
+        # Outward orientation (the volume is the number of voxels without
+        # smoothing) :
+        enclosed = _signed_volume(vertices, f)
+        assert enclosed > 0
+        if not smooth:
+            assert enclosed == pytest.approx(np.sum(idx == k))
+
+    # Without smoothing, vertices lie on the boundaries of voxels (voxel i
+    # spans [i - .5, i + .5]) :
+    if not smooth:
+        for num, k in enumerate(labels):
+            used = vertices[np.unique(faces[ptr[num]:ptr[num + 1]])]
+            voxels = np.array(np.nonzero(idx == k)).T
+            np.testing.assert_array_equal(used.min(0), voxels.min(0) - .5)
+            np.testing.assert_array_equal(used.max(0), voxels.max(0) + .5)
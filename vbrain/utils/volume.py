@@ -0,0 +1,307 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from warnings import warn
+
+import numpy as np
+from scipy.ndimage import find_objects
+from scipy.sparse import csr_matrix
+from vispy.geometry.isosurface import isosurface
+
+
+__all__ = ['IsosurfaceCache', 'label_crops', 'extract_areas', 'extract_labels']
+
+
+# Increase it when the cache format or the extraction changes :
+_ISO_VERSION = 1
+
+
+class IsosurfaceCache(object):
+
+    """Cache of surfaces extracted (marching cubes) from a volume, in memory
+    and on disk. A surface is identified by a key (structure, region, level,
+    checksum), the checksum being the one of the volume.
+
+    Kargs:
+        cachedir: string, optional, (def: None)
+            Cache folder. If None, surfaces are only cached in memory.
+
+        max_faces: int, optional, (def: 5000000)
+            Maximum number of faces kept in memory. Least recently used
+            surfaces are dropped first.
+    """
+
+    def __init__(self, cachedir=None, max_faces=5000000):
+        self.cachedir = cachedir
+        self.max_faces = max_faces
+        self._memory = OrderedDict()
+        self._nfaces = 0
+
+
+    def __len__(self):
+        return len(self._memory)
+
+
+    def __contains__(self, key):
+        return (key in self._memory) or os.path.isfile(self._filename(key))
+
+
+    def _filename(self, key):
+        """Cached file of a surface
+        """
+        structure, region, level, checksum = key
+        name = '{0}_{1}_{2:g}_{3}.npz'.format(structure, region, float(level), checksum)
+        return os.path.join(self.cachedir or '', 'isosurface', name)
+
+
+    def get(self, key):
+        """Get a cached surface
+
+        Args:
+            key: tuple
+                Key (structure, region, level, checksum) of the surface
+
+        Return:
+            vertices, faces: ndarray or None
+                Cached (read-only) surface, or None if it is not cached
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if self.cachedir is None:
+            return None
+        try:
+            with np.load(self._filename(key)) as f:
+                if int(f['version']) != _ISO_VERSION:
+                    return None
+                surface = (f['vertices'], f['faces'])
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        self._remember(key, surface)
+        return self._memory[key]
+
+
+    def put(self, key, vertices, faces):
+        """Cache a surface
+
+        Args:
+            key: tuple
+                Key (structure, region, level, checksum) of the surface
+
+            vertices, faces: ndarray
+                Vertices (N_vertices, 3) and faces (N_faces, 3) of the surface
+        """
+        self._remember(key, (vertices, faces))
+        if self.cachedir is None:
+            return
+        filename = self._filename(key)
+        try:
+            if not os.path.isdir(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            tmp = filename+'.tmp.npz'
+            np.savez(tmp, vertices=vertices, faces=faces, version=_ISO_VERSION)
+            os.replace(tmp, filename)
+        except (IOError, OSError) as e:
+            warn("Surface can't be written in "+self.cachedir+" ("+str(e)+")")
+
+
+    def surface(self, key, vol, level):
+        """Get a cached surface or extract it (marching cubes)
+
+        Args:
+            key: tuple
+                Key (structure, region, level, checksum) of the surface
+
+            vol: ndarray or callable
+                Volume, or a function returning it (only called if the surface
+                has to be extracted)
+
+            level: float
+                Level of the surface
+
+        Return:
+            vertices, faces: ndarray
+                Cached (read-only) surface
+        """
+        surface = self.get(key)
+        if surface is None:
+            vertices, faces = isosurface(vol() if callable(vol) else vol, level=level)
+            self.put(key, vertices, faces)
+            surface = self._memory[key]
+        return surface
+
+
+    def _remember(self, key, surface):
+        """Keep a read-only surface in memory and drop old ones
+        """
+        vertices, faces = [np.asarray(k) for k in surface]
+        vertices.flags.writeable, faces.flags.writeable = False, False
+        if key in self._memory:
+            self._nfaces -= self._memory.pop(key)[1].shape[0]
+        self._memory[key] = (vertices, faces)
+        self._nfaces += faces.shape[0]
+        while (self._nfaces > self.max_faces) and (len(self._memory) > 1):
+            self._nfaces -= self._memory.popitem(last=False)[1][1].shape[0]
+
+
+def label_crops(idx, labels):
+    """Get the bounding box of labels in a label volume (single pass over
+    the volume), with a margin of one voxel inside the volume
+
+    Args:
+        idx: ndarray
+            Label volume (integers)
+
+        labels: list
+            Labels to find
+
+    Return:
+        crops: list
+            Tuple of slices of each label (None for missing labels)
+    """
+    labels = [int(k) for k in labels]
+    objects = find_objects(np.asarray(idx).astype(np.intp, copy=False), max_label=max(labels + [0]))
+    crops = []
+    for k in labels:
+        box = objects[k - 1] if k >= 1 else None
+        if box is None:
+            crops.append(None)
+        else:
+            crops.append(tuple(slice(max(sl.start - 1, 0), min(sl.stop + 1, n))
+                               for sl, n in zip(box, idx.shape)))
+    return crops
+
+
+def _extract_area(args):
+    """Extract the surface of one area from its cropped volume (worker)
+    """
+    vol, level, origin = args
+    vertices, faces = isosurface(vol, level=level)
+    return vertices + np.asarray(origin, dtype=vertices.dtype), faces
+
+
+def extract_areas(vol, idx, labels, levels=None, processes=None):
+    """Extract the surface of several areas of a label volume. Each area is
+    cropped to its bounding box and areas are extracted in parallel (process
+    pool). Surfaces are returned in the order of labels.
+
+    Args:
+        vol: ndarray
+            Volume of values
+
+        idx: ndarray
+            Label volume (same shape as vol)
+
+        labels: list
+            Labels of areas to extract
+
+    Kargs:
+        levels: list, optional, (def: None)
+            Level of the surface of each area. If None, the label is used.
+
+        processes: int, optional, (def: None)
+            Number of processes. If None, the number of CPUs. Use 1 to
+            extract areas in the current process.
+
+    Return:
+        surfaces: list
+            Vertices (N_vertices, 3) and faces (N_faces, 3) of each area
+    """
+    levels = labels if levels is None else levels
+    # Cropped volume of each area (values outside the area are zeroed) :
+    tasks = []
+    for k, level, crop in zip(labels, levels, label_crops(idx, labels)):
+        if crop is None:
+            tasks.append((np.zeros((2, 2, 2), dtype=vol.dtype), level, (0, 0, 0)))
+            continue
+        sub = np.where(idx[crop] == k, vol[crop], 0)
+        tasks.append((sub, level, tuple(sl.start for sl in crop)))
+
+    processes = os.cpu_count() if processes is None else processes
+    if (processes or 1) > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as pool:
+                return list(pool.map(_extract_area, tasks))
+        except (OSError, RuntimeError) as e:
+            warn("Areas are extracted in a single process ("+str(e)+")")
+    return [_extract_area(k) for k in tasks]
+
+
+def extract_labels(idx, labels, smooth=5):
+    """Extract the boundary surface of several labels in a single pass over
+    the label volume. Faces are placed between each voxel of a requested
+    label and its neighbours of another label, so that each label gets its
+    own closed surface. Surfaces are then smoothed (Taubin smoothing, which
+    doesn't shrink them).
+
+    Args:
+        idx: ndarray
+            Label volume (integers)
+
+        labels: list
+            Requested labels
+
+    Kargs:
+        smooth: int, optional, (def: 5)
+            Number of smoothing iterations
+
+    Return:
+        vertices: ndarray
+            Vertices of shape (N_vertices, 3), in voxel coordinates
+
+        faces: ndarray
+            Faces of shape (N_faces, 3), sorted by label (in the order of
+            labels)
+
+        face_label: ndarray
+            Label of each face (N_faces,)
+    """
+    idx = np.asarray(idx)
+    labels = np.asarray(labels, dtype=int).ravel()
+    # Rank of each voxel in requested labels (0 for other labels) :
+    rank = np.zeros((max(int(idx.max()), int(labels.max(initial=0))) + 1,), dtype=np.int32)
+    rank[labels] = np.arange(1, len(labels) + 1)
+    voxels = np.pad(rank[np.clip(idx, 0, None)], 1, mode='constant')
+    lattice = tuple(np.array(voxels.shape) + 1)
+
+    # Boundary faces along each axis (quads of 4 lattice points) :
+    quads, franks = [], []
+    for a in range(3):
+        u, v = (a + 1) % 3, (a + 2) % 3
+        lower = voxels[tuple(slice(0, -1) if k == a else slice(None) for k in range(3))]
+        upper = voxels[tuple(slice(1, None) if k == a else slice(None) for k in range(3))]
+        ea, eu, ev = [np.eye(3, dtype=int)[k] for k in (a, u, v)]
+        corners = np.array([ea, ea + eu, ea + eu + ev, ea + ev])
+        for voxel, other, order in [(lower, upper, [0, 1, 2, 3]), (upper, lower, [3, 2, 1, 0])]:
+            found = (voxel > 0) & (voxel != other)
+            base = np.array(np.nonzero(found)).T
+            q = base[:, np.newaxis, :] + corners[np.newaxis, order, :]
+            quads.append(np.ravel_multi_index(q.reshape(-1, 3).T, lattice).reshape(-1, 4))
+            franks.append(voxel[found])
+    quads, franks = np.concatenate(quads), np.concatenate(franks)
+
+    # Sort faces by label :
+    order = np.argsort(franks, kind='mergesort')
+    quads, franks = quads[order], franks[order]
+
+    # Vertices are shared inside a label only :
+    key = franks[:, np.newaxis].astype(np.int64) * int(np.prod(lattice)) + quads
+    ukey, inverse = np.unique(key.ravel(), return_inverse=True)
+    quads = inverse.reshape(-1, 4)
+    point = ukey % int(np.prod(lattice))
+    vertices = np.array(np.unravel_index(point, lattice)).T.astype(np.float32) - 1.5
+    faces = np.c_[quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]].reshape(-1, 3)
+    face_label = labels[np.repeat(franks, 2) - 1]
+
+    # Taubin smoothing :
+    if smooth and len(vertices):
+        edges = np.c_[quads, quads[:, [1, 2, 3, 0]]].reshape(-1, 2)
+        n = len(vertices)
+        adj = csr_matrix((np.ones(2 * len(edges)), (np.r_[edges[:, 0], edges[:, 1]],
+                                                      np.r_[edges[:, 1], edges[:, 0]])), shape=(n, n))
+        adj.data[:] = 1.
+        adj = csr_matrix(adj.multiply(1. / np.asarray(adj.sum(1))))
+        for _ in range(smooth):
+            for factor in (.5, -.53):
+                vertices += factor * (adj.dot(vertices) - vertices)
+    return vertices.astype(np.float32), faces.astype(np.uint32), face_label
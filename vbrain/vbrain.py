@@ -46,6 +46,21 @@ class vbrain(uiInit, uiElements, elements):
         a_shading: string, (def: 'smooth')
             Shading method to use for the brain. Switch between 'smooth', 'flat' or None
 
+        a_indexed: bool, (def: False)
+            Use an indexed mesh for the brain. Each unique vertex is only stored once
+            and faces are drawn through an index buffer, which divides the memory
+            used by the brain by three. In that case, colors and opacity are defined
+            per vertex.
+
+        a_compact: bool, (def: False)
+            Send packed normals (one float) and packed colors (two floats) to the GPU
+            instead of three and four floats. Use atlas.memory_report() to compare the
+            memory used by each template.
+
+        a_gpu_cache: float, (def: 256.)
+            Maximum memory (in Mo) used to keep templates on the GPU. Switching back to
+            a template that is still resident doesn't reload nor upload it again.
+
         s_xyz: ndarray, (def: None)
             Array of talairach or MNI coordinates to display sources
             into the brain. The shape of the array must be (N, 3) where
@@ -55,7 +70,8 @@ class vbrain(uiInit, uiElements, elements):
             Add some data to sources. As a consequence, the radius of each
             source will be a function of s_data. must be an array of shape
             (N,). If s_data is None, all sources will have the same value. The parameter
-            s_data can be masked using numpy.ma module.
+            s_data can be masked using numpy.ma module. Use an array of shape
+            (N, N_times) for time-resolved data (see s_play, s_pause, s_seek).
 
         s_color: string/list/ndarray, (def: 'red')
             Color of each source sphere. If s_color is a single string,
@@ -98,6 +114,9 @@ class vbrain(uiInit, uiElements, elements):
             Project sources activity either on surface or, if displayed,
             on deep structures.
 
+        s_fps: float, optional, (def: 25.)
+            Number of frames per second used to play time-resolved s_data.
+
         s_mask: ndarray, optional, (def: None)
             Vector of boolean values, with the same length as the length of s_xyz.
             Use this parameter to mask some sources but keep it displayed.
@@ -109,19 +128,49 @@ class vbrain(uiInit, uiElements, elements):
             Connections between sources. Define N sources location using s_xyz of
             shape (N, 3). Then, c_connect must be a (N, N) array defining each value of
             connection between all sources. The diagonal is going to be systematically ignored.
+            For large graphs, c_connect can also be a scipy.sparse (N, N) matrix or an edge
+            list, either a tuple of arrays (i, j, weight) or an array of shape (E, 3).
 
         c_select: ndarray, (def: None)
             Select relevant connections do display. This array should be composed of 0 and 1
             and must have the same shape as c_connect. Alternatively, set a mask to c_connect
-            to have the same effect without using this parameter.
+            to have the same effect without using this parameter. For an edge list, c_select
+            is a boolean array of shape (E,).
 
         c_dynamic: tuple, optional, (def: None)
             Control the dynamic opacity. For example, if c_dynamic=(0, 1),
             strong connections will be more opaque than weak connections.
 
+        c_compact: bool, optional, (def: False)
+            Pack the data (16 bits) and the opacity (8 bits) of each connection into a
+            single float before sending it to the GPU.
+
+        c_bundling: bool, optional, (def: False)
+            Bundle connections (kernel density edge bundling). Bundles are computed in a
+            background thread and cached for a given graph and node positions.
+
         c_linewidth: float, optional, (def: 4.0)
             Linewidth of connectivity lines.
 
+        c_glyph: bool, optional, (def: False)
+            Draw connections as instanced glyphs (ribbons) instead of lines. Glyphs support
+            a width per connection, curved connections and arrowheads. It requires
+            vispy >= 0.6 (connections are drawn as lines otherwise), PyOpenGL and the
+            full OpenGL backend of vispy, selected before creating the brain with
+            vispy.gloo.gl.use_gl('gl+').
+
+        c_widthby: string, optional, (def: None)
+            With glyphs, scale the width of connections by 'strength' (weight of the
+            connection) or a statistic of both nodes (e.g 'max_degree', 'mean_strength').
+
+        c_curvature: float/ndarray, optional, (def: 0.)
+            With glyphs, curvature of connections (0 for straight connections). Use a
+            float or an array with the curvature of each connection.
+
+        c_arrows: bool, optional, (def: False)
+            With glyphs, draw an arrowhead at the second node of each connection (directed
+            graphs).
+
         cmap: string, (def: 'inferno')
             Matplotlib colormap name.
 
@@ -134,6 +183,13 @@ class vbrain(uiInit, uiElements, elements):
         t_radius: int/float, (def: 10)
             The projection radius to use (depending on coordinates type)
 
+        t_weights: string, (def: None)
+            Weight of each source on the vertices it reaches during the projection.
+            Use None (same weight), 'gaussian' or 'inverse' (inverse distance).
+
+        t_sigma: float, (def: None)
+            Width of gaussian weights (t_radius/2 if None).
+
         ui_bgcolor: string/tuple, (def: (0.09, 0.09, 0.09))
             Backgroud color of the ui
 
@@ -1,8 +1,10 @@
 import numpy as np
 from warnings import warn
+from collections import OrderedDict
 
 from vispy import gloo
 from vispy.visuals import Visual
+from vispy.visuals.shaders import Function
 from vispy.geometry import MeshData
 import vispy.visuals.transforms as vist
 
@@ -22,13 +24,66 @@ varying vec3 v_normal;
 
 void main() {
     v_position = $a_position;
-    v_normal = $a_normal;
-    v_color = $a_color * $u_color;
+    v_normal = $unpack_normal($a_normal);
+
+    // Colormap lookup for vertices with data :
+    vec4 color = $unpack_color($a_color);
+    if (($u_use_lut > 0.5) && ($a_data.y > 0.5)) {
+        float t = ($data_value($a_data) - $u_clim.x) / ($u_clim.y - $u_clim.x);
+        // Under/over colors keep their own transparency (e.g transparent under) :
+        if (t < 0.) {
+            color = vec4($u_under.rgb, color.a * $u_under.a);
+        } else if (t > 1.) {
+            color = vec4($u_over.rgb, color.a * $u_over.a);
+        } else {
+            color.rgb = texture2D($u_lut, vec2(t, 0.5)).rgb;
+        }
+    }
+
+    v_color = color * $u_color;
     gl_Position = $transform(vec4($a_position, 1));
 }
 """
 
 
+# Normals and colors decoding (float32 or packed) :
+NORMAL_FLOAT = "vec3 normal_float(vec3 normal) {return normal;}"
+
+COLOR_FLOAT = "vec4 color_float(vec4 color) {return color;}"
+
+NORMAL_PACKED = """
+vec3 normal_packed(float code) {
+    float v = floor(code / 4096.);
+    vec2 e = vec2(code - v * 4096., v) / 4095. * 2. - 1.;
+    vec3 normal = vec3(e, 1. - abs(e.x) - abs(e.y));
+    if (normal.z < 0.) {
+        vec2 s = vec2(normal.x >= 0. ? 1. : -1., normal.y >= 0. ? 1. : -1.);
+        normal.xy = (1. - abs(normal.yx)) * s;
+    }
+    return normalize(normal);
+}
+"""
+
+COLOR_PACKED = """
+vec4 color_packed(vec2 code) {
+    vec2 hi = floor(code / 256.);
+    return vec4(code.x - 256. * hi.x, hi.x, code.y - 256. * hi.y, hi.y) / 255.;
+}
+"""
+
+
+# Data to colorize (per vertex attribute or current time point of a movie).
+# Movie textures are made of one (height, width) tile per time point :
+DATA_ATTRIBUTE = "float data_attribute(vec2 data) {return data.x;}"
+
+DATA_MOVIE = """
+float data_movie(vec2 data) {
+    vec2 pos = vec2($a_texcoord.x, ($a_texcoord.y + $u_row) / $u_height);
+    return texture2D($u_movie, pos).r;
+}
+"""
+
+
 FRAG_SHADER = """
 #version 120
 varying vec3 v_position;
@@ -37,6 +92,13 @@ varying vec3 v_normal;
 
 void main() {
 
+    // ----------------- Clip planes -----------------
+    vec3 clip_sign = 1. - 2. * $u_clip_invert;
+    if (any(greaterThan(clip_sign * v_position, clip_sign * $u_clip))) {
+        discard;
+    }
+
+
     // ----------------- Ambient light -----------------
     vec3 ambientLight = $u_coefAmbient * v_color.rgb * $u_light_intensity;
 
@@ -100,6 +162,19 @@ class BrainMeshVisual(Visual):
         name: type, optional, (def: default)
             description 
 
+        indexed: bool, optional, (def: False)
+            If True, the mesh keep one vertex per unique position and is drawn
+            using an index buffer. Colors and alpha are then defined per vertex
+            (N_vertices, 4) instead of per face corner (N_faces, 3, 4).
+
+        compact: bool, optional, (def: False)
+            If True, normals are packed into one float (octahedral encoding)
+            and RGBA colors into two floats (8 bits per channel) before being
+            sent to the GPU. Positions are kept in float32.
+
+        normalization: tuple, optional, (def: None)
+            Normalization of already normalized vertices (see set_data).
+
     Return
         name: description
     """
@@ -115,7 +190,8 @@ class BrainMeshVisual(Visual):
 
     def __init__(self, vertices=None, faces=None, normals=None, vertex_colors=None, camera=None,
                  meshdata=None, l_position=(1., 1., 1.), l_color=(1., 1., 1., 1.), l_intensity=(1., 1., 1.),
-                 l_coefAmbient=0.07, l_coefSpecular=0.5, scale_factor=10, hemisphere='both', recenter=True):
+                 l_coefAmbient=0.07, l_coefSpecular=0.5, scale_factor=10, hemisphere='both', recenter=True,
+                 indexed=False, compact=False, normalization=None):
         Visual.__init__(self, vcode=VERT_SHADER, fcode=FRAG_SHADER)
 
         # Usefull variables :
@@ -123,18 +199,57 @@ class BrainMeshVisual(Visual):
         self._btransform = vist.ChainTransform([vist.NullTransform()])
 
         # Define buffers
-        self._vertices = gloo.VertexBuffer(np.zeros((0, 3), dtype=np.float32))
-        self._normals = None
-        self._faces = gloo.IndexBuffer()
-        self._colors = gloo.VertexBuffer(np.zeros((0, 4), dtype=np.float32))
-        self._normals = gloo.VertexBuffer(np.zeros((0, 3), dtype=np.float32))
+        self._compact = compact
+        self._new_buffers()
+        if compact:
+            self.shared_program.vert['unpack_normal'] = Function(NORMAL_PACKED)
+            self.shared_program.vert['unpack_color'] = Function(COLOR_PACKED)
+        else:
+            self.shared_program.vert['unpack_normal'] = Function(NORMAL_FLOAT)
+            self.shared_program.vert['unpack_color'] = Function(COLOR_FLOAT)
         self._color_changed = False
         self._hemisphere = hemisphere
+        self._hemi_faces, self._hemi_buffers = {}, {}
         self._recenter = recenter
+        self._indexed = indexed
+
+        # Partial color uploads. Colors that changed are tracked in a dirty
+        # mask. Ranges separated by less than _upload_gap items are merged and
+        # the full buffer is sent if more than _upload_ratio of it changed :
+        self._dirty = None
+        self._upload_gap = 64
+        self._upload_ratio = 0.5
+        self._frame_bytes, self._upload_bytes = 0, 0
+
+        # GPU colormap. Each vertex has a (data, use_colormap) pair and the
+        # colormap is a look-up table texture :
+        self._lut = gloo.Texture2D(np.zeros((1, 256, 4), dtype=np.float32),
+                                   interpolation='linear', wrapping='clamp_to_edge')
+        self._cmapData, self._datarange = None, (0., 1.)
+        self._use_lut = False
+        self._cmap = array2lut(np.array(self._datarange))
+        self._cmap_changed, self._cmapdata_changed = False, False
+        self._vertsize = None
+
+        # Movie of data (N_vertices, N_times) sent once as float textures,
+        # chunked along time if needed. Changing the time is a uniform update :
+        self._data_attribute = Function(DATA_ATTRIBUTE)
+        self._data_movie = Function(DATA_MOVIE)
+        self.shared_program.vert['data_value'] = self._data_attribute
+        self._movie, self._movie_tex, self._movie_coord = None, [], None
+        self._movie_layout, self._movie_maxsize, self._movie_chunk = None, None, None
+        self._time = 0
+        self._movie_changed, self._time_changed = False, False
+
+        # Meshes kept resident on the GPU (LRU, see cache_store/cache_restore) :
+        self._resident = OrderedDict()
+        self._resident_key = None
+        self._resident_cap = 256 * 1024**2
 
         # Set the data :
         BrainMeshVisual.set_data(self, vertices=vertices, faces=faces, normals=normals,
-                                 meshdata=meshdata, vertex_colors=vertex_colors, hemisphere=hemisphere)
+                                 meshdata=meshdata, vertex_colors=vertex_colors, hemisphere=hemisphere,
+                                 normalization=normalization)
 
         # Set the light :
         BrainMeshVisual.set_light(self, l_position=l_position, l_color=l_color, l_intensity=l_intensity,
@@ -143,6 +258,9 @@ class BrainMeshVisual(Visual):
         # Set camera :
         BrainMeshVisual.set_camera(self, camera)
 
+        # No clipping by default :
+        BrainMeshVisual.set_clip(self)
+
 
         self.set_gl_state('translucent', depth_test=True, cull_face=False, blend=True,
                           blend_func=('src_alpha', 'one_minus_src_alpha'))
@@ -160,11 +278,27 @@ class BrainMeshVisual(Visual):
         self._data_changed = True
         self.update()
 
-    def mesh_color_changed(self):
-        """Tell if color changed"""
+    def mesh_color_changed(self, index=None):
+        """Tell if color changed
+
+        Kargs:
+            index: ndarray, optional, (def: None)
+                Index of colors that changed. If None, the entire color
+                buffer is going to be uploaded.
+        """
+        if index is None:
+            self._dirty = None
+        elif self._dirty is not None:
+            self._dirty.reshape(self._colFaces.shape[:-1])[index] = True
         self._color_changed = True
         self.update()
 
+    def mesh_cmap_changed(self, data=False):
+        """Tell if the colormap (or data to colorize) changed"""
+        self._cmap_changed = True
+        self._cmapdata_changed = self._cmapdata_changed or data
+        self.update()
+
     def mesh_light_changed(self):
         """Tell if light changed"""
         self._light_changed = True
@@ -176,7 +310,8 @@ class BrainMeshVisual(Visual):
     # ----------------------------------------------------------------------
     # ----------------------------------------------------------------------
     def set_data(self, vertices=None, faces=None, normals=None, invert_normals=False,
-                 meshdata=None, vertex_colors=None, color=None, hemisphere='both'):
+                 meshdata=None, vertex_colors=None, color=None, hemisphere='both',
+                 normalization=None):
         """Set data to the mesh
 
         Kargs:
@@ -204,8 +339,21 @@ class BrainMeshVisual(Visual):
                 Alternatively, you can specify a uniform color.
 
             hemisphere: string, optional, (def: 'both')
-                Choose if an hemisphere has to be selected ('both', 'left', 'right')
+                Choose if an hemisphere has to be selected ('both', 'left', 'right').
+                Faces of each hemisphere are computed once, so that switching
+                hemisphere (see set_hemisphere) only swaps the index buffer. If
+                None, the current hemisphere is kept.
+
+            normalization: tuple, optional, (def: None)
+                Normalization (vmin, vmax, center) returned by mesh_normalization.
+                If not None, vertices are considered as already normalized and
+                recentered (e.g cached templates) and only the transformation is
+                defined.
         """
+        # Keep buffers of a resident mesh untouched :
+        self._cache_leave()
+        self._movie_clear()
+
         # -------------- Check inputs --------------
         # Check if faces index start at zero (Matlab like):
         if faces.min() != 0:
@@ -224,74 +372,90 @@ class BrainMeshVisual(Visual):
 
         # Only vertices and faces :
         if (vertices is not None) and (faces is not None) and (normals is None):
-            md = MeshData(vertices=vertices, faces=faces)
-            vertices = md.get_vertices(indexed='faces')
-            normals = md.get_vertex_normals(indexed='faces')
+            meshdata = MeshData(vertices=vertices, faces=faces)
 
         # Custom meshdata :
         if meshdata is not None:
-            vertices = meshdata.get_vertices(indexed='faces')
             faces = meshdata.get_faces()
-            normals = meshdata.get_vertex_normals(indexed='faces')
+            if self._indexed:
+                vertices = meshdata.get_vertices()
+                normals = meshdata.get_vertex_normals()
+            else:
+                vertices = meshdata.get_vertices(indexed='faces')
+                normals = meshdata.get_vertex_normals(indexed='faces')
+
+        # Indexed mode with de-indexed vertices (like default templates) :
+        if self._indexed and (vertices.ndim == 3):
+            vertices, faces, index = vertices2indexed(vertices)
+            normals = normals.reshape(-1, 3)[index, :]
+            if (vertex_colors is not None) and (vertex_colors.ndim == 3):
+                vertex_colors = vertex_colors.reshape(-1, 4)[index, :]
 
 
         # -------------- Vertices color --------------
+        # Color shape (per vertex or per face corner) :
+        if self._indexed:
+            colshape = (vertices.shape[0], 4)
+        else:
+            colshape = (faces.shape[0], 3, 4)
+
         # Wrong shape for vertex color :
-        if (vertex_colors is not None) and (vertex_colors.shape != (faces.shape[0], 3, 4)):
+        if (vertex_colors is not None) and (vertex_colors.shape != colshape):
             warn('Wrong shape for vertex color. Default color will be used instead.')
             vertex_colors = None
 
         # No vertex color :
         if vertex_colors is None:
-            vertex_colors = np.ones((faces.shape[0], 3, 4), dtype=np.float32)
+            vertex_colors = np.ones(colshape, dtype=np.float32)
 
         # Uniform color :
         if color is not None:
-            vertex_colors = np.tile(color2vb(color)[np.newaxis, ...], (faces.shape[0], 3, 1))
+            vertex_colors = np.tile(color2vb(color), colshape[:-1] + (1,))
 
         # -------------- Transformations --------------
         if self._recenter:
-            # Inspect minimum and maximum :
-            vm, vM = vertices.min(), vertices.max()
-
-            # Normalize by scaleFactor/max :
-            vertices = normalize(vertices, tomin=-self._scaleFactor, tomax=self._scaleFactor)
-
-            # Recenter the brain around (0, 0, 0) :
-            xScale, yScale, zScale = vertices[:, :, 0].mean(), vertices[:, :, 1].mean(), vertices[:, :, 2].mean()
-            np.subtract(vertices[:, :, 0], xScale, out=vertices[:, :, 0])
-            np.subtract(vertices[:, :, 1], yScale, out=vertices[:, :, 1])
-            np.subtract(vertices[:, :, 2], zScale, out=vertices[:, :, 2])
-
+            # Normalize by scaleFactor/max and recenter the brain around (0, 0, 0) :
+            if normalization is None:
+                vertices, normalization = mesh_normalization(vertices, self._scaleFactor)
+            vm, vM, (xScale, yScale, zScale) = normalization
 
             # Save it in a transformation :
-            self._btransform.prepend(vist.STTransform(translate=[-vM]*3))
-            self._btransform.prepend(vist.STTransform(scale=[2*self._scaleFactor/(vM-vm)]*3))
-            self._btransform.prepend(vist.STTransform(translate=[self._scaleFactor]*3))
-            self._btransform.prepend(vist.STTransform(translate=[-xScale, -yScale, -zScale]))
+            self._btransform.transforms = [vist.STTransform(translate=[-xScale, -yScale, -zScale]),
+                                           vist.STTransform(translate=[self._scaleFactor]*3),
+                                           vist.STTransform(scale=[2*self._scaleFactor/(vM-vm)]*3),
+                                           vist.STTransform(translate=[-vM]*3),
+                                           vist.NullTransform()]
 
             # Keep maximum/minimum pear coordinates :
-            self._vertsize = [(vertices[:, 0, 0].min(), vertices[:, 0, 0].max()),
-                              (vertices[:, 1, 0].min(), vertices[:, 1, 0].max()),
-                              (vertices[:, 2].min(), vertices[:, 2].max())]
-
-        # Load only left/ritgh hemisphere :
-        if hemisphere in ['left', 'right']:
-            if hemisphere == 'left':
-                inf = np.where(vertices[..., 0] <= vertices[:, :, 0].mean())[0]
-            if hemisphere == 'right':
-                inf = np.where(vertices[..., 0] >= vertices[:, :, 0].mean())[0]
-            vertices = vertices[inf, ...]
-            faces = faces[inf, ...]
-            normals = normals[inf, ...]
-            vertex_colors = vertex_colors[inf, ...]
+            self._vertsize = [(vertices[..., 0].min(), vertices[..., 0].max()),
+                              (vertices[..., 1].min(), vertices[..., 1].max()),
+                              (vertices[..., 2].min(), vertices[..., 2].max())]
+
+        # Faces of left/right hemisphere (every vertex is kept) :
+        if hemisphere is not None:
+            self._hemisphere = hemisphere
+        if self._indexed:
+            xfaces, allfaces = vertices[faces, 0], faces
+        else:
+            # De-indexed : faces are indexing consecutive vertices :
+            xfaces, allfaces = vertices[..., 0], np.arange(vertices.shape[0]*3).reshape(-1, 3)
+        xmean = vertices[..., 0].mean()
+        left = np.where((xfaces <= xmean).any(1))[0]
+        right = np.where((xfaces >= xmean).any(1))[0]
+        self._hemi_faces = {'both': faces if self._indexed else None,
+                            'left': allfaces[left, :].astype(np.uint32),
+                            'right': allfaces[right, :].astype(np.uint32)}
 
         # -------------- Convert elements --------------
         # Assign elements :
         self._vertFaces = np.ascontiguousarray(vertices, dtype=np.float32)
         self._colFaces = np.ascontiguousarray(vertex_colors, dtype=np.float32)
-        self._normFaces = np.ascontiguousarray(norm_coef*normals, dtype=np.float32)
-        self._tri = faces.astype('uint32')
+        self._normFaces = np.ascontiguousarray(normals if norm_coef == 1 else norm_coef*normals,
+                                               dtype=np.float32)
+        self._tri = faces.astype('uint32', copy=False)
+        self._dirty = None
+        self._cmapData = np.zeros(self._colFaces.shape[:-1] + (2,), dtype=np.float32)
+        self._use_lut = False
 
         self.mesh_data_changed()
 
@@ -349,13 +513,136 @@ class BrainMeshVisual(Visual):
         #     raise ValueError("data is not recognized.")
 
         # Adapt for faces :
-        if  col.ndim != 3:
+        if  (col.ndim != 3) and not self._indexed:
             col = np.transpose(np.tile(col[..., np.newaxis], (1, 1, 3)), (0, 2, 1))
         # else:
         #     col = data
 
-        self._colFaces = np.ascontiguousarray(col, dtype=np.float32)
-        self.mesh_color_changed()
+        col = np.ascontiguousarray(col, dtype=np.float32)
+
+        # Find colors that changed (only if a new array is sent) :
+        if (col is not self._colFaces) and (col.shape == self._colFaces.shape):
+            index = np.any(col != self._colFaces, axis=-1)
+        else:
+            index = None
+
+        self._colFaces = col
+        self._use_lut = False
+        self.mesh_color_changed(index)
+        self.mesh_cmap_changed()
+
+
+    def set_cmap(self, data=None, index=None, cmap='inferno', vmin=None, vmax=None,
+                 under=None, over=None):
+        """Colorize the brain using a colormap. The colormap lookup is done on
+        the GPU. Changing only the colormap properties (cmap, vmin, vmax, under,
+        over) is a texture/uniform update.
+
+        Kargs:
+            data: np.ndarray, optional, (def: None)
+                Data to colorize. The shape of data must be (N_vertices,) in
+                indexed mode or (N_faces, 3) otherwise. If None, previous data
+                are kept and only the colormap is updated.
+
+            index: np.ndarray, optional, (def: None)
+                Boolean array (same shape as data) for selecting vertices that
+                are colorized. Others keep their color. If None, every vertex
+                is colorized.
+
+            cmap: string, optional, (def: 'inferno')
+                Matplotlib colormap
+
+            vmin/vmax: float, optional, (def: None)
+                Minimum/maximum value for clipping
+
+            under/over: tuple/string/hex, optional, (def: None)
+                Color to use under/over respectively vmin/max
+        """
+        # Send new data :
+        if data is not None:
+            self._movie_clear()
+            if data.shape != self._cmapData.shape[:-1]:
+                raise ValueError("data must be an array of shape "+str(self._cmapData.shape[:-1]))
+            if index is None:
+                index = np.ones(data.shape, dtype=bool)
+            self._cmapData[..., 0] = data
+            self._cmapData[..., 1] = index
+            self._datarange = (data[index].min(), data[index].max()) if index.any() else (0., 1.)
+
+        # Colormap look-up table and limits :
+        self._cmap = array2lut(np.array(self._datarange), cmap=cmap, vmin=vmin, vmax=vmax,
+                               under=under, over=over)
+        self._use_lut = True
+        self.mesh_cmap_changed(data is not None)
+
+
+    def set_movie(self, data, index=None, time=0, cmap='inferno', vmin=None, vmax=None,
+                  under=None, over=None, max_size=None):
+        """Colorize the brain using time-resolved data. Data are sent once to
+        the GPU (float textures) and the colormap lookup of the current time
+        point is done in the vertex shader, so that changing the time point
+        (see set_time) is a uniform update. Textures larger than the GL limit
+        are chunked along time.
+
+        Args:
+            data: np.ndarray
+                Data of shape (N_vertices, N_times) in indexed mode or
+                (N_faces, 3, N_times) otherwise
+
+        Kargs:
+            index: np.ndarray, optional, (def: None)
+                Boolean array of shape (N_vertices,) or (N_faces, 3) for
+                selecting vertices that are colorized. If None, every vertex is
+                colorized.
+
+            time: int, optional, (def: 0)
+                Time point to display
+
+            cmap: string, optional, (def: 'inferno')
+                Matplotlib colormap
+
+            vmin/vmax: float, optional, (def: None)
+                Minimum/maximum value for clipping
+
+            under/over: tuple/string/hex, optional, (def: None)
+                Color to use under/over respectively vmin/max
+
+            max_size: int, optional, (def: None)
+                Maximum size of textures. If None, the GL limit is used.
+        """
+        shape = self._cmapData.shape[:-1]
+        if data.shape[:-1] != shape:
+            raise ValueError("data must be an array of shape "+str(shape + ('N_times',)))
+        if index is None:
+            index = np.ones(shape, dtype=bool)
+        self._movie_clear()
+        self._movie = np.asarray(data, dtype=np.float32).reshape(-1, data.shape[-1])
+        self._movie_maxsize = max_size
+        self._cmapData[..., 1] = index
+        select = np.asarray(index).ravel()
+        self._datarange = (self._movie[select, :].min(), self._movie[select, :].max()) \
+            if select.any() else (0., 1.)
+        self._cmap = array2lut(np.array(self._datarange), cmap=cmap, vmin=vmin, vmax=vmax,
+                               under=under, over=over)
+        self._use_lut = True
+        self.shared_program.vert['data_value'] = self._data_movie
+        self._movie_changed = True
+        self.set_time(time)
+        self.mesh_cmap_changed(True)
+
+
+    def set_time(self, time):
+        """Display a time point of the movie (see set_movie)
+
+        Args:
+            time: int
+                Time index
+        """
+        if self._movie is None:
+            raise ValueError("No movie. Use set_movie first.")
+        self._time = int(time) % self._movie.shape[1]
+        self._time_changed = True
+        self.update()
 
 
     def set_alpha(self, alpha, index=None):
@@ -364,11 +651,39 @@ class BrainMeshVisual(Visual):
         Args:
             alpha: float
                 Transparency
+
+        Kargs:
+            index: ndarray/slice, optional, (def: None)
+                Index of colors to update (mask, indices or range of faces).
+                Only those colors are going to be uploaded. If None, the
+                transparency is set to the entire brain.
+        """
+        if index is None:
+            self._colFaces[..., 3] = np.float32(alpha)
+        else:
+            self._colFaces[..., 3][index] = np.float32(alpha)
+        self.mesh_color_changed(index)
+
+
+    def set_rgba(self, color, index=None):
+        """Set an uniform RGBA color to a part of the brain. Only colors that
+        changed are uploaded.
+
+        Args:
+            color: tuple/string/hex
+                The color to use
+
+        Kargs:
+            index: ndarray/slice, optional, (def: None)
+                Index of colors to update (mask, indices or range of faces).
+                If None, the color is set to the entire brain.
         """
+        color = color2vb(color).ravel().astype(np.float32)
         if index is None:
-            index = np.ones((len(self), 3), dtype=np.bool)
-        self._colFaces[index, 3] = np.float32(alpha)
-        self.mesh_color_changed()
+            self._colFaces[:] = color
+        else:
+            self._colFaces[index] = color
+        self.mesh_color_changed(index)
 
 
     def set_light(self, l_position=None, l_color=None, l_intensity=None,
@@ -404,6 +719,40 @@ class BrainMeshVisual(Visual):
         self.mesh_light_changed()
 
 
+    def set_hemisphere(self, hemisphere='both'):
+        """Select the hemisphere to display. Only the index buffer is
+        swapped : vertices, colors and normals are not sent again
+
+        Kargs:
+            hemisphere: string, optional, (def: 'both')
+                Hemisphere to display ('both', 'left', 'right')
+        """
+        if hemisphere not in ['both', 'left', 'right']:
+            raise ValueError("hemisphere must be 'both', 'left' or 'right'")
+        self._hemisphere = hemisphere
+        # If data are not sent yet, the index buffer is defined by _update_data :
+        if not self._data_changed:
+            self._index_buffer = self._hemi_buffers[hemisphere]
+        self.update()
+
+
+    def set_clip(self, clip=None, invert=None):
+        """Slice the brain using clip planes
+
+        Kargs:
+            clip: tuple, optional, (def: None)
+                Position (x, y, z) of clip planes. Vertices over a plane are
+                hidden. Use None to disable clipping along an axis.
+
+            invert: tuple, optional, (def: None)
+                Tuple of three booleans to hide vertices under planes instead
+        """
+        planes, invert = clip2planes(clip, invert)
+        self.shared_program.frag['u_clip'] = planes
+        self.shared_program.frag['u_clip_invert'] = invert
+        self.update()
+
+
     def set_camera(self, camera=None):
         """Set a camera to the mesh
 
@@ -426,33 +775,292 @@ class BrainMeshVisual(Visual):
             self._camera, self._camera_transform = None, None
 
 
+    def cache_store(self, key):
+        """Keep buffers of the current mesh resident on the GPU. Restoring
+        it later (see cache_restore) is a buffer swap, without any upload.
+        Least recently used meshes are released when the memory used by
+        resident meshes exceed the cap (see set_cache_cap).
+
+        Args:
+            key: hashable
+                Name of the mesh (e.g 'B1')
+        """
+        self._resident_key = key
+        self._resident[key] = self._cache_state()
+        self._resident.move_to_end(key)
+        self._cache_evict()
+
+
+    def cache_restore(self, key):
+        """Swap to a mesh kept resident on the GPU
+
+        Args:
+            key: hashable
+                Name of the mesh
+
+        Return:
+            restored: bool
+                False if the mesh is not resident
+        """
+        if key not in self._resident:
+            return False
+        if key == self._resident_key:
+            return True
+        if self._resident_key is None:
+            # The current mesh isn't resident, its buffers are released :
+            self._delete_buffers({k: getattr(self, k) for k in self._RESIDENT})
+        self._cache_leave()
+        state = self._resident[key]
+        self._resident.move_to_end(key)
+        self._resident_key = key
+        for k in self._RESIDENT:
+            setattr(self, k, state[k])
+        self._btransform.transforms = state['transforms']
+        self._data_changed, self._color_changed, self._cmapdata_changed = state['pending']
+        self._movie_clear()
+        # Pointer swap :
+        self.shared_program.vert['a_position'] = self._vertices
+        self.shared_program.vert['a_color'] = self._colors
+        self.shared_program.vert['a_normal'] = self._normals
+        self.shared_program.vert['a_data'] = self._data
+        if not self._data_changed:
+            self._index_buffer = self._hemi_buffers[self._hemisphere]
+        self._cmap_changed = True
+        self.update()
+        return True
+
+
+    def set_cache_cap(self, cap):
+        """Set the maximum memory used by resident meshes
+
+        Args:
+            cap: int
+                Maximum number of bytes. The current mesh is always kept.
+        """
+        self._resident_cap = cap
+        self._cache_evict()
+
     # ----------------------------------------------------------------------
     # ----------------------------------------------------------------------
     # Update data/color/light/camera
     # ----------------------------------------------------------------------
     # ----------------------------------------------------------------------
+    _RESIDENT = ('_vertices', '_normals', '_colors', '_faces', '_data', '_vertFaces',
+                 '_normFaces', '_colFaces', '_tri', '_cmapData', '_datarange', '_use_lut',
+                 '_dirty', '_hemi_faces', '_hemi_buffers', '_vertsize')
+
+    def _new_buffers(self):
+        """Create empty buffers for vertices, normals, colors, faces and data
+        """
+        ncol, nnorm = ((2,), ()) if self._compact else ((4,), (3,))
+        self._vertices = gloo.VertexBuffer(np.zeros((0, 3), dtype=np.float32))
+        self._normals = gloo.VertexBuffer(np.zeros((0,) + nnorm, dtype=np.float32))
+        self._colors = gloo.VertexBuffer(np.zeros((0,) + ncol, dtype=np.float32))
+        self._faces = gloo.IndexBuffer()
+        self._data = gloo.VertexBuffer(np.zeros((0, 2), dtype=np.float32))
+
+    def _cache_state(self):
+        """Get the current mesh state (buffers and arrays)
+        """
+        state = {k: getattr(self, k) for k in self._RESIDENT}
+        state['transforms'] = self._btransform.transforms
+        # Updates not sent yet :
+        state['pending'] = (self._data_changed, self._color_changed, self._cmapdata_changed)
+        nbytes = self.get_memory['total']
+        nbytes += sum([f.nbytes for h, f in self._hemi_faces.items() if h != 'both'])
+        state['nbytes'] = nbytes
+        return state
+
+    def _cache_leave(self):
+        """Save the state of the current resident mesh and use new buffers,
+        so that resident buffers are not overwritten
+        """
+        if self._resident_key is None:
+            return
+        if self._resident_key in self._resident:
+            self._resident[self._resident_key] = self._cache_state()
+        self._resident_key = None
+        self._new_buffers()
+
+    def _cache_evict(self):
+        """Release least recently used meshes until resident meshes fit the cap
+        """
+        total = sum([state['nbytes'] for state in self._resident.values()])
+        for key in list(self._resident.keys()):
+            if total <= self._resident_cap:
+                break
+            if key == self._resident_key:
+                continue
+            state = self._resident.pop(key)
+            total -= state['nbytes']
+            self._delete_buffers(state)
+
+    def _delete_buffers(self, state):
+        """Release GPU buffers of a mesh state (see _cache_state)
+        """
+        buffers = [state[k] for k in ['_vertices', '_normals', '_colors', '_faces', '_data']]
+        buffers += [b for b in state['_hemi_buffers'].values() if b is not None]
+        for buf in {id(b): b for b in buffers}.values():
+            buf.delete()
+
     def _update_data(self):
         """Update faces/vertices/normals only
         """
         # Define buffers
+        colors, normals = self._gpu_color(), self._gpu_normals()
         self._faces.set_data(self._tri, convert=True)
-        self._colors.set_data(self._colFaces, convert=True)
+        self._colors.set_data(colors, convert=True)
         self._vertices.set_data(self._vertFaces, convert=True)
-        self._normals.set_data(self._normFaces, convert=True)
+        self._normals.set_data(normals, convert=True)
+
+        # Index buffer of each hemisphere (None to draw every de-indexed vertex) :
+        self._hemi_buffers = {}
+        for hemi, hfaces in self._hemi_faces.items():
+            if hfaces is None:
+                self._hemi_buffers[hemi] = None
+            elif hemi == 'both':
+                self._hemi_buffers[hemi] = self._faces
+            else:
+                self._hemi_buffers[hemi] = gloo.IndexBuffer(hfaces)
+                self._frame_bytes += hfaces.nbytes
+        self._index_buffer = self._hemi_buffers[self._hemisphere]
 
         # Mesh data :
         self.shared_program.vert['a_position'] = self._vertices
         self.shared_program.vert['a_color'] = self._colors
         self.shared_program.vert['a_normal'] = self._normals
-        self._data_changed = False
+        self._frame_bytes += self._tri.nbytes + colors.nbytes + \
+                             self._vertFaces.nbytes + normals.nbytes
+
+        # Colormap data, texture and uniforms :
+        self._cmapdata_changed = True
+        self._update_cmap()
+
+        # Colors have been sent with data :
+        self._dirty = np.zeros(self._colFaces.shape[:-1], dtype=bool).ravel()
+        self._data_changed = self._color_changed = False
 
     def _update_color(self):
-        """Update color only
+        """Update color only. Only dirty ranges are uploaded, except if most
+        of the buffer changed
         """
-        self._colors.set_data(self._colFaces.astype(np.float32))
-        self.shared_program.vert['a_color'] = self._colors
+        col = self._colFaces.reshape(-1, 4)
+        ranges = None
+        # Get dirty ranges :
+        if self._dirty is not None:
+            ranges = mask2ranges(self._dirty, gap=self._upload_gap)
+            nitems = (ranges[:, 1] - ranges[:, 0]).sum()
+            if nitems > self._upload_ratio * col.shape[0]:
+                ranges = None
+
+        # Full upload :
+        if ranges is None:
+            colors = self._gpu_color()
+            self._colors.set_data(colors)
+            self.shared_program.vert['a_color'] = self._colors
+            self._frame_bytes += colors.nbytes
+        # Partial upload :
+        else:
+            for start, stop in ranges:
+                colors = self._gpu_color(start, stop)
+                self._colors.set_subdata(colors, offset=start, copy=True)
+                self._frame_bytes += colors.nbytes
+
+        self._dirty = np.zeros((col.shape[0],), dtype=bool)
         self._color_changed = False
 
+    def _gpu_color(self, start=0, stop=None):
+        """Get colors to send to the GPU (float32 or packed)
+        """
+        col = self._colFaces.reshape(-1, 4)[start:stop, :]
+        return color2packed(col) if self._compact else col.astype(np.float32)
+
+    def _gpu_normals(self):
+        """Get normals to send to the GPU (float32 or packed)
+        """
+        return normals2packed(self._normFaces) if self._compact else self._normFaces
+
+    def _update_cmap(self):
+        """Update colormap look-up table, limits and data
+        """
+        lut, clim, under, over = self._cmap
+        # Data to colorize :
+        if self._cmapdata_changed:
+            self._data.set_data(self._cmapData.reshape(-1, 2), convert=True)
+            self.shared_program.vert['a_data'] = self._data
+            self._frame_bytes += self._cmapData.nbytes
+        # Look-up table and limits :
+        self._lut.set_data(lut[np.newaxis, ...])
+        self.shared_program.vert['u_lut'] = self._lut
+        self.shared_program.vert['u_use_lut'] = float(self._use_lut)
+        self.shared_program.vert['u_clim'] = clim
+        self.shared_program.vert['u_under'] = under
+        self.shared_program.vert['u_over'] = over
+        self._frame_bytes += lut.nbytes
+        self._cmap_changed = self._cmapdata_changed = False
+
+    def _update_movie(self):
+        """Send movie textures. Each time point is a (height, width) tile
+        and chunks are stacks of as many tiles as the GL limit allows
+        """
+        nv, ntimes = self._movie.shape
+        maxsize = self._movie_maxsize
+        if maxsize is None:
+            maxsize = int(gloo.gl.glGetParameter(gloo.gl.GL_MAX_TEXTURE_SIZE))
+        width = min(nv, maxsize)
+        height = -(-nv // width)
+        if height > maxsize:
+            raise ValueError("Too many vertices for a movie texture of maximum size "+str(maxsize))
+        tiles = min(maxsize // height, ntimes)
+
+        # Texture coordinates of each vertex in a tile :
+        vindex = np.arange(nv)
+        coord = np.c_[(vindex % width + .5) / width, vindex // width + .5].astype(np.float32)
+        self._movie_coord = gloo.VertexBuffer(coord)
+        self._data_movie['a_texcoord'] = self._movie_coord
+        self._frame_bytes += coord.nbytes
+
+        # Chunks of tiles :
+        for start in range(0, ntimes, tiles):
+            stop = min(start + tiles, ntimes)
+            chunk = np.zeros((stop - start, height * width), dtype=np.float32)
+            chunk[:, :nv] = self._movie[:, start:stop].T
+            chunk = chunk.reshape(-1, width)
+            self._movie_tex.append(gloo.Texture2D(chunk, format='luminance', internalformat='r32f',
+                                                  interpolation='nearest', wrapping='clamp_to_edge'))
+            self._frame_bytes += chunk.nbytes
+        self._movie_layout = (height, tiles)
+        self._movie_chunk = None
+        self._movie_changed = False
+        self._time_changed = True
+
+    def _update_time(self):
+        """Select the chunk and the tile of the current time point
+        """
+        height, tiles = self._movie_layout
+        chunk, tile = divmod(self._time, tiles)
+        if chunk != self._movie_chunk:
+            tex = self._movie_tex[chunk]
+            self._data_movie['u_movie'] = tex
+            self._data_movie['u_height'] = float(tex.shape[0])
+            self._movie_chunk = chunk
+        self._data_movie['u_row'] = float(tile * height)
+        self._time_changed = False
+
+    def _movie_clear(self):
+        """Remove the movie and release its textures
+        """
+        if self._movie is None:
+            return
+        for tex in self._movie_tex:
+            tex.delete()
+        if self._movie_coord is not None:
+            self._movie_coord.delete()
+        self._movie, self._movie_tex, self._movie_coord = None, [], None
+        self._movie_layout, self._movie_chunk = None, None
+        self._movie_changed = self._time_changed = False
+        self.shared_program.vert['data_value'] = self._data_attribute
+
     def _update_light(self):
         """Update light only
         """
@@ -475,6 +1083,12 @@ class BrainMeshVisual(Visual):
         """Mesh data"""
         return self._vertFaces
 
+    @property
+    def get_faces(self):
+        """Faces of each hemisphere ('both', 'left', 'right'). Faces of
+        de-indexed meshes are indexing consecutive vertices (None for 'both')"""
+        return self._hemi_faces
+
     @property
     def get_normals(self):
         """Normals"""
@@ -485,6 +1099,33 @@ class BrainMeshVisual(Visual):
         """Vertex color"""
         return self._colFaces
 
+    @property
+    def get_time(self):
+        """Current time point of the movie"""
+        return self._time
+
+    @property
+    def get_ntimes(self):
+        """Number of time points of the movie (0 if no movie)"""
+        return 0 if self._movie is None else self._movie.shape[1]
+
+    @property
+    def get_upload_bytes(self):
+        """Number of bytes uploaded to the GPU for the last frame"""
+        return self._upload_bytes
+
+    @property
+    def get_memory(self):
+        """Memory used by each buffer on the GPU (bytes)"""
+        return mesh_memory(self._colFaces.reshape(-1, 4).shape[0], self._tri.shape[0],
+                           compact=self._compact)
+
+    @property
+    def get_resident(self):
+        """Memory used by each mesh resident on the GPU (bytes), from the
+        least to the most recently used"""
+        return OrderedDict([(k, state['nbytes']) for k, state in self._resident.items()])
+
     @property
     def get_l_position(self):
         """Light position"""
@@ -524,6 +1165,7 @@ class BrainMeshVisual(Visual):
     def _prepare_draw(self, view=None):
         """This is call everytime there is an interaction with the mesh
         """
+        self._frame_bytes = 0
         # Need data update :
         if self._data_changed:
             if self._update_data() is False:
@@ -534,11 +1176,21 @@ class BrainMeshVisual(Visual):
             if self._update_color() is False:
                 return False
             self._color_changed = False
+        # Need colormap update :
+        if self._cmap_changed:
+            if self._update_cmap() is False:
+                return False
+        # Need movie textures or time update :
+        if self._movie_changed:
+            self._update_movie()
+        if self._time_changed:
+            self._update_time()
         # Need light update :
         if self._light_changed:
             if self._update_light() is False:
                 return False
             self._light_changed = False
+        self._upload_bytes = self._frame_bytes
         view_frag = view.view_program.frag
         view_frag['u_light_position'] = self._camera_transform.map(self._l_position)[0:-1]
 
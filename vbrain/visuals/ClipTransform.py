@@ -0,0 +1,89 @@
+import numpy as np
+
+from vispy.visuals.transforms import BaseTransform
+from vispy.visuals.transforms._util import arg_to_vec4
+
+from ..utils import clip2planes
+
+
+__all__ = ['ClipTransform']
+
+
+class ClipTransform(BaseTransform):
+    """Transform hiding points over x, y and z clip planes. Use it as the
+    transform of visuals that can't be modified (Markers, Text...) so that
+    slicing is done on the GPU. Hidden points are sent far away from the
+    camera and are clipped by OpenGL.
+
+    Kargs:
+        clip: tuple, optional, (def: None)
+            Position (x, y, z) of clip planes. Use None to disable clipping
+            along an axis.
+
+        invert: tuple, optional, (def: None)
+            Tuple of three booleans to hide points under planes instead
+    """
+
+    glsl_map = """
+        vec4 clip_transform_map(vec4 pos) {
+            vec3 clip_sign = 1. - 2. * $invert;
+            if (any(greaterThan(clip_sign * pos.xyz, clip_sign * $clip))) {
+                return vec4($far, $far, $far, 1.);
+            }
+            return pos;
+        }
+    """
+
+    glsl_imap = "vec4 clip_transform_imap(vec4 pos) {return pos;}"
+
+    Linear = False
+    Orthogonal = False
+    NonScaling = False
+    Isometric = False
+
+    def __init__(self, clip=None, invert=None):
+        BaseTransform.__init__(self)
+        self._far = 1e10
+        self._shader_map['far'] = self._far
+        self.dynamic = True
+        self.set_clip(clip, invert)
+
+    def set_clip(self, clip=None, invert=None):
+        """Set clip planes
+
+        Kargs:
+            clip: tuple, optional, (def: None)
+                Position (x, y, z) of clip planes
+
+            invert: tuple, optional, (def: None)
+                Tuple of three booleans to invert clipping
+        """
+        self._planes, self._invert = clip2planes(clip, invert, far=self._far)
+        self._shader_map['clip'] = self._planes
+        self._shader_map['invert'] = self._invert
+        self.update()
+
+    def hidden(self, coords):
+        """Get a boolean array of hidden points
+
+        Args:
+            coords: ndarray
+                Array of points of shape (N, 3)
+
+        Return:
+            hide: ndarray
+                Boolean array of shape (N,)
+        """
+        sign = 1. - 2. * self._invert
+        return np.any(sign * coords[:, 0:3] > sign * self._planes, axis=1)
+
+    @arg_to_vec4
+    def map(self, coords):
+        """Map coordinates"""
+        coords = np.array(coords, dtype=np.float64)
+        coords[self.hidden(coords), :] = (self._far, self._far, self._far, 1.)
+        return coords
+
+    def imap(self, coords):
+        """Inverse map coordinates"""
+        return coords
@@ -0,0 +1,291 @@
+import numpy as np
+
+from vispy import gloo
+
+from .ConnectVisual import ConnectVisual, fragment_shader
+from ..utils import normalize
+
+
+__all__ = ['ConnectGlyphVisual', 'check_instancing', 'has_divisor']
+
+
+def has_divisor():
+    """Return True if vispy supports per-instance vertex buffers
+
+    The divisor argument of gloo.VertexBuffer only exists in recent vispy
+    releases (>= 0.6). Older releases raise a TypeError.
+    """
+    try:
+        gloo.VertexBuffer(np.zeros((0,), dtype=np.float32), divisor=1)
+    except TypeError:
+        return False
+    return True
+
+
+def check_instancing():
+    """Check that the current OpenGL backend can draw instances
+
+    vispy only exposes glDrawElementsInstanced in its full (PyOpenGL)
+    backend, which must be selected by the user before any canvas is
+    created. The backend is never switched here because it is shared by
+    every canvas of the process.
+    """
+    if not hasattr(gloo.gl, 'glDrawElementsInstanced'):
+        raise RuntimeError("Connections drawn as glyphs need instanced drawing, which the "
+                           "current OpenGL backend doesn't support. Select the full OpenGL "
+                           "backend (requires PyOpenGL) before creating the brain, using "
+                           "vispy.gloo.gl.use_gl('gl+'), or use c_glyph=False.")
+
+
+vertex_shader = """
+varying vec4 v_color;
+varying float v_clip;
+void main()
+{
+    // Nodes of the edge (instance) :
+    vec3 p0 = $node_position(vec2($a_edge.x, 0.));
+    vec3 p1 = $node_position(vec2($a_edge.y, 0.));
+
+    // Clip planes (hide the connection if one of the nodes is hidden) :
+    vec3 clip_sign = 1. - 2. * $u_clip_invert;
+    v_clip = float(any(greaterThan(clip_sign * p0, clip_sign * $u_clip)) ||
+                   any(greaterThan(clip_sign * p1, clip_sign * $u_clip)));
+
+    // Both nodes in framebuffer coordinates (pixels) :
+    vec4 f0 = $visual_to_framebuffer(vec4(p0, 1.));
+    vec4 f1 = $visual_to_framebuffer(vec4(p1, 1.));
+    f0 /= f0.w;
+    f1 /= f1.w;
+    vec2 chord = f1.xy - f0.xy;
+    float len = max(length(chord), 1e-6);
+    vec2 normal = vec2(-chord.y, chord.x) / len;
+
+    // Quadratic bezier curve (the control point is moved along the normal) :
+    float width = $a_glyph.x;
+    vec2 control = .5 * (f0.xy + f1.xy) + $a_glyph.y * len * normal;
+
+    // The body of directed edges stops at the base of the arrow :
+    float arrow = min($u_arrow * 3. * width, .5 * len);
+    float s_end = 1. - arrow / len;
+
+    // Template vertex (t along the edge, side of the edge, arrow flag) :
+    float s;
+    vec2 xy;
+    if ($a_template.z < .5) {
+        s = $a_template.x * s_end;
+        vec2 tangent = 2. * (1. - s) * (control - f0.xy) + 2. * s * (f1.xy - control);
+        vec2 side = normalize(vec2(-tangent.y, tangent.x) + 1e-9);
+        vec2 curve = (1. - s) * (1. - s) * f0.xy + 2. * (1. - s) * s * control + s * s * f1.xy;
+        xy = curve + .5 * width * $a_template.y * side;
+    } else {
+        vec2 base = (1. - s_end) * (1. - s_end) * f0.xy + 2. * (1. - s_end) * s_end * control +
+                    s_end * s_end * f1.xy;
+        vec2 axis = f1.xy - base;
+        vec2 side = normalize(vec2(-axis.y, axis.x) + 1e-9);
+        s = mix(s_end, 1., $a_template.x);
+        xy = mix(base, f1.xy, $a_template.x) + $u_arrow * width * 1.5 * $a_template.y * side;
+    }
+
+    // Colormap lookup (data are interpolated between both nodes) :
+    vec4 ends = $unpack_data($a_data);
+    vec2 data = mix(ends.xy, ends.zw, s);
+    float t = (data.x - $u_clim.x) / ($u_clim.y - $u_clim.x);
+    if (t < 0.) {
+        v_color = $u_under;
+    } else if (t > 1.) {
+        v_color = $u_over;
+    } else {
+        v_color = texture2D($u_lut, vec2(t, 0.5));
+    }
+    v_color.a = data.y;
+    gl_Position = $framebuffer_to_render(vec4(xy, mix(f0.z, f1.z, s), 1.));
+
+    // Threshold (edges are sorted by weight, only ranks in [start, stop) are
+    // drawn). Other glyphs are moved outside of the clip volume, so that they
+    // produce no fragment :
+    if (($a_edge.z < $u_range.x) || ($a_edge.z >= $u_range.y)) {
+        gl_Position = vec4(2., 2., 2., 1.);
+    }
+}
+"""
+
+# Data and alpha of both nodes (float32 or packed) :
+ends_float = "vec4 ends_float(vec4 data) {return data;}"
+
+ends_packed = """
+vec4 ends_packed(vec2 code) {
+    vec2 a = floor(code / 65536.);
+    vec2 t = (code - 65536. * a) / 65535.;
+    vec2 data = $u_drange.x + t * ($u_drange.y - $u_drange.x);
+    return vec4(data.x, a.x / 255., data.y, a.y / 255.);
+}
+"""
+
+
+class ConnectGlyphVisual(ConnectVisual):
+    """Connections drawn as instanced glyphs
+
+    A template (a ribbon of n_segments quads and an arrowhead) is instanced
+    once per edge. The quadratic curve of each edge, its width (in pixels)
+    and its arrowhead are computed on the GPU from both node positions, so
+    that the only per-edge buffers are the node indices, the data and the
+    (width, curvature) of each edge.
+
+    Kargs:
+        width: float/ndarray, optional, (def: 2.)
+            Width of edges in pixels (see set_glyph)
+
+        widthby: string, optional, (def: None)
+            Scale widths by 'strength' or a statistic of nodes (see
+            set_glyph)
+
+        curvature: float/ndarray, optional, (def: 0.)
+            Curvature of edges (see set_glyph)
+
+        arrows: bool, optional, (def: False)
+            Draw an arrowhead at the second node of each edge (directed
+            graphs)
+
+        n_segments: int, optional, (def: 16)
+            Number of segments of curved edges
+
+    Other parameters are those of ConnectVisual. Edges can't be bundled.
+    """
+
+    _shaders = (vertex_shader, fragment_shader)
+    _unpack_code = (ends_float, ends_packed)
+    _edge_dim, _data_dim = 3, (4, 2)
+
+    def __init__(self, pos, connect, width=2., widthby=None, curvature=0., arrows=False,
+                 n_segments=16, **kwargs):
+        # Instanced drawing needs vispy >= 0.6 and the full OpenGL (PyOpenGL) backend :
+        if not has_divisor():
+            raise RuntimeError("Connections drawn as glyphs need per-instance vertex "
+                               "buffers, which require vispy >= 0.6.")
+        check_instancing()
+        self._width, self._curvature, self._arrows = width, curvature, arrows
+        self._widthby, self._wrange = widthby, (.2, 1.)
+        self._glyph = self._vertex_buffer(2)
+        ConnectVisual.__init__(self, pos, connect, **kwargs)
+
+        # Template of a glyph (t along the edge, side, arrow flag) :
+        t = np.linspace(0., 1., n_segments + 1)
+        body = np.c_[np.repeat(t, 2), np.tile([-1., 1.], n_segments + 1), np.zeros(2 * (n_segments + 1))]
+        arrow = np.array([[0., -1., 1.], [0., 1., 1.], [1., 0., 1.]])
+        template = np.r_[body, arrow].astype(np.float32)
+        k = 2 * np.arange(n_segments)
+        quads = np.c_[k, k + 1, k + 2, k + 1, k + 3, k + 2].ravel()
+        index = np.r_[quads, body.shape[0] + np.arange(3)].astype(np.uint32)
+        self._template = gloo.VertexBuffer(template)
+        self.shared_program.vert['a_template'] = self._template
+        self.shared_program.vert['a_glyph'] = self._glyph
+        self._index_buffer = gloo.IndexBuffer(index)
+        self._draw_mode = 'triangles'
+
+
+    def _prepare_transforms(self, view):
+        """Glyphs are built in framebuffer coordinates
+        """
+        tr = view.transforms
+        view_vert = view.view_program.vert
+        view_vert['visual_to_framebuffer'] = tr.get_transform('visual', 'framebuffer')
+        view_vert['framebuffer_to_render'] = tr.get_transform('framebuffer', 'render')
+
+
+    def _vertex_buffer(self, dim):
+        """Empty per-instance (edge) vertex buffer
+        """
+        return gloo.VertexBuffer(np.zeros((0, dim) if dim > 1 else (0,), dtype=np.float32),
+                                 divisor=1)
+
+
+    def _update_edges(self):
+        """Send node indices and rank of each edge
+        """
+        ne = len(self._weights)
+        self._edges.set_data(np.c_[self._nnz_x, self._nnz_y, np.arange(ne)].astype(np.float32))
+        self.shared_program.vert['node_position'] = self._node_texture
+
+
+    def set_data(self, connect, select=None):
+        """Set connections (see ConnectVisual) and the glyph of each edge
+        """
+        ConnectVisual.set_data(self, connect, select)
+        self.set_glyph()
+
+
+    def _send_data(self, a_data):
+        """Send data and alpha of both nodes of each edge
+        """
+        self._data.set_data(a_data.reshape(len(self._weights), -1))
+        self.update()
+
+
+    def _edge_values(self, values, name):
+        """Get per-edge values (in the order of input edges) sorted by weight
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 1:
+            return np.full((len(self._weights),), float(values[0]))
+        if values.shape != self._sorted.shape:
+            raise ValueError(name+" must be a float or an array of shape "+str(self._sorted.shape))
+        return values[self._sorted]
+
+
+    def set_glyph(self, width=None, curvature=None, arrows=None, widthby=None, wrange=None):
+        """Set the width, the curvature and the arrowhead of edges. Only the
+        (width, curvature) buffer is sent.
+
+        Kargs:
+            width: float/ndarray, optional, (def: None)
+                Width of edges in pixels. Use a float, or an array with the
+                width of each input edge.
+
+            curvature: float/ndarray, optional, (def: None)
+                Distance between the middle of each edge and the control point
+                of its curve, relatively to the length of the edge (0 for
+                straight edges). Use a float, or an array with the curvature of
+                each input edge.
+
+            arrows: bool, optional, (def: None)
+                Draw an arrowhead at the second node of each edge
+
+            widthby: string, optional, (def: None)
+                Scale the width of edges by 'strength' (weight of the
+                connection) or an aggregate of statistics of both nodes (e.g
+                'max_degree', see NodeStats.edge_values)
+
+            wrange: tuple, optional, (def: None)
+                Range (min, max) of the scaling factor of widths when widthby
+                is used (def: (.2, 1.))
+
+        Unchanged parameters are None. Use widthby='' to stop scaling widths.
+        """
+        self._width = self._width if width is None else width
+        self._curvature = self._curvature if curvature is None else curvature
+        self._arrows = self._arrows if arrows is None else arrows
+        self._widthby = self._widthby if widthby is None else (widthby or None)
+        self._wrange = self._wrange if wrange is None else wrange
+
+        # Width of each edge :
+        edge_width = self._edge_values(self._width, 'width')
+        if self._widthby is not None:
+            values = self._weights if self._widthby == 'strength' else \
+                self.stats.edge_values(self._widthby)
+            if values.size and (values.min() != values.max()):
+                scale = normalize(values.astype(float), tomin=self._wrange[0], tomax=self._wrange[1])
+            else:
+                scale = np.full(values.shape, float(self._wrange[1]))
+            edge_width = edge_width * scale
+
+        curvature = self._edge_values(self._curvature, 'curvature')
+        self._glyph.set_data(np.c_[edge_width, curvature].astype(np.float32))
+        self.shared_program.vert['u_arrow'] = float(bool(self._arrows))
+        self.update()
+
+
+    def set_bundling(self, bundle=True, **kwargs):
+        """Edges drawn as glyphs can't be bundled
+        """
+        if bundle:
+            raise ValueError("Edges drawn as glyphs can't be bundled")
@@ -1,8 +1,9 @@
 import numpy as np
-from collections import Counter
+from scipy.sparse import issparse
 
 from vispy import app, gloo, visuals, scene
-from ..utils import array2colormap, normalize
+from vispy.visuals.shaders import Function
+from ..utils import array2lut, normalize, clip2planes, NodeStats, EdgeBundling
 
 
 __all__ = ['ConnectVisual']
@@ -10,16 +11,71 @@ __all__ = ['ConnectVisual']
 
 vertex_shader = """
 varying vec4 v_color;
+varying float v_clip;
 void main()
 {
-    v_color = $a_color;
-    gl_Position = $transform(vec4($a_position, 1));
+    // Vertex position (node or point of a bundled edge) :
+    vec3 position = $node_position($a_edge);
+
+    // Clip planes (hide the connection if one of the nodes is hidden) :
+    vec3 clip_sign = 1. - 2. * $u_clip_invert;
+    v_clip = float(any(greaterThan(clip_sign * position, clip_sign * $u_clip)));
+
+    // Colormap lookup :
+    vec2 data = $unpack_data($a_data);
+    float t = (data.x - $u_clim.x) / ($u_clim.y - $u_clim.x);
+    if (t < 0.) {
+        v_color = $u_under;
+    } else if (t > 1.) {
+        v_color = $u_over;
+    } else {
+        v_color = texture2D($u_lut, vec2(t, 0.5));
+    }
+    v_color.a = data.y;
+    gl_Position = $transform(vec4(position, 1));
+
+    // Threshold (edges are sorted by weight, only ranks in [start, stop) are
+    // drawn). Other edges are moved outside of the clip volume, so that they
+    // produce no fragment :
+    if (($a_edge.y < $u_range.x) || ($a_edge.y >= $u_range.y)) {
+        gl_Position = vec4(2., 2., 2., 1.);
+    }
+}
+"""
+
+# Vertex position (nodes are stored once in a texture, bundled edges are
+# polylines) :
+node_texture = """
+vec3 node_texture(vec2 edge) {
+    vec2 node = vec2(mod(edge.x, $u_nodes_shape.y), floor(edge.x / $u_nodes_shape.y));
+    return texture2D($u_nodes, (node + 0.5) / $u_nodes_shape.yx).rgb;
+}
+"""
+
+node_bundle = """
+vec3 node_bundle(vec2 edge) {
+    return $a_point;
+}
+"""
+
+# Data and alpha decoding (float32 or packed) :
+data_float = "vec2 data_float(vec2 data) {return data;}"
+
+data_packed = """
+vec2 data_packed(float code) {
+    float a = floor(code / 65536.);
+    float t = (code - 65536. * a) / 65535.;
+    return vec2($u_drange.x + t * ($u_drange.y - $u_drange.x), a / 255.);
 }
 """
 
 fragment_shader = """
 varying vec4 v_color;
+varying float v_clip;
 void main() {
+    if (v_clip > 0.) {
+        discard;
+    }
     gl_FragColor = v_color;
 }
 """
@@ -27,12 +83,42 @@ void main() {
 
 class ConnectVisual(visuals.Visual):
     """Template
+
+    Connections (connect) can be defined using either a dense (N, N) array
+    (masked or not), a scipy.sparse (N, N) matrix or an edge list. An edge
+    list is a tuple of arrays (i, j, weight) or (i, j), or an array of shape
+    (E, 3) or (E, 2). Only selected edges are stored, so that memory is
+    O(E) except for dense arrays.
+
+    Node positions are sent once to the GPU (float texture) and each edge is
+    a pair of node indices. Edge data and transparency live in their own
+    buffer. Moving nodes only uploads the texture rows of those nodes.
+
+    Edges are sorted by weight, so that thresholding them (see set_threshold)
+    is a binary search and a uniform update.
+
+    Edges can be bundled (see set_bundling). Each edge is then drawn as a
+    polyline, in the same draw call.
+
+    If compact is True, the data (quantized on 16 bits between its minimum
+    and maximum) and the transparency (8 bits) of each vertex are packed into
+    a single float instead of two.
     """
 
+    # Shaders, data decoding (float32, packed) and number of values per
+    # vertex of edges and data buffers (float32, packed) :
+    _shaders = (vertex_shader, fragment_shader)
+    _unpack_code = (data_float, data_packed)
+    _edge_dim, _data_dim = 2, (2, 1)
+
     def __init__(self, pos, connect, select=None, colorby='strength', dynamic=None,
-                 cmap='viridis', vmin=None, vmax=None, under=None, over=None):
+                 cmap='viridis', vmin=None, vmax=None, under=None, over=None,
+                 compact=False):
 
-        visuals.Visual.__init__(self, vertex_shader, fragment_shader)
+        visuals.Visual.__init__(self, *self._shaders)
+        self._compact = compact
+        self._unpack = Function(self._unpack_code[int(bool(compact))])
+        self.shared_program.vert['unpack_data'] = self._unpack
 
         # Save variables :
         self.pos = pos
@@ -43,9 +129,35 @@ class ConnectVisual(visuals.Visual):
         self._cmap = cmap
         self._vmin, self._vmax = vmin, vmax
         self._under, self._over = under, over
+        self._threshold = (None, None)
+        self._lut = gloo.Texture2D(np.zeros((1, 256, 4), dtype=np.float32),
+                                   interpolation='linear', wrapping='clamp_to_edge')
+
+        # Buffers of nodes (texture), edges (node indices) and edges data :
+        self._nodes = gloo.Texture2D(np.zeros((1, 1, 3), dtype=np.float32), internalformat='rgb32f',
+                                     interpolation='nearest', wrapping='clamp_to_edge')
+        self._edges = self._vertex_buffer(self._edge_dim)
+        self._data = self._vertex_buffer(self._data_dim[int(bool(compact))])
+        self._nodes_width = 2048
+        self._node_texture = Function(node_texture)
+        self._node_texture['u_nodes'] = self._nodes
+        self.shared_program.vert['node_position'] = self._node_texture
+        self.shared_program.vert['a_edge'] = self._edges
+        self.shared_program.vert['a_data'] = self._data
+
+        # Bundled edges (polyline points and segments) :
+        self._points = gloo.VertexBuffer(np.zeros((0, 3), dtype=np.float32))
+        self._segments = gloo.IndexBuffer(np.zeros((0,), dtype=np.uint32))
+        self._node_bundle = Function(node_bundle)
+        self._node_bundle['a_point'] = self._points
+        self._bundler = EdgeBundling()
+        self._bundled = False
+        self._bundle_progress = None
+        self._polylines = None
 
         # Create elements :
         self.set_data(self.connect, self.select)
+        self.set_clip()
 
         # bind data
         self._draw_mode = 'lines'
@@ -63,6 +175,12 @@ class ConnectVisual(visuals.Visual):
         view_vert['transform'] = tr.get_transform()
 
 
+    def _vertex_buffer(self, dim):
+        """Empty vertex buffer of dim float32 values per vertex
+        """
+        return gloo.VertexBuffer(np.zeros((0, dim) if dim > 1 else (0,), dtype=np.float32))
+
+
     def _check_position(self, pos):
         """Check if position is type float32
         """
@@ -72,22 +190,58 @@ class ConnectVisual(visuals.Visual):
 
 
     def _check_data(self, connect, select):
-        """
+        """Get selected edges (node indices and weights) of dense, sparse or
+        edge list connections
         """
         N = self.pos.shape[0]
-        # Chech array :
-        if (connect.shape != (N, N)) or not isinstance(connect, np.ndarray):
-            raise ValueError('c_connect must be an array of shape '+str((N, N)))
-        if select is None:
-            select = np.ones_like(connect)
-        if (select.shape != (N, N) or not isinstance(select, np.ndarray)):
-            raise ValueError('c_select must be an array of shape '+str((N, N)))
-        # Mask c_connect :
-        try:
-            connect.mask
-        except:
-            connect = np.ma.masked_array(connect, mask=True)
-        connect.mask[select.nonzero()] = False
+        # Sparse matrix :
+        if issparse(connect):
+            if connect.shape != (N, N):
+                raise ValueError('c_connect must be a sparse matrix of shape '+str((N, N)))
+            coo = connect.tocsr()
+            coo.sum_duplicates()
+            coo = coo.tocoo()
+            rows, cols, weights = coo.row, coo.col, coo.data
+            # Keep stored edges where select is non-zero :
+            if select is not None:
+                if select.shape != (N, N):
+                    raise ValueError('c_select must be a matrix of shape '+str((N, N)))
+                select = select.tocsr() if issparse(select) else select
+                keep = np.asarray(select[rows, cols]).ravel() != 0
+                rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        # Dense (N, N) array :
+        elif isinstance(connect, np.ndarray) and (connect.shape == (N, N)):
+            mask = np.ma.getmaskarray(connect)
+            if select is None:
+                keep = ~mask
+            else:
+                if select.shape != (N, N) or not isinstance(select, np.ndarray):
+                    raise ValueError('c_select must be an array of shape '+str((N, N)))
+                keep = (select != 0) | (~mask if np.ma.isMaskedArray(connect) else False)
+            rows, cols = np.nonzero(keep)
+            weights = np.ma.getdata(connect)[rows, cols]
+        # Edge list :
+        else:
+            if isinstance(connect, (tuple, list)):
+                edges = list(connect)
+            elif isinstance(connect, np.ndarray) and (connect.ndim == 2) and (connect.shape[1] in [2, 3]):
+                edges = list(connect.T)
+            else:
+                raise ValueError('c_connect must be an array of shape '+str((N, N))+', a sparse '
+                                 'matrix or an edge list (i, j, weight)')
+            rows, cols = np.asarray(edges[0], dtype=int), np.asarray(edges[1], dtype=int)
+            weights = np.asarray(edges[2]) if len(edges) > 2 else np.ones(rows.shape)
+            if (rows.shape != cols.shape) or (rows.shape != weights.shape):
+                raise ValueError('i, j and weight of the edge list must have the same length')
+            if rows.size and ((min(rows.min(), cols.min()) < 0) or (max(rows.max(), cols.max()) >= N)):
+                raise ValueError('Node indices of the edge list must be between 0 and '+str(N-1))
+            if select is not None:
+                select = np.asarray(select, dtype=bool).ravel()
+                if select.shape != rows.shape:
+                    raise ValueError('c_select must be a boolean array of shape '+str(rows.shape))
+                rows, cols, weights = rows[select], cols[select], weights[select]
+        self._nnz_x, self._nnz_y = np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)
+        self._weights = np.asarray(weights, dtype=float)
         self.connect = connect
 
 
@@ -95,30 +249,83 @@ class ConnectVisual(visuals.Visual):
         """
         """
         # Check colorby :
-        if self.colorby not in ['count', 'strength']:
-            raise ValueError("The colorby parameter must be 'count' or 'strength'")
+        reduce, _, stat = colorby.partition('_')
+        if (colorby not in ['count', 'strength']) and ((reduce not in ['sum', 'mean', 'max', 'min'])
+                                                       or (stat not in ['degree', 'strength'])):
+            raise ValueError("The colorby parameter must be 'count', 'strength' or "
+                             "'<reduce>_<statistic>' (e.g 'max_degree', 'mean_strength')")
         # Test dynamic :
         if (dynamic is not None) and not isinstance(dynamic, tuple):
             raise ValueError("dynamic bust be a tuple")
 
 
     def _non_zero_select(self):
-        """Find non zeros indices and connection values
+        """Get node indices of each edge vertex
         """
-        self._nnz_x, self._nnz_y = np.where(~self.connect.mask)
+        # Sort edges by weight :
+        order = self._sorted = np.argsort(self._weights, kind='mergesort')
+        self._nnz_x, self._nnz_y = self._nnz_x[order], self._nnz_y[order]
+        self._weights = self._weights[order]
+        # Node index and rank of each edge vertex :
         self._indices = np.c_[self._nnz_x, self._nnz_y].flatten()
-        self._Nindices = np.arange(len(self._indices))
+        self._update_edges()
+        # Degree and strength of nodes :
+        self.stats = NodeStats(self._nnz_x, self._nnz_y, self._weights, self.pos.shape[0])
 
 
-    def set_position(self, pos):
+    def _update_edges(self):
+        """Send node index and rank of each vertex (and polylines of bundled
+        edges)
         """
+        ne = len(self._weights)
+        if self._polylines is None:
+            ranks = np.repeat(np.arange(ne), 2)
+            self._edges.set_data(np.c_[self._indices, ranks].astype(np.float32))
+            self._index_buffer = None
+            self.shared_program.vert['node_position'] = self._node_texture
+        else:
+            P = self._polylines.shape[1]
+            # Each point refers to its closest node :
+            t = np.linspace(0., 1., P)
+            nodes = np.where(t[np.newaxis, :] <= .5, self._nnz_x[:, np.newaxis],
+                             self._nnz_y[:, np.newaxis])
+            ranks = np.repeat(np.arange(ne), P)
+            self._edges.set_data(np.c_[nodes.ravel(), ranks].astype(np.float32))
+            self._points.set_data(self._polylines.reshape(-1, 3).astype(np.float32))
+            # Segments between consecutive points :
+            points = np.arange(ne * P).reshape(ne, P)
+            self._segments.set_data(np.c_[points[:, :-1].ravel(),
+                                          points[:, 1:].ravel()].ravel().astype(np.uint32))
+            self._index_buffer = self._segments
+            self.shared_program.vert['node_position'] = self._node_bundle
+
+
+    def set_position(self, pos, index=None):
+        """Set node positions
+
+        Args:
+            pos: ndarray
+                Node positions of shape (N, 3) or, if index is not None,
+                positions of moved nodes of shape (len(index), 3)
+
+        Kargs:
+            index: ndarray, optional, (def: None)
+                Index of moved nodes. Only the texture rows of those nodes are
+                uploaded.
         """
-        # Check pos :
-        self._check_position(pos)
-        # Set and update pos :
-        self.a_position = np.zeros((2*len(self._nnz_x), 3), dtype=np.float32)
-        self.a_position[self._Nindices, :] = self.pos[self._indices, :]
-        self.update_position()
+        if index is None:
+            # Check pos :
+            self._check_position(pos)
+            self.update_position()
+        else:
+            index = np.asarray(index, dtype=int).ravel()
+            self.pos[index, :] = np.asarray(pos, dtype=np.float32).reshape(-1, 3)
+            if index.size:
+                self.update_position(index.min() // self._nodes_width,
+                                     index.max() // self._nodes_width + 1)
+        # Bundles depend on node positions :
+        if self._bundled:
+            self._bundle()
 
 
     def set_data(self, connect, select=None):
@@ -126,8 +333,11 @@ class ConnectVisual(visuals.Visual):
         """
         # Check data :
         self._check_data(connect, select)
+        # Edges are drawn straight until they are bundled again :
+        self._polylines = None
         # Find non-zero elements :
         self._non_zero_select()
+        self.set_threshold(*self._threshold)
         # Update data :
         self.set_color(colorby=self.colorby, dynamic=self.dynamic, cmap=self._cmap, vmin=self._vmin,
                        vmax=self._vmax, under=self._under, over=self._over)
@@ -136,78 +346,243 @@ class ConnectVisual(visuals.Visual):
 
 
 
-    def set_color(self, colorby='strength', dynamic=False, cmap='viridis', vmin=None,
+    def set_color(self, colorby='strength', dynamic=None, cmap='viridis', vmin=None,
                   vmax=None, under=None, over=None):
-        """
+        """Color connections
+
+        Kargs:
+            colorby: string, optional, (def: 'strength')
+                Use 'strength' (weight of the connection), 'count' (number of
+                connections of each node) or an aggregate of the statistics
+                of both nodes '<reduce>_<statistic>' where reduce is 'sum',
+                'mean', 'max' or 'min' and statistic is 'degree' or 'strength'
+                (e.g 'max_degree').
+
+            dynamic: tuple, optional, (def: None)
+                Opacity range (min, max) proportional to colored values
         """
         # Check color elements :
         self._check_color(colorby, cmap, dynamic)
 
         # Colorby strength of connection :
         if colorby == 'strength':
-            # Get non-zeros-values :
-            nnz_values = self.connect.compressed()
-            # Concatenate in alternance all non-zero values :
-            self._all_nnz = np.c_[nnz_values, nnz_values].flatten()
-            # Get looping indices :
-            self._loopIndex = self._Nindices
-
+            self._all_nnz = np.repeat(self._weights, 2)
         # Colorby count on each node :
         elif colorby == 'count':
-            # Count the number of occurence for each node :
-            node_count = Counter(np.ravel([self._nnz_x, self._nnz_y]))
-            self._all_nnz = np.array([node_count[k] for k in self._indices])
-            # Get looping indices :
-            self._loopIndex = self._Nindices
+            self._all_nnz = self.stats.endpoints('degree')
+        # Colorby statistics of both nodes :
+        else:
+            self._all_nnz = np.repeat(self.stats.edge_values(colorby), 2)
 
-        # Get associated colormap :
-        colormap = array2colormap(self._all_nnz, cmap=cmap, vmin=vmin, vmax=vmax, under=under, over=over)
+        # Data to colorize :
+        self.a_data = self._all_nnz.astype(np.float32)
 
         # Dynamic alpha :
+        self.a_alpha = np.ones((2*len(self._nnz_x),), dtype=np.float32)
         if (dynamic is not False) and isinstance(dynamic, tuple):
-            colormap[:, 3] = normalize(self._all_nnz, tomin=dynamic[0], tomax=dynamic[1])
+            self.a_alpha[:] = normalize(self._all_nnz.astype(np.float32), tomin=dynamic[0],
+                                        tomax=dynamic[1])
 
-        # Build a_color and send to buffer :
-        self.a_color = np.zeros((2*len(self._nnz_x), 4), dtype=np.float32)
-        self.a_color[self._Nindices, :] = colormap[self._loopIndex, :]
+        # Send data and colormap :
         self.update_color()
+        self.set_cmap(cmap=cmap, vmin=vmin, vmax=vmax, under=under, over=over)
+
+
+    def set_cmap(self, cmap='viridis', vmin=None, vmax=None, under=None, over=None):
+        """Update the colormap. The colormap lookup is done on the GPU so that
+        only the look-up table and limits are sent
+        """
+        self._cmap = cmap
+        self._vmin, self._vmax = vmin, vmax
+        self._under, self._over = under, over
+        lut, clim, under, over = array2lut(self._all_nnz, cmap=cmap, vmin=vmin, vmax=vmax,
+                                           under=under, over=over)
+        self._lut.set_data(lut[np.newaxis, ...])
+        self.shared_program.vert['u_lut'] = self._lut
+        self.shared_program.vert['u_clim'] = clim
+        self.shared_program.vert['u_under'] = under
+        self.shared_program.vert['u_over'] = over
 
 
     def update_color(self):
         """
         """
-        self.shared_program.vert['a_color'] = gloo.VertexBuffer(self.a_color.astype(np.float32))
+        data, alpha = self.a_data, self.a_alpha
+        # Bundled edges : data are interpolated along polylines :
+        if self._polylines is not None:
+            t = np.linspace(0., 1., self._polylines.shape[1], dtype=np.float32)
+            data, alpha = [(k.reshape(-1, 2, 1) * np.c_[1. - t, t].T).sum(1).ravel()
+                           for k in (data, alpha)]
+        # Data and alpha share the same buffer :
+        if self._compact:
+            drange = (data.min(), data.max()) if data.size else (0., 1.)
+            data = normalize(data.copy(), tomin=0., tomax=65535.) if drange[0] != drange[1] \
+                else np.zeros_like(data)
+            alpha = np.clip(alpha, 0., 1.) * 255.
+            a_data = (np.round(data) + 65536. * np.round(alpha)).astype(np.float32)
+            self._unpack['u_drange'] = drange
+        else:
+            a_data = np.c_[data, alpha].astype(np.float32)
+        self._send_data(a_data)
+
+
+    def _send_data(self, a_data):
+        """Send data and alpha of each vertex
+        """
+        self._data.set_data(a_data)
+        self.update()
 
-    def update_position(self):
+    def update_alpha(self):
+        """
         """
+        self.update_color()
+
+    def update_position(self, start=None, stop=None):
+        """Send node positions (either every node or rows [start, stop) of
+        the texture)
         """
-        self.shared_program.vert['a_position'] = gloo.VertexBuffer(self.a_position.astype(np.float32))
+        n = self.pos.shape[0]
+        width = min(max(n, 1), self._nodes_width)
+        rows = -(-n // width)
+        if start is None:
+            start, stop = 0, rows
+            if self._nodes.shape[:2] != (rows, width):
+                self._nodes.resize((rows, width, 3))
+            self._node_texture['u_nodes_shape'] = (float(rows), float(width))
+        nodes = np.zeros(((stop - start) * width, 3), dtype=np.float32)
+        sl = self.pos[start * width:stop * width, :]
+        nodes[:sl.shape[0], :] = sl
+        self._nodes.set_data(nodes.reshape(stop - start, width, 3), offset=(start, 0))
+        self.update()
 
 
     def set_opacity(self, alpha=1.0):
+        """Set the transparency of connections
+
+        Kargs:
+            alpha: float/ndarray, optional, (def: 1.0)
+                Transparency of every connection, or of both nodes of each
+                input edge (array of length 2 * N_edges, in the order of input
+                edges). Arrays are reordered by weight like buffers.
         """
-        """
-        N = self.a_color.shape[0]
+        N = self.a_alpha.shape[0]
         if isinstance(alpha, (int, float)):
             alpha_vec = np.full((N,), alpha)
-        elif isinstance(alpha, np.ndarray) and (len(alpha) != N):
+        elif isinstance(alpha, np.ndarray) and (alpha.size != N):
             raise ValueError("The length of alpha must be "+str(N))
         else:
-            alpha_vec = alpha.ravel()
-        self.a_color[:, 3] = alpha_vec
+            alpha_vec = np.asarray(alpha).reshape(-1, 2)[self._sorted].ravel()
+        self.a_alpha[:] = alpha_vec
+        self.update_alpha()
+
+
+    def set_clip(self, clip=None, invert=None):
+        """Hide connections using clip planes
+
+        Kargs:
+            clip: tuple, optional, (def: None)
+                Position (x, y, z) of clip planes. Connections with a node over
+                a plane are hidden. Use None to disable clipping along an axis.
+
+            invert: tuple, optional, (def: None)
+                Tuple of three booleans to hide nodes under planes instead
+        """
+        planes, invert = clip2planes(clip, invert)
+        self.shared_program.vert['u_clip'] = planes
+        self.shared_program.vert['u_clip_invert'] = invert
+        self.update()
+
+
+    def set_threshold(self, vmin=None, vmax=None):
+        """Only display edges with a weight between vmin and vmax. Edges are
+        sorted by weight so that it only needs two binary searches and no
+        buffer upload. Every edge buffer (see get_color) is therefore ordered
+        by weight and not in the order of input edges.
+
+        Kargs:
+            vmin: float, optional, (def: None)
+                Minimum weight (no minimum if None)
+
+            vmax: float, optional, (def: None)
+                Maximum weight (no maximum if None)
+
+        Return:
+            nedges: int
+                Number of displayed edges
+        """
+        self._threshold = (vmin, vmax)
+        start = 0 if vmin is None else np.searchsorted(self._weights, vmin, side='left')
+        stop = len(self._weights) if vmax is None else np.searchsorted(self._weights, vmax, side='right')
+        stop = max(start, stop)
+        self._range = (int(start), int(stop))
+        self.shared_program.vert['u_range'] = (float(start), float(stop))
+        self.update()
+        return stop - start
+
+
+    def set_bundling(self, bundle=True, block=False, progress=None, **kwargs):
+        """Bundle edges (see EdgeBundling). Edges are bundled in a background
+        thread and previous bundles (or straight edges) are drawn until it's
+        done. Bundles are computed again each time the data or the node
+        positions change.
+
+        Kargs:
+            bundle: bool, optional, (def: True)
+                Bundle edges or draw them straight
+
+            block: bool, optional, (def: False)
+                Bundle edges in the main thread
+
+            progress: callable, optional, (def: None)
+                Function progress(fraction) called in the main thread while
+                edges are bundled
+
+            kwargs: dict, optional, (def: {})
+                Bundling parameters (n_points, iterations, resolution, sigma,
+                decay, step, smooth, weighted)
+        """
+        if kwargs:
+            self._bundler.cancel()
+            self._bundler = EdgeBundling(**kwargs)
+        self._bundled = bundle
+        self._bundle_progress = progress
+        if bundle:
+            self._bundle(block)
+        else:
+            self._bundler.cancel()
+            self._set_polylines(None)
+
+
+    def _bundle(self, block=False):
+        """Bundle edges of the current graph and node positions
+        """
+        args = (self.pos, self._nnz_x, self._nnz_y, self._weights)
+        if block:
+            self._bundler.cancel()
+            self._set_polylines(self._bundler.bundle(*args, progress=self._bundle_progress))
+        else:
+            self._bundler.start(*args, done=self._set_polylines, progress=self._bundle_progress)
+
+
+    def _set_polylines(self, polylines):
+        """Draw edges as polylines (or straight if None)
+        """
+        self._polylines = polylines
+        self._update_edges()
         self.update_color()
 
 
     def get_position(self):
         """
         """
-        return self.shared_program.vert['a_position']
+        return self.pos
 
 
     def get_color(self):
+        """Buffer of data and transparency of each edge vertex. Edges are
+        ordered by weight (see set_threshold), not in the order of input edges
         """
-        """
-        return self.shared_program.vert['a_color']
+        return self._data
 
 
 
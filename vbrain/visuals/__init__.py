@@ -1 +1,2 @@
-from .visual import BrainMesh, Connect
\ No newline at end of file
+from .visual import BrainMesh, Connect, ConnectGlyph
+from .ClipTransform import ClipTransform
@@ -2,9 +2,11 @@ from vispy.scene.visuals import create_visual_node
 
 from .BrainMeshVisual import BrainMeshVisual
 from .ConnectVisual import ConnectVisual
+from .ConnectGlyphVisual import ConnectGlyphVisual
 
 
 BrainMesh = create_visual_node(BrainMeshVisual)
 Connect = create_visual_node(ConnectVisual)
+ConnectGlyph = create_visual_node(ConnectGlyphVisual)
 
-__all__ = ['BrainMesh', 'Connect']
\ No newline at end of file
+__all__ = ['BrainMesh', 'Connect', 'ConnectGlyph']
\ No newline at end of file